@@ -22,9 +22,13 @@ from routes.wordpress import bp as wordpress_bp
 from routes.wp_sites import bp as wp_sites_bp
 from routes.editor_sessions import bp as editor_sessions_bp
 from routes.auth import bp as auth_bp
+from services.site_health import start_site_health_prober, run_site_health_prober, SITE_HEALTH_INTERVAL
 
 app = Flask(__name__)
 
+# Get debug mode from environment variable (default False for production)
+debug_mode = os.getenv('DEBUG', 'False').lower() == 'true'
+
 # CORS Configuration
 # Allow specific origins for security
 ALLOWED_ORIGINS = os.getenv('ALLOWED_ORIGINS', 'http://localhost:5173,http://127.0.0.1:5173').split(',')
@@ -53,6 +57,18 @@ app.register_blueprint(wordpress_bp)
 app.register_blueprint(wp_sites_bp)
 app.register_blueprint(editor_sessions_bp)
 
+# Background connection check of all WordPress sites (SITE_HEALTH_INTERVAL=0 để tắt)
+# Không start khi import: mỗi worker của gunicorn/uwsgi sẽ chạy một prober riêng.
+# `python app.py` start prober trong process; chạy nhiều worker thì dùng
+# `flask --app app site-health-prober` như một process riêng
+site_health_interval = int(os.getenv('SITE_HEALTH_INTERVAL', SITE_HEALTH_INTERVAL))
+
+
+@app.cli.command("site-health-prober")
+def site_health_prober_command():
+    """Run the WordPress site health prober in the foreground"""
+    run_site_health_prober(site_health_interval)
+
 @app.route("/")
 def home():
     return {"message": "Guest Post Tool Backend is running"}
@@ -68,7 +84,8 @@ def health_check():
 
 if __name__ == "__main__":
     logger.info("Starting Guest Post Tool backend server...")
-    # Get debug mode from environment variable (default False for production)
-    debug_mode = os.getenv('DEBUG', 'False').lower() == 'true'
+    # Debug reloader chạy hai process: chỉ start trong process phục vụ request
+    if not debug_mode or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_site_health_prober(site_health_interval)
     port = int(os.getenv('PORT', '5050'))
     app.run(host="0.0.0.0", port=port, debug=debug_mode)
\ No newline at end of file
@@ -46,6 +46,9 @@ from .wp_outgoing_urls import (
 # Import WordPress editor sessions functions
 from .wp_editor_sessions import (
     create_editor_session,
+    start_editor_session,
+    add_editor_posts,
+    update_editor_outgoing_links,
     get_editor_session,
     update_editor_post,
     get_snapshot_by_domain,
@@ -55,6 +58,23 @@ from .wp_editor_sessions import (
     cleanup_old_working_sessions
 )
 
+# Import WordPress post index functions
+from .wp_post_index import (
+    upsert_indexed_posts,
+    lookup_indexed_posts,
+    delete_stale_indexed_posts,
+    get_post_index_state,
+    set_post_index_sync_state,
+    delete_post_index
+)
+
+# Import WordPress site health functions
+from .wp_site_health import (
+    save_site_health,
+    get_site_health,
+    delete_site_health
+)
+
 # Import authentication tokens functions
 from .auth_tokens import (
     store_auth_token,
@@ -100,6 +120,9 @@ __all__ = [
 
     # WordPress editor sessions
     'create_editor_session',
+    'start_editor_session',
+    'add_editor_posts',
+    'update_editor_outgoing_links',
     'get_editor_session',
     'update_editor_post',
     'get_snapshot_by_domain',
@@ -108,6 +131,19 @@ __all__ = [
     'delete_editor_session',
     'cleanup_old_working_sessions',
 
+    # WordPress post index
+    'upsert_indexed_posts',
+    'lookup_indexed_posts',
+    'delete_stale_indexed_posts',
+    'get_post_index_state',
+    'set_post_index_sync_state',
+    'delete_post_index',
+
+    # WordPress site health
+    'save_site_health',
+    'get_site_health',
+    'delete_site_health',
+
     # Authentication tokens
     'store_auth_token',
     'get_auth_token',
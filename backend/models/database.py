@@ -191,6 +191,59 @@ def init_db():
     c.execute('CREATE INDEX IF NOT EXISTS idx_token ON auth_tokens(token)')
     c.execute('CREATE INDEX IF NOT EXISTS idx_expires_at ON auth_tokens(expires_at)')
 
+    # Table: WordPress post index (local copy of each site's post listing)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS wp_post_index (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            wp_site_id INTEGER NOT NULL,
+            post_id INTEGER NOT NULL,
+            link TEXT,
+            path TEXT,
+            slug TEXT,
+            type TEXT,
+            modified TEXT,
+            synced_at TEXT NOT NULL,
+            FOREIGN KEY (wp_site_id) REFERENCES wp_sites(id)
+        )
+    ''')
+
+    # Index for URL lookup and upserts
+    c.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_post_index_site_post ON wp_post_index(wp_site_id, post_id)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_post_index_path ON wp_post_index(wp_site_id, path)')
+
+    # Table: post index sync state per site
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS wp_post_index_sync (
+            wp_site_id INTEGER PRIMARY KEY,
+            synced_at TEXT,
+            status TEXT,
+            error TEXT,
+            failed_at TEXT,
+            FOREIGN KEY (wp_site_id) REFERENCES wp_sites(id)
+        )
+    ''')
+
+    # Migration: Add failed_at column if not exists
+    try:
+        c.execute('ALTER TABLE wp_post_index_sync ADD COLUMN failed_at TEXT')
+    except sqlite3.OperationalError:
+        # Column already exists
+        pass
+
+    # Table: connection health of each WordPress site (background prober)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS wp_site_health (
+            wp_site_id INTEGER PRIMARY KEY,
+            status TEXT NOT NULL,
+            status_code INTEGER,
+            latency REAL,
+            error TEXT,
+            checked_at TEXT NOT NULL,
+            last_ok_at TEXT,
+            FOREIGN KEY (wp_site_id) REFERENCES wp_sites(id)
+        )
+    ''')
+
     conn.commit()
     conn.close()
 
@@ -231,6 +284,9 @@ from .wp_outgoing_urls import (
 
 from .wp_editor_sessions import (
     create_editor_session,
+    start_editor_session,
+    add_editor_posts,
+    update_editor_outgoing_links,
     get_editor_session,
     update_editor_post,
     get_snapshot_by_domain,
@@ -247,3 +303,18 @@ from .auth_tokens import (
     cleanup_expired_auth_tokens,
     delete_all_user_tokens
 )
+
+from .wp_post_index import (
+    upsert_indexed_posts,
+    lookup_indexed_posts,
+    delete_stale_indexed_posts,
+    get_post_index_state,
+    set_post_index_sync_state,
+    delete_post_index
+)
+
+from .wp_site_health import (
+    save_site_health,
+    get_site_health,
+    delete_site_health
+)
@@ -56,6 +56,97 @@ def create_editor_session(session_id, wp_site_id, domain, posts, is_snapshot=0,
     return session_id
 
 
+def start_editor_session(session_id, wp_site_id, domain, session_name=None):
+    """
+    Tạo working session rỗng; posts được thêm dần bằng add_editor_posts
+    Returns: session_id
+    """
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+
+    now = datetime.now(timezone.utc).isoformat()
+    c.execute('''
+        INSERT INTO wp_editor_sessions (session_id, wp_site_id, domain, session_name, total_posts, is_snapshot, created_at, last_accessed)
+        VALUES (?, ?, ?, ?, 0, 0, ?, ?)
+    ''', (session_id, wp_site_id, domain, session_name, now, now))
+
+    conn.commit()
+    conn.close()
+
+    return session_id
+
+
+def add_editor_posts(session_id, wp_site_id, posts):
+    """
+    Thêm một lô posts vào session (một transaction) và cập nhật total_posts
+    posts: list of post dicts (id, url, title, status, outgoing_links, date_modified)
+    Returns: số posts đã thêm (post trùng id trong session bị bỏ qua)
+    """
+    rows = [
+        (session_id, post['id'], post.get('url', ''), post.get('title', ''), post.get('status', ''),
+         json.dumps(post['outgoing_links']) if post.get('outgoing_links') else None,
+         post.get('date_modified'), wp_site_id)
+        for post in posts if post.get('id')
+    ]
+    if not rows:
+        return 0
+
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+
+    before = conn.total_changes
+    c.executemany('''
+        INSERT OR IGNORE INTO wp_editor_posts (session_id, post_id, url, title, status, outgoing_links, date_modified, wp_site_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+    inserted = conn.total_changes - before
+
+    c.execute('''
+        UPDATE wp_editor_sessions
+        SET total_posts = total_posts + ?
+        WHERE session_id = ?
+    ''', (inserted, session_id))
+
+    conn.commit()
+    conn.close()
+
+    return inserted
+
+
+def update_editor_outgoing_links(session_id, posts):
+    """
+    Cập nhật outgoing_links và date_modified của một lô posts trong session (một transaction)
+    posts: list of post dicts (id, outgoing_links, date_modified);
+           outgoing_links = [] ghi đè links cũ (nội dung không còn link),
+           chỉ khi không có outgoing_links (None) mới giữ links cũ
+    Returns: số posts đã cập nhật
+    """
+    rows = [
+        (json.dumps(post['outgoing_links']) if post.get('outgoing_links') is not None else None,
+         post.get('date_modified'), session_id, post['id'])
+        for post in posts if post.get('id')
+    ]
+    if not rows:
+        return 0
+
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+
+    before = conn.total_changes
+    c.executemany('''
+        UPDATE wp_editor_posts
+        SET outgoing_links = COALESCE(?, outgoing_links),
+            date_modified = COALESCE(?, date_modified)
+        WHERE session_id = ? AND post_id = ?
+    ''', rows)
+    updated = conn.total_changes - before
+
+    conn.commit()
+    conn.close()
+
+    return updated
+
+
 def get_editor_session(session_id):
     """
     Lấy editor session và tất cả posts
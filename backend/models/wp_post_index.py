@@ -0,0 +1,159 @@
+"""
+WordPress Post Index Module
+Local copy of each site's post listing (id, link, slug, type, modified),
+used to resolve post URLs to ids without REST slug lookups
+"""
+import sqlite3
+from datetime import datetime, timezone
+from urllib.parse import urlparse, unquote
+import os
+
+DB_PATH = os.path.join(os.path.dirname(__file__), "../check_history.db")
+
+LOOKUP_CHUNK_SIZE = 500  # Giới hạn số tham số trong một câu IN (...)
+
+
+def normalize_post_path(url):
+    """Path dùng để so khớp URL với post (lowercase, decoded, không có dấu / cuối)"""
+    return unquote(urlparse(url or '').path).rstrip('/').lower()
+
+
+def upsert_indexed_posts(wp_site_id, posts, synced_at=None):
+    """
+    Thêm / cập nhật posts vào index
+    posts: list of dicts (post_id, link, slug, type, modified)
+    Returns: số posts đã ghi
+    """
+    if not posts:
+        return 0
+
+    synced_at = synced_at or datetime.now(timezone.utc).isoformat()
+    rows = [
+        (wp_site_id, post['post_id'], post.get('link'), normalize_post_path(post.get('link')),
+         post.get('slug'), post.get('type'), post.get('modified'), synced_at)
+        for post in posts if post.get('post_id')
+    ]
+
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.executemany('''
+        INSERT INTO wp_post_index (wp_site_id, post_id, link, path, slug, type, modified, synced_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(wp_site_id, post_id) DO UPDATE SET
+            link = excluded.link,
+            path = excluded.path,
+            slug = excluded.slug,
+            type = excluded.type,
+            modified = excluded.modified,
+            synced_at = excluded.synced_at
+    ''', rows)
+    conn.commit()
+    conn.close()
+
+    return len(rows)
+
+
+def lookup_indexed_posts(wp_site_id, urls):
+    """
+    Tìm posts trong index theo URL
+    Returns: dict {url: {post_id, link, slug, type, modified}} (chỉ các URL tìm thấy)
+    """
+    path_to_urls = {}
+    for url in urls:
+        path_to_urls.setdefault(normalize_post_path(url), []).append(url)
+
+    paths = list(path_to_urls)
+    found = {}
+
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+
+    for i in range(0, len(paths), LOOKUP_CHUNK_SIZE):
+        chunk = paths[i:i + LOOKUP_CHUNK_SIZE]
+        placeholders = ','.join('?' * len(chunk))
+        c.execute(f'''
+            SELECT post_id, link, path, slug, type, modified
+            FROM wp_post_index
+            WHERE wp_site_id = ? AND path IN ({placeholders})
+        ''', (wp_site_id, *chunk))
+
+        for row in c.fetchall():
+            entry = dict(row)
+            for url in path_to_urls[entry.pop('path')]:
+                found[url] = entry
+
+    conn.close()
+    return found
+
+
+def delete_stale_indexed_posts(wp_site_id, synced_before):
+    """
+    Xóa posts không còn xuất hiện trong lần full sync gần nhất
+    Returns: số posts đã xóa
+    """
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute('DELETE FROM wp_post_index WHERE wp_site_id = ? AND synced_at < ?', (wp_site_id, synced_before))
+    deleted = c.rowcount
+    conn.commit()
+    conn.close()
+    return deleted
+
+
+def get_post_index_state(wp_site_id):
+    """
+    Lấy trạng thái index của một site
+    Returns: dict (post_count, last_modified, synced_at, status, error, failed_at)
+    """
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+
+    c.execute('''
+        SELECT COUNT(*) AS post_count, MAX(modified) AS last_modified
+        FROM wp_post_index
+        WHERE wp_site_id = ?
+    ''', (wp_site_id,))
+    state = dict(c.fetchone())
+
+    c.execute('''
+        SELECT synced_at, status, error, failed_at
+        FROM wp_post_index_sync
+        WHERE wp_site_id = ?
+    ''', (wp_site_id,))
+    row = c.fetchone()
+    conn.close()
+
+    state.update(dict(row) if row else {'synced_at': None, 'status': None, 'error': None, 'failed_at': None})
+    return state
+
+
+def set_post_index_sync_state(wp_site_id, status, error=None, synced_at=None, failed_at=None):
+    """
+    Lưu trạng thái sync (status: running / done / failed)
+    synced_at và failed_at chỉ cập nhật khi có giá trị
+    """
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute('''
+        INSERT INTO wp_post_index_sync (wp_site_id, synced_at, status, error, failed_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(wp_site_id) DO UPDATE SET
+            synced_at = COALESCE(excluded.synced_at, wp_post_index_sync.synced_at),
+            status = excluded.status,
+            error = excluded.error,
+            failed_at = COALESCE(excluded.failed_at, wp_post_index_sync.failed_at)
+    ''', (wp_site_id, synced_at, status, error, failed_at))
+    conn.commit()
+    conn.close()
+
+
+def delete_post_index(wp_site_id):
+    """Xóa toàn bộ index của một site"""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute('DELETE FROM wp_post_index WHERE wp_site_id = ?', (wp_site_id,))
+    c.execute('DELETE FROM wp_post_index_sync WHERE wp_site_id = ?', (wp_site_id,))
+    conn.commit()
+    conn.close()
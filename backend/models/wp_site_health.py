@@ -0,0 +1,80 @@
+"""
+WordPress Site Health Module
+Last connection check of each WordPress site (status, latency, error),
+written by the background health prober
+"""
+import sqlite3
+from datetime import datetime, timezone
+import os
+
+DB_PATH = os.path.join(os.path.dirname(__file__), "../check_history.db")
+
+
+def save_site_health(results):
+    """
+    Lưu kết quả kiểm tra của nhiều sites (một transaction)
+    results: list of dicts (wp_site_id, status, status_code, latency, error, checked_at)
+    last_ok_at chỉ cập nhật khi status = 'ok'
+    Returns: số sites đã ghi
+    """
+    if not results:
+        return 0
+
+    now = datetime.now(timezone.utc).isoformat()
+    rows = [
+        (result['wp_site_id'], result['status'], result.get('status_code'), result.get('latency'),
+         result.get('error'), result.get('checked_at') or now)
+        for result in results
+    ]
+
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.executemany('''
+        INSERT INTO wp_site_health (wp_site_id, status, status_code, latency, error, checked_at, last_ok_at)
+        VALUES (?1, ?2, ?3, ?4, ?5, ?6, CASE WHEN ?2 = 'ok' THEN ?6 END)
+        ON CONFLICT(wp_site_id) DO UPDATE SET
+            status = excluded.status,
+            status_code = excluded.status_code,
+            latency = excluded.latency,
+            error = excluded.error,
+            checked_at = excluded.checked_at,
+            last_ok_at = COALESCE(excluded.last_ok_at, wp_site_health.last_ok_at)
+    ''', rows)
+    conn.commit()
+    conn.close()
+
+    return len(rows)
+
+
+def get_site_health(wp_site_id=None):
+    """
+    Lấy kết quả kiểm tra gần nhất
+    Returns: list of dicts (một site nếu có wp_site_id), kèm name và site_url
+    """
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    c = conn.cursor()
+
+    query = '''
+        SELECT h.wp_site_id, s.name, s.site_url, h.status, h.status_code, h.latency, h.error,
+               h.checked_at, h.last_ok_at
+        FROM wp_site_health h
+        JOIN wp_sites s ON s.id = h.wp_site_id
+    '''
+    if wp_site_id is not None:
+        c.execute(query + ' WHERE h.wp_site_id = ?', (wp_site_id,))
+    else:
+        c.execute(query + ' ORDER BY s.name')
+
+    rows = [dict(row) for row in c.fetchall()]
+    conn.close()
+    return rows
+
+
+def delete_site_health(wp_site_id):
+    """Xóa kết quả kiểm tra của một site"""
+    conn = sqlite3.connect(DB_PATH)
+    c = conn.cursor()
+    c.execute('DELETE FROM wp_site_health WHERE wp_site_id = ?', (wp_site_id,))
+    conn.commit()
+    conn.close()
@@ -1,29 +1,22 @@
 from flask import Blueprint, request, jsonify, send_file
 import asyncio
-import math
 from urllib.parse import urlparse
 from datetime import datetime, timezone
 import io
 import csv
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 
-from services.serper_service import check_urls
-from services.sitemap_parser import fetch_sitemap_urls
+from services.sitemap_parser import crawl_sitemap
+from services.index_check import process_batches, expand_and_check, DOMAIN_WORKERS
+from services.sitemap_filters import SitemapFilter
+from services.index_sampling import strata_from_crawl, estimate_index_rate
 from utils.logger import logger
 from models.database import insert_history, insert_domain_check, get_domain_checks, get_domain_check_detail, clear_all_history
 
 bp = Blueprint("check_index", __name__)
 
-BATCH_SIZE = 10  # Số URL xử lý song song mỗi batch
-
-async def process_batches(urls):
-    results = []
-    total_batches = math.ceil(len(urls) / BATCH_SIZE)
-    for i in range(total_batches):
-        batch = urls[i * BATCH_SIZE:(i + 1) * BATCH_SIZE]
-        logger.info(f"Batch {i+1}/{total_batches}: {len(batch)} URLs")
-        batch_results = await check_urls(batch)
-        results.extend(batch_results)
-    return results
+SAMPLE_MAX_URLS = 100000  # Giới hạn URL khi crawl sitemap cho chế độ sampling
 
 def group_by_domain(results):
     grouped = {}
@@ -32,15 +25,105 @@ def group_by_domain(results):
         grouped.setdefault(domain, []).append(r)
     return grouped
 
+async def sample_and_estimate(direct_urls, domains, domain_filters, options):
+    """
+    Chế độ sampling: ước lượng tỉ lệ index cho mỗi domain từ mẫu phân tầng
+    (mỗi sitemap con là một tầng) thay vì check toàn bộ URL.
+    Returns: (estimates theo domain, kết quả check của các URL trong mẫu)
+    """
+    loop = asyncio.get_running_loop()
+    batch_lock = asyncio.Lock()
+
+    async def check(urls):
+        return await process_batches(urls, batch_lock)
+
+    async def sample_domain(executor, domain):
+        fetch = partial(crawl_sitemap, domain, max_urls=SAMPLE_MAX_URLS, url_filter=domain_filters.get(domain))
+        crawl = await loop.run_in_executor(executor, fetch)
+        strata = strata_from_crawl(crawl) or [("homepage", [f"https://{domain}"])]
+        logger.info(f"🎲 Sampling {domain}: {len(crawl.urls)} URLs in {len(strata)} strata")
+        estimate, results = await estimate_index_rate(strata, check, **options)
+        estimate["stop_reason"] = crawl.stop_reason
+        return domain, estimate, results
+
+    async def sample_direct(host, urls):
+        estimate, results = await estimate_index_rate([(host, urls)], check, **options)
+        return host, estimate, results
+
+    direct_groups = {}
+    for url in direct_urls:
+        direct_groups.setdefault(urlparse(url).netloc, []).append(url)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(DOMAIN_WORKERS, len(domains)))) as executor:
+        tasks = [sample_direct(host, urls) for host, urls in direct_groups.items()]
+        tasks.extend(sample_domain(executor, domain) for domain in domains)
+        outcomes = await asyncio.gather(*tasks)
+
+    estimates = {name: estimate for name, estimate, _ in outcomes}
+    results = [r for _, _, group in outcomes for r in group]
+    return estimates, results
+
+def parse_sample_options(sample):
+    """
+    Đọc tuỳ chọn sampling từ request ("sample": true hoặc object).
+    Raises ValueError nếu tuỳ chọn không hợp lệ.
+    """
+    if sample is True:
+        return {}
+    if not isinstance(sample, dict):
+        raise ValueError("sample must be true or an object")
+
+    options = {}
+    for key, option, cast in (
+        ("target_margin", "target_margin", float),
+        ("confidence", "confidence", float),
+        ("initial_sample", "initial_size", int),
+        ("max_sample", "max_size", int),
+    ):
+        if sample.get(key) is not None:
+            options[option] = cast(sample[key])
+    if not 0 < options.get("target_margin", 0.05) < 1:
+        raise ValueError("target_margin must be between 0 and 1")
+    if not 0 < options.get("confidence", 0.95) < 1:
+        raise ValueError("confidence must be between 0 and 1")
+    return options
+
+def build_domain_filters(data, domains):
+    """
+    Build SitemapFilter cho từng domain từ request:
+    "filters" áp dụng cho mọi domain, "domain_filters" ({domain: rules}) ghi đè theo domain.
+    Raises ValueError nếu rule không hợp lệ.
+    """
+    default_filter = SitemapFilter.from_dict(data.get("filters"))
+    per_domain = data.get("domain_filters") or {}
+    if not isinstance(per_domain, dict):
+        raise ValueError("domain_filters must be an object")
+
+    filters = {}
+    for domain in domains:
+        rules = per_domain.get(domain)
+        filters[domain] = SitemapFilter.from_dict(rules) if rules else default_filter
+    return filters
+
 @bp.route("/api/check-index", methods=["POST"])
 def check_index_route():
+    """
+    Check index cho danh sách URL/domain
+    Request: {"urls": [...], "filters": {...}, "domain_filters": {"example.com": {...}},
+              "sample": {"target_margin": 0.05, "confidence": 0.95, "max_sample": 2000}}
+    Filter rules: xem services.sitemap_filters.SitemapFilter
+    Với "sample", chỉ một mẫu ngẫu nhiên phân tầng được check và kết quả trả về
+    là tỉ lệ index ước lượng kèm khoảng tin cậy (không lưu lịch sử).
+    """
     data = request.get_json()
     inputs = data.get("urls", [])
 
     if not inputs or not isinstance(inputs, list):
         return jsonify({"error": "Invalid or empty URL list"}), 400
 
-    all_urls = []
+    entries = []
+    direct_urls = []
+    domains = []
 
     # 🧠 Phân biệt domain và URL
     for entry in inputs:
@@ -48,26 +131,44 @@ def check_index_route():
         if not entry:
             continue
 
-        # Nếu chỉ nhập domain, thử cả sitemap và URL trực tiếp
+        # Nếu chỉ nhập domain, crawl sitemap (song song, xem expand_and_check)
+        entries.append(entry)
         if not entry.startswith("http"):
-            logger.info(f"🌐 Domain input detected: {entry}")
-            domain_urls = fetch_sitemap_urls(entry)
-            if domain_urls:
-                logger.info(f"Found {len(domain_urls)} URLs from sitemap")
-                all_urls.extend(domain_urls)
-            else:
-                # Nếu không có sitemap, coi như single URL và thêm https://
-                logger.info(f"No sitemap found, treating as single URL: https://{entry}")
-                all_urls.append(f"https://{entry}")
+            domains.append(entry)
         else:
-            all_urls.append(entry)
+            direct_urls.append(entry)
 
-    if not all_urls:
+    if not direct_urls and not domains:
         return jsonify({"error": "Không tìm thấy URL hợp lệ hoặc sitemap."}), 400
 
-    logger.info(f"Tổng cộng {len(all_urls)} URL cần kiểm tra index")
+    try:
+        domain_filters = build_domain_filters(data, domains)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if data.get("sample"):
+        try:
+            sample_options = parse_sample_options(data["sample"])
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+
+        logger.info(f"🎲 Sampling mode for {len(direct_urls)} URL và {len(domains)} domain")
+        estimates, sample_results = asyncio.run(
+            sample_and_estimate(direct_urls, domains, domain_filters, sample_options)
+        )
+        for r in sample_results:
+            r.setdefault("checked_at", datetime.now(timezone.utc).isoformat())
+
+        return jsonify({
+            "mode": "sample",
+            "estimates": estimates,
+            "domain_groups": group_by_domain(sample_results)
+        })
 
-    results = asyncio.run(process_batches(all_urls))
+    logger.info(f"Kiểm tra index cho {len(direct_urls)} URL và {len(domains)} domain")
+
+    results = asyncio.run(expand_and_check(entries, domain_filters))
+    logger.info(f"Tổng cộng {len(results)} URL đã kiểm tra index")
 
     # Thêm timestamp
     for r in results:
@@ -99,20 +200,27 @@ def check_index_route():
 def fetch_sitemap_route():
     """
     Fetch URLs from domain's sitemap (không check index)
-    Request: {"domain": "example.com", "max_urls": 10000}
+    Request: {"domain": "example.com", "max_urls": 10000, "refresh": false, "filters": {...}}
     """
     data = request.get_json()
     domain = data.get("domain", "").strip()
     max_urls = data.get("max_urls", 10000)
+    use_cache = not data.get("refresh", False)
 
     if not domain:
         return jsonify({"error": "Domain is required"}), 400
 
+    try:
+        url_filter = SitemapFilter.from_dict(data.get("filters"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     # Remove http(s):// if present
     domain = domain.replace("https://", "").replace("http://", "").split("/")[0]
 
     logger.info(f"📡 Fetching sitemap for: {domain}")
-    urls = fetch_sitemap_urls(domain, max_urls=max_urls)
+    crawl = crawl_sitemap(domain, max_urls=max_urls, url_filter=url_filter, use_cache=use_cache)
+    urls = crawl.urls
 
     if not urls:
         logger.warning(f"No sitemap found for {domain}")
@@ -127,9 +235,39 @@ def fetch_sitemap_route():
     return jsonify({
         "domain": domain,
         "urls": urls,
-        "count": len(urls)
+        "count": len(urls),
+        "truncated": crawl.stop_reason is not None,
+        "stop_reason": crawl.stop_reason
     })
 
+@bp.route("/api/sitemap-tree", methods=["POST"])
+def sitemap_tree_route():
+    """
+    Crawl domain's sitemap và trả về cây sitemap với thống kê từng node
+    (số URL, bytes, thời gian fetch, lỗi) - không trả về danh sách URL
+    Request: {"domain": "example.com", "max_urls": 10000, "refresh": false, "filters": {...}}
+    """
+    data = request.get_json()
+    domain = data.get("domain", "").strip()
+    max_urls = data.get("max_urls", 10000)
+    use_cache = not data.get("refresh", False)
+
+    if not domain:
+        return jsonify({"error": "Domain is required"}), 400
+
+    try:
+        url_filter = SitemapFilter.from_dict(data.get("filters"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Remove http(s):// if present
+    domain = domain.replace("https://", "").replace("http://", "").split("/")[0]
+
+    logger.info(f"🌳 Crawling sitemap tree for: {domain}")
+    crawl = crawl_sitemap(domain, max_urls=max_urls, url_filter=url_filter, use_cache=use_cache)
+
+    return jsonify(crawl.to_dict())
+
 @bp.route("/api/domain-checks", methods=["GET"])
 def get_domain_checks_route():
     """Lấy danh sách domain checks gần nhất"""
@@ -51,6 +51,41 @@ def create_session():
         logger.error(f"[EditorSession] Error creating session: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/api/editor-session/from-urls', methods=['POST'])
+def create_session_from_urls_route():
+    """
+    Create a working session by fetching posts on the server
+    Body: {"wp_site_id": 1, "urls": [...], "session_name": optional}
+    Posts are fetched, their outgoing links extracted and rows stored in
+    batches; only the session summary is returned.
+    """
+    try:
+        data = request.json
+        wp_site_id = data.get('wp_site_id')
+        urls = [url.strip() for url in data.get('urls', []) if isinstance(url, str) and url.strip()]
+
+        if not wp_site_id or not urls:
+            return jsonify({'error': 'wp_site_id and urls are required'}), 400
+
+        from models.database import get_wp_site_by_id
+        from services.editor_pipeline import create_session_from_urls
+
+        wp_site = get_wp_site_by_id(wp_site_id)
+        if not wp_site:
+            return jsonify({'error': f'WP site {wp_site_id} not found'}), 404
+
+        logger.info(f"[EditorSession] Creating session from {len(urls)} URLs for wp_site_id={wp_site_id}")
+        summary = create_session_from_urls(wp_site, urls, data.get('session_name'))
+
+        if not summary['session_id']:
+            return jsonify({'error': 'No posts could be fetched', **summary}), 422
+
+        return jsonify(summary), 201
+
+    except Exception as e:
+        logger.error(f"[EditorSession] Error creating session from URLs: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @bp.route('/api/editor-session/<session_id>', methods=['GET'])
 def get_session(session_id):
     """Get session data with posts"""
@@ -94,7 +129,11 @@ def update_post(session_id, post_id):
 
 @bp.route('/api/editor-session/<session_id>/refresh-outgoing-links', methods=['POST'])
 def refresh_outgoing_links(session_id):
-    """Re-fetch and parse outgoing links for old snapshots"""
+    """
+    Re-fetch and parse outgoing links for old snapshots
+    Body: {"wp_config": {...}, "incremental": true, "background": false}
+    With background=true the refresh runs as a job (see refresh-jobs/<job_id>).
+    """
     try:
         data = request.json
         wp_config = data.get('wp_config')
@@ -114,8 +153,8 @@ def refresh_outgoing_links(session_id):
             return jsonify({'error': 'No posts found in session'}), 404
 
         # Import WordPress service
-        from services.wordpress_service import create_wordpress_service
-        from utils.html_parser import extract_outgoing_links
+        from services.wordpress_service import get_wordpress_service
+        from services.editor_pipeline import refresh_session_links, start_refresh_job
 
         # IMPORTANT: Use wp_site from SESSION, not from wp_config (active site)
         # This prevents cross-domain contamination
@@ -196,52 +235,20 @@ def refresh_outgoing_links(session_id):
 
         logger.info(f"[EditorSession] Fetching from session's site: {site_url} (wp_site_id={wp_site_id})")
 
-        # Create WordPress service for this site
-        wp_service = create_wordpress_service(site_url, username, app_password)
-
-        # Extract URLs from posts
-        post_urls = [post['url'] for post in posts]
+        # Get shared WordPress service for this site
+        wp_service = get_wordpress_service(site_url, username, app_password)
 
-        # Fetch all posts concurrently using service
-        fresh_posts = wp_service.fetch_posts_concurrent(post_urls, max_workers=5)
+        # Incremental by default: only posts modified since their stored date_modified are re-fetched
+        incremental = data.get('incremental', True)
 
-        # Update outgoing_links in database
-        import json
-        import sqlite3
-        from models.database import DB_PATH
+        if data.get('background'):
+            job = start_refresh_job(session_id, wp_site_id, wp_service, posts, incremental)
+            logger.info(f"[EditorSession] Refresh job {job['job_id']} started for session {session_id}")
+            return jsonify({'success': True, 'job': job}), 202
 
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-
-        updated_count = 0
-        for fresh_post in fresh_posts:
-            # Match with original post by id
-            if 'id' not in fresh_post or fresh_post.get('error'):
-                continue
-
-            post_id = fresh_post['id']
-
-            # Extract outgoing links from fresh content
-            content_html = fresh_post.get('content', '')
-            post_url = fresh_post.get('url', '')
-            outgoing_links = extract_outgoing_links(content_html, post_url)
-
-            if outgoing_links:
-                outgoing_links_json = json.dumps(outgoing_links)
-
-                c.execute('''
-                    UPDATE wp_editor_posts
-                    SET outgoing_links = ?
-                    WHERE session_id = ? AND post_id = ?
-                ''', (outgoing_links_json, session_id, post_id))
-
-                updated_count += 1
-                logger.info(f"[EditorSession] Updated outgoing_links for post {post_id}")
-
-        conn.commit()
-        conn.close()
-
-        logger.info(f"[EditorSession] Refreshed outgoing_links for {updated_count}/{len(posts)} posts")
+        # Fetch (via the local post index), parse and write link rows as a single pipeline
+        summary = refresh_session_links(session_id, wp_site_id, wp_service, posts, incremental)
+        updated_count = summary['updated_count']
 
         # Return updated session
         updated_session = get_editor_session(session_id)
@@ -249,6 +256,10 @@ def refresh_outgoing_links(session_id):
             'success': True,
             'updated_count': updated_count,
             'total_posts': len(posts),
+            'fetched': summary['fetched'],
+            'skipped': summary['skipped'],
+            'incremental': summary['incremental'],
+            'errors': summary['errors'],
             'session': updated_session
         }), 200
 
@@ -256,6 +267,22 @@ def refresh_outgoing_links(session_id):
         logger.error(f"[EditorSession] Error refreshing outgoing links: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/api/editor-session/refresh-jobs/<job_id>', methods=['GET'])
+def get_refresh_job_status(job_id):
+    """Status of a background outgoing-link refresh (result included when done)"""
+    try:
+        from services.editor_pipeline import get_refresh_job
+
+        job = get_refresh_job(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+
+        return jsonify({'success': True, 'job': job}), 200
+
+    except Exception as e:
+        logger.error(f"[EditorSession] Error getting refresh job: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @bp.route('/api/editor-session/<session_id>/snapshot', methods=['POST'])
 def save_snapshot(session_id):
     """Save/overwrite snapshot from working session"""
@@ -3,11 +3,23 @@ WordPress REST API routes
 Handles WordPress post operations via REST API with Application Password auth
 Uses WordPressService for all API interactions
 """
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import json
 import logging
-from models.database import save_post_outgoing_url, get_post_outgoing_url
+import time
+from models.database import save_post_outgoing_url, get_post_outgoing_url, get_editor_session
 from utils.html_parser import extract_outgoing_links
-from services.wordpress_service import create_wordpress_service
+from services.wordpress_service import (
+    WordPressService,
+    create_wordpress_service,
+    get_wordpress_service,
+    get_wordpress_service_stats,
+    WRITE_WAIT_TIMEOUT
+)
+from services.wordpress_async import fetch_posts_sync
+from services.post_index import fetch_posts_indexed, iter_posts_indexed
+from services.link_rewrite import LinkRule, rewrite_post_links
 
 logger = logging.getLogger(__name__)
 bp = Blueprint('wordpress', __name__)
@@ -25,11 +37,12 @@ def test_wordpress_connection():
         if not all([site_url, username, app_password]):
             return jsonify({"error": "Missing required fields"}), 400
 
-        # Create WordPress service
+        # One-off service: credentials may not be saved yet, so keep them out of the shared registry
         wp_service = create_wordpress_service(site_url, username, app_password)
 
         # Test connection
         success, result = wp_service.test_connection()
+        wp_service.close()
 
         if success:
             return jsonify({
@@ -48,47 +61,92 @@ def test_wordpress_connection():
         return jsonify({"error": str(e)}), 500
 
 
+def _enrich_post(post, wp_site_id=None):
+    """Add post_id, legacy outgoing_url and parsed outgoing_links to a fetched post (in place)"""
+    if 'id' in post and post['id']:  # Valid post
+        post_id = post['id']
+        post['post_id'] = post_id  # Add post_id field for frontend compatibility
+        url = post.get('url', '')
+
+        # Get outgoing_url from our database (legacy field)
+        if wp_site_id and post_id:
+            db_outgoing = get_post_outgoing_url(wp_site_id, post_id)
+            post['outgoing_url'] = db_outgoing.get('outgoing_url', '') if db_outgoing else ''
+        else:
+            post['outgoing_url'] = ''
+
+        # Extract outgoing links from content
+        content_html = post.get('content', '')
+        outgoing_links = extract_outgoing_links(content_html, url)
+        post['outgoing_links'] = outgoing_links or []
+    return post
+
+
+def _parse_posts_request(data):
+    """
+    Validate a posts request body
+
+    Returns:
+        Tuple of (params dict, None) or (None, error message)
+    """
+    site_url = data.get('site_url', '').rstrip('/')
+    username = data.get('username')
+    app_password = data.get('app_password')
+    urls = data.get('urls', [])
+
+    if not all([site_url, username, app_password]):
+        return None, "Missing authentication credentials"
+
+    if not urls:
+        return None, "No URLs provided"
+
+    # Optional field projection; id, url and content are always needed for enrichment
+    fields = data.get('fields')
+    if fields is not None:
+        fields = tuple(dict.fromkeys(['id', 'url', 'content', *fields]))
+        try:
+            WordPressService._projection_params(fields)
+        except ValueError as e:
+            return None, str(e)
+
+    return {
+        'site_url': site_url,
+        'username': username,
+        'app_password': app_password,
+        'urls': urls,
+        'wp_site_id': data.get('wp_site_id'),  # ID của WordPress site từ database
+        'fields': fields
+    }, None
+
+
 @bp.route("/api/wordpress/posts", methods=["POST"])
 def get_wordpress_posts():
     """Get WordPress posts by URLs - with concurrent execution"""
     try:
-        data = request.json
-        site_url = data.get('site_url', '').rstrip('/')
-        username = data.get('username')
-        app_password = data.get('app_password')
-        urls = data.get('urls', [])
-        wp_site_id = data.get('wp_site_id')  # ID của WordPress site từ database
-
-        if not all([site_url, username, app_password]):
-            return jsonify({"error": "Missing authentication credentials"}), 400
-
-        if not urls:
-            return jsonify({"error": "No URLs provided"}), 400
-
-        # Create WordPress service
-        wp_service = create_wordpress_service(site_url, username, app_password)
-
-        # Fetch posts concurrently
-        posts_data = wp_service.fetch_posts_concurrent(urls, max_workers=10)
+        params, error = _parse_posts_request(request.json)
+        if error:
+            return jsonify({"error": error}), 400
+
+        urls = params['urls']
+        wp_site_id = params['wp_site_id']
+        fields = params['fields']
+
+        # Get shared WordPress service (pooled connections)
+        wp_service = get_wordpress_service(params['site_url'], params['username'], params['app_password'])
+
+        # Fetch posts concurrently (asyncio client, bounded per host);
+        # with a saved site, URLs are resolved through the local post index first
+        if wp_site_id:
+            posts_data = fetch_posts_indexed(
+                wp_site_id, wp_service, urls, fields=fields,
+                fallback=lambda missing: fetch_posts_sync(wp_service, missing, fields=fields)
+            )
+        else:
+            posts_data = fetch_posts_sync(wp_service, urls, fields=fields)
 
         # Enrich posts with additional data (outgoing_url from DB and extract links)
         for post in posts_data:
-            if 'id' in post and post['id']:  # Valid post
-                post_id = post['id']
-                post['post_id'] = post_id  # Add post_id field for frontend compatibility
-                url = post.get('url', '')
-
-                # Get outgoing_url from our database (legacy field)
-                if wp_site_id and post_id:
-                    db_outgoing = get_post_outgoing_url(wp_site_id, post_id)
-                    post['outgoing_url'] = db_outgoing.get('outgoing_url', '') if db_outgoing else ''
-                else:
-                    post['outgoing_url'] = ''
-
-                # Extract outgoing links from content
-                content_html = post.get('content', '')
-                outgoing_links = extract_outgoing_links(content_html, url)
-                post['outgoing_links'] = outgoing_links
+            _enrich_post(post, wp_site_id)
 
         return jsonify({
             "total": len(posts_data),
@@ -100,9 +158,108 @@ def get_wordpress_posts():
         return jsonify({"error": str(e)}), 500
 
 
+@bp.route("/api/wordpress/posts/stream", methods=["POST"])
+def stream_wordpress_posts():
+    """
+    Get WordPress posts by URLs as NDJSON
+    Same body as /api/wordpress/posts. Each enriched post is written as one
+    line {"post": {...}} as soon as it is fetched; the last line is
+    {"summary": {"total", "fetched", "errors", "elapsed"}}.
+    """
+    try:
+        params, error = _parse_posts_request(request.json)
+        if error:
+            return jsonify({"error": error}), 400
+
+        urls = params['urls']
+        wp_site_id = params['wp_site_id']
+        fields = params['fields']
+        wp_service = get_wordpress_service(params['site_url'], params['username'], params['app_password'])
+    except Exception as e:
+        logger.error(f"Error in stream_wordpress_posts: {e}")
+        return jsonify({"error": str(e)}), 500
+
+    def generate():
+        start_time = time.time()
+        fetched = 0
+        errors = 0
+        try:
+            if wp_site_id:
+                posts = iter_posts_indexed(wp_site_id, wp_service, urls, fields=fields)
+            else:
+                posts = wp_service.iter_posts_concurrent(urls, max_workers=10, fields=fields)
+
+            for post in posts:
+                if post.get('error'):
+                    errors += 1
+                else:
+                    fetched += 1
+                yield json.dumps({"post": _enrich_post(post, wp_site_id)}, ensure_ascii=False) + '\n'
+        except Exception as e:
+            logger.error(f"Error streaming WordPress posts: {e}")
+            yield json.dumps({"error": str(e)}, ensure_ascii=False) + '\n'
+
+        yield json.dumps({"summary": {
+            "total": len(urls),
+            "fetched": fetched,
+            "errors": errors,
+            "elapsed": round(time.time() - start_time, 2)
+        }}) + '\n'
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}  # Tắt buffer của nginx
+    )
+
+
+def _build_update_data(data):
+    """Map editor fields of a post update request to the WordPress REST update body"""
+    update_data = {}
+
+    if 'title' in data:
+        update_data['title'] = data['title']
+    if 'content' in data:
+        update_data['content'] = data['content']
+    if 'excerpt' in data:
+        update_data['excerpt'] = data['excerpt']
+    if 'status' in data:
+        update_data['status'] = data['status']
+    if 'categories' in data:
+        # Extract category IDs
+        update_data['categories'] = [cat['id'] if isinstance(cat, dict) else cat for cat in data['categories']]
+
+    # Update SEO fields if using Yoast
+    if 'seo_title' in data or 'seo_description' in data:
+        update_data['yoast_wpseo_title'] = data.get('seo_title', '')
+        update_data['yoast_wpseo_metadesc'] = data.get('seo_description', '')
+
+    return update_data
+
+
+def _save_outgoing_url(post_id, data, wp_site_id=None):
+    """Store outgoing_url in our database (not WordPress meta)"""
+    if 'outgoing_url' not in data:
+        return
+    wp_site_id = data.get('wp_site_id', wp_site_id)
+    post_url = data.get('url', '')
+    outgoing_url = data['outgoing_url']
+    logger.info(f"Saving outgoing_url for post {post_id}: wp_site_id={wp_site_id}, url={post_url}, outgoing_url={outgoing_url}")
+    if wp_site_id:
+        save_post_outgoing_url(wp_site_id, post_id, post_url, outgoing_url)
+        logger.info(f"Saved outgoing_url to database for post {post_id}")
+    else:
+        logger.warning(f"wp_site_id is missing, cannot save outgoing_url for post {post_id}")
+
+
 @bp.route("/api/wordpress/post/<int:post_id>", methods=["PUT"])
 def update_wordpress_post(post_id):
-    """Update a WordPress post"""
+    """
+    Update a WordPress post
+    Writes go through the site's write queue (per-post ordering, rapid saves
+    of the same post merged). With "wait": false the request returns 202 as
+    soon as the update is queued.
+    """
     try:
         data = request.json
         site_url = data.get('site_url', '').rstrip('/')
@@ -112,43 +269,33 @@ def update_wordpress_post(post_id):
         if not all([site_url, username, app_password]):
             return jsonify({"error": "Missing authentication credentials"}), 400
 
-        # Prepare update data
-        update_data = {}
-
-        if 'title' in data:
-            update_data['title'] = data['title']
-        if 'content' in data:
-            update_data['content'] = data['content']
-        if 'excerpt' in data:
-            update_data['excerpt'] = data['excerpt']
-        if 'status' in data:
-            update_data['status'] = data['status']
-        if 'categories' in data:
-            # Extract category IDs
-            update_data['categories'] = [cat['id'] if isinstance(cat, dict) else cat for cat in data['categories']]
-
-        # Update SEO fields if using Yoast
-        if 'seo_title' in data or 'seo_description' in data:
-            update_data['yoast_wpseo_title'] = data.get('seo_title', '')
-            update_data['yoast_wpseo_metadesc'] = data.get('seo_description', '')
-
-        # Store outgoing_url in our database (not WordPress meta)
-        if 'outgoing_url' in data:
-            wp_site_id = data.get('wp_site_id')
-            post_url = data.get('url', '')
-            outgoing_url = data['outgoing_url']
-            logger.info(f"Saving outgoing_url for post {post_id}: wp_site_id={wp_site_id}, url={post_url}, outgoing_url={outgoing_url}")
-            if wp_site_id:
-                save_post_outgoing_url(wp_site_id, post_id, post_url, outgoing_url)
-                logger.info(f"Saved outgoing_url to database for post {post_id}")
-            else:
-                logger.warning(f"wp_site_id is missing, cannot save outgoing_url for post {post_id}")
+        update_data = _build_update_data(data)
+        _save_outgoing_url(post_id, data)
 
-        # Create WordPress service and update post
-        wp_service = create_wordpress_service(site_url, username, app_password)
-        success, result = wp_service.update_post(post_id, update_data)
+        # Get shared WordPress service and queue the update
+        wp_service = get_wordpress_service(site_url, username, app_password)
+        future = wp_service.write_queue.submit(post_id, update_data)
 
-        if success:
+        wait = data.get('wait', True) is not False
+        try:
+            success, result = future.result(timeout=WRITE_WAIT_TIMEOUT if wait else 0)
+        except FutureTimeoutError:
+            # Update vẫn nằm trong queue và sẽ được ghi
+            return jsonify({
+                "success": True,
+                "queued": True,
+                "message": "Update queued",
+                "queue": wp_service.write_queue.stats()
+            }), 202
+
+        if success and result.get('skipped'):
+            return jsonify({
+                "success": True,
+                "skipped": True,
+                "message": "No changes to save",
+                "post": result
+            }), 200
+        elif success:
             logger.info(f"Updated post {post_id}")
             return jsonify({
                 "success": True,
@@ -167,9 +314,131 @@ def update_wordpress_post(post_id):
         return jsonify({"error": str(e)}), 500
 
 
+@bp.route("/api/wordpress/posts/bulk-update", methods=["POST"])
+def bulk_update_wordpress_posts():
+    """
+    Update many WordPress posts in one call
+    Body: credentials, optional wp_site_id, and "posts": a list of objects with
+    "post_id" (or "id") plus the same fields as PUT /api/wordpress/post/<id>.
+    A post listed more than once is updated once, with its last entry.
+    Sent through the WordPress batch API in groups of 25 when available,
+    ordered with writes already queued for the same posts.
+    One result per post, in the order posts first appear in "posts".
+    """
+    try:
+        data = request.json
+        site_url = data.get('site_url', '').rstrip('/')
+        username = data.get('username')
+        app_password = data.get('app_password')
+        posts = data.get('posts', [])
+        wp_site_id = data.get('wp_site_id')
+
+        if not all([site_url, username, app_password]):
+            return jsonify({"error": "Missing authentication credentials"}), 400
+
+        if not posts:
+            return jsonify({"error": "No posts provided"}), 400
+
+        if any(not (post.get('post_id') or post.get('id')) for post in posts):
+            return jsonify({"error": "Every post needs a post_id"}), 400
+
+        # Một post_id xuất hiện nhiều lần: chỉ giữ lần cuối, ở vị trí lần đầu
+        latest = {}
+        for post in posts:
+            latest[post.get('post_id') or post.get('id')] = post
+
+        results = []
+        updates = []
+        for post_id, post in latest.items():
+            _save_outgoing_url(post_id, post, wp_site_id)
+            update_data = _build_update_data(post)
+            if update_data:
+                updates.append((post_id, update_data))
+                results.append(None)  # Điền bằng kết quả update_posts_bulk bên dưới
+            else:
+                # Chỉ có outgoing_url: không cần gửi lên WordPress
+                results.append({'post_id': post_id, 'success': True, 'skipped': True})
+
+        wp_service = get_wordpress_service(site_url, username, app_password)
+        sent = iter(wp_service.update_posts_bulk(updates, max_workers=5))
+        results = [result or next(sent) for result in results]
+
+        updated = sum(1 for result in results if result['success'] and not result.get('skipped'))
+        unchanged = sum(1 for result in results if result.get('skipped'))
+        failed = sum(1 for result in results if not result['success'])
+        logger.info(f"Bulk updated {updated}/{len(results)} posts on {site_url} ({unchanged} unchanged)")
+        return jsonify({
+            "total": len(results),
+            "updated": updated,
+            "skipped": unchanged,
+            "failed": failed,
+            "batch": wp_service.batch_supported,
+            "results": results
+        }), 200
+
+    except Exception as e:
+        logger.error(f"Error in bulk update: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@bp.route("/api/wordpress/posts/replace-links", methods=["POST"])
+def replace_links_in_posts():
+    """
+    Find and replace links across many posts
+    Body: credentials, "post_ids" (or "session_id" to use the posts of an
+    editor session), "rule" ({"target": "url"|"domain"|"anchor", "pattern",
+    optional "regex", "replace_url" / "replace_domain", "replace_anchor"})
+    and "dry_run" (default true: only preview the affected posts).
+    Optional "expected_modified" ({post_id: modified} from the preview):
+    posts edited since then are not saved and come back with "conflict".
+    Only matching <a> elements of the raw content are rewritten.
+    """
+    try:
+        data = request.json
+        site_url = data.get('site_url', '').rstrip('/')
+        username = data.get('username')
+        app_password = data.get('app_password')
+        session_id = data.get('session_id')
+        post_ids = data.get('post_ids') or []
+
+        if not all([site_url, username, app_password]):
+            return jsonify({"error": "Missing authentication credentials"}), 400
+
+        try:
+            rule = LinkRule.from_dict(data.get('rule'))
+            post_ids = [int(post_id) for post_id in post_ids]
+            expected_modified = {int(post_id): modified
+                                 for post_id, modified in (data.get('expected_modified') or {}).items()}
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+
+        if not post_ids and session_id:
+            session = get_editor_session(session_id)
+            if not session:
+                return jsonify({"error": "Session not found"}), 404
+            post_ids = [post['post_id'] for post in session['posts']]
+
+        if not post_ids:
+            return jsonify({"error": "No posts provided"}), 400
+
+        wp_service = get_wordpress_service(site_url, username, app_password)
+        summary = rewrite_post_links(wp_service, post_ids, rule,
+                                     dry_run=data.get('dry_run', True) is not False,
+                                     session_id=session_id, expected_modified=expected_modified)
+        return jsonify(summary), 200
+
+    except Exception as e:
+        logger.error(f"Error replacing links: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
 @bp.route("/api/wordpress/categories", methods=["POST"])
 def get_wordpress_categories():
-    """Get all categories from WordPress site"""
+    """
+    Get categories from WordPress site (full catalog, cached per site)
+    Optional body fields: "search" (name fragment), "limit" (default: all,
+    or 50 when searching), "refresh" (reload the catalog)
+    """
     try:
         data = request.json
         site_url = data.get('site_url', '').rstrip('/')
@@ -179,13 +448,27 @@ def get_wordpress_categories():
         if not all([site_url, username, app_password]):
             return jsonify({"error": "Missing authentication credentials"}), 400
 
-        # Create WordPress service
-        wp_service = create_wordpress_service(site_url, username, app_password)
+        search = (data.get('search') or '').strip()
+        refresh = bool(data.get('refresh', False))
+        limit = data.get('limit')
+        try:
+            limit = int(limit) if limit is not None else (50 if search else None)
+        except (TypeError, ValueError):
+            return jsonify({"error": "limit must be an integer"}), 400
+
+        # Get shared WordPress service (pooled connections)
+        wp_service = get_wordpress_service(site_url, username, app_password)
 
         # Get categories
-        categories = wp_service.get_categories(per_page=100)
+        if search or limit is not None:
+            categories, total = wp_service.search_categories(search, limit=limit if limit is not None else 50,
+                                                             refresh=refresh)
+        else:
+            categories = wp_service.get_categories(per_page=100, refresh=refresh)
+            total = len(categories)
 
         return jsonify({
+            "total": total,
             "categories": [
                 {
                     'id': cat.get('id'),
@@ -200,3 +483,53 @@ def get_wordpress_categories():
     except Exception as e:
         logger.error(f"Error fetching categories: {e}")
         return jsonify({"error": str(e)}), 500
+
+
+@bp.route("/api/wordpress/categories/invalidate", methods=["POST"])
+def invalidate_wordpress_categories():
+    """Drop the cached category catalog of a site (e.g. after adding categories in WordPress)"""
+    try:
+        data = request.json
+        site_url = data.get('site_url', '').rstrip('/')
+        username = data.get('username')
+        app_password = data.get('app_password')
+
+        if not all([site_url, username, app_password]):
+            return jsonify({"error": "Missing authentication credentials"}), 400
+
+        get_wordpress_service(site_url, username, app_password).categories.invalidate()
+        return jsonify({"success": True}), 200
+
+    except Exception as e:
+        logger.error(f"Error invalidating categories: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@bp.route("/api/wordpress/write-queue", methods=["POST"])
+def get_write_queue_status():
+    """Depth and status of a site's post write queue"""
+    try:
+        data = request.json
+        site_url = data.get('site_url', '').rstrip('/')
+        username = data.get('username')
+        app_password = data.get('app_password')
+
+        if not all([site_url, username, app_password]):
+            return jsonify({"error": "Missing authentication credentials"}), 400
+
+        wp_service = get_wordpress_service(site_url, username, app_password)
+        return jsonify({"site_url": wp_service.site_url, "queue": wp_service.write_queue.stats()}), 200
+
+    except Exception as e:
+        logger.error(f"Error getting write queue status: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@bp.route("/api/wordpress/service-stats", methods=["GET"])
+def get_wordpress_service_stats_route():
+    """Runtime statistics of shared WordPress services (connection pool, post type routing, write queue)"""
+    try:
+        return jsonify({"services": get_wordpress_service_stats()}), 200
+    except Exception as e:
+        logger.error(f"Error getting WordPress service stats: {e}")
+        return jsonify({"error": str(e)}), 500
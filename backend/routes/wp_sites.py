@@ -1,12 +1,21 @@
 from flask import Blueprint, request, jsonify
+import threading
 from models.database import (
     add_wp_site,
     get_all_wp_sites,
     get_active_wp_site,
     set_active_wp_site,
     update_wp_site,
-    delete_wp_site
+    delete_wp_site,
+    get_wp_site_by_id,
+    get_post_index_state,
+    delete_post_index,
+    get_site_health,
+    delete_site_health
 )
+from services.wordpress_service import get_wordpress_service
+from services.post_index import sync_post_index, start_post_index_sync, is_sync_running
+from services.site_health import probe_all_sites, request_site_health_probe, get_prober_state
 from utils.logger import logger
 from utils.validators import validate_url, validate_domain, sanitize_string
 
@@ -213,9 +222,87 @@ def delete_site(site_id):
     try:
         success = delete_wp_site(site_id)
         if success:
+            delete_post_index(site_id)
+            delete_site_health(site_id)
             return jsonify({"success": True}), 200
         else:
             return jsonify({"success": False, "error": "Site not found"}), 404
     except Exception as e:
         logger.error(f"Error deleting WordPress site: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
+
+@bp.route("/api/wp-sites/<int:site_id>/post-index", methods=["GET"])
+def get_site_post_index(site_id):
+    """Trạng thái post index của WordPress site"""
+    try:
+        if not get_wp_site_by_id(site_id):
+            return jsonify({"success": False, "error": "Site not found"}), 404
+
+        state = get_post_index_state(site_id)
+        state['running'] = is_sync_running(site_id)
+        return jsonify({"success": True, "post_index": state}), 200
+    except Exception as e:
+        logger.error(f"Error getting post index state: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@bp.route("/api/wp-sites/<int:site_id>/post-index/sync", methods=["POST"])
+def sync_site_post_index(site_id):
+    """
+    Sync post index của WordPress site
+    Body (optional): {"full": false, "wait": false}
+    full: sync lại toàn bộ (mặc định incremental theo modified_after)
+    wait: chờ sync xong và trả về kết quả (mặc định chạy background)
+    """
+    try:
+        site = get_wp_site_by_id(site_id)
+        if not site:
+            return jsonify({"success": False, "error": "Site not found"}), 404
+
+        data = request.get_json(silent=True) or {}
+        full = bool(data.get('full', False))
+        wp_service = get_wordpress_service(site['site_url'], site['username'], site['app_password'])
+
+        if data.get('wait'):
+            if is_sync_running(site_id):
+                return jsonify({"success": False, "error": "Sync already running"}), 409
+            summary = sync_post_index(site_id, wp_service, full=full)
+            return jsonify({"success": True, "summary": summary}), 200
+
+        started = start_post_index_sync(site_id, wp_service, full=full)
+        return jsonify({"success": True, "started": started}), 202
+    except Exception as e:
+        logger.error(f"Error syncing post index: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@bp.route("/api/wp-sites/health", methods=["GET"])
+def get_wp_sites_health():
+    """Kết quả kiểm tra kết nối gần nhất của tất cả sites (từ background prober, không gọi WordPress)"""
+    try:
+        return jsonify({"success": True, "sites": get_site_health(), "prober": get_prober_state()}), 200
+    except Exception as e:
+        logger.error(f"Error getting WordPress sites health: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@bp.route("/api/wp-sites/health/refresh", methods=["POST"])
+def refresh_wp_sites_health():
+    """
+    Kiểm tra lại kết nối của tất cả sites
+    Body (optional): {"wait": false}
+    wait: chờ kiểm tra xong và trả về kết quả (mặc định chạy background)
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+
+        if data.get('wait'):
+            summary = probe_all_sites()
+            if summary.get('skipped'):
+                return jsonify({"success": False, "error": summary['reason']}), 409
+            return jsonify({"success": True, "summary": summary, "sites": get_site_health()}), 200
+
+        if not request_site_health_probe():
+            # Prober không chạy (tắt bằng SITE_HEALTH_INTERVAL=0): kiểm tra một lần ở background
+            threading.Thread(target=probe_all_sites, name="site-health-probe", daemon=True).start()
+        return jsonify({"success": True, "started": True}), 202
+    except Exception as e:
+        logger.error(f"Error refreshing WordPress sites health: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
@@ -0,0 +1,310 @@
+"""
+Editor session pipeline
+Builds and refreshes editor sessions on the server. Posts are parsed on worker
+threads as soon as they arrive from WordPress and the resulting link rows are
+written in batched transactions; post content is dropped right after parsing,
+so memory does not grow with the number of posts
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from models.wp_editor_sessions import (
+    start_editor_session,
+    add_editor_posts,
+    update_editor_outgoing_links,
+    delete_editor_session,
+)
+from services.post_index import iter_posts_indexed
+from services.wordpress_service import (
+    WordPressService,
+    WordPressAPIError,
+    get_wordpress_service,
+    EDITOR_FIELDS,
+    LINK_FIELDS,
+)
+from utils.html_parser import extract_outgoing_links
+
+logger = logging.getLogger(__name__)
+
+SESSION_BATCH_SIZE = 50  # Rows written per transaction
+PARSE_WORKERS = 4
+MAX_PENDING_PARSES = PARSE_WORKERS * 4  # Posts chờ parse tối đa (giữ bộ nhớ ổn định)
+REFRESH_JOB_HISTORY = 100  # Số refresh jobs giữ lại để xem trạng thái
+
+_refresh_jobs = OrderedDict()
+_jobs_lock = threading.Lock()
+
+
+def editor_row(post: Dict) -> Dict:
+    """Session row for a fetched post: metadata plus outgoing links (content is dropped)"""
+    url = post.get('url', '')
+    content = post.pop('content', '')
+    return {
+        'id': post['id'],
+        'url': url,
+        'title': post.get('title', ''),
+        'status': post.get('status', ''),
+        'date_modified': post.get('date_modified'),
+        'outgoing_links': extract_outgoing_links(content, url)
+    }
+
+
+def run_link_pipeline(posts: Iterable[Dict], write_batch: Callable[[List[Dict]], int],
+                      batch_size: int = SESSION_BATCH_SIZE) -> Tuple[int, List[Dict]]:
+    """
+    Parse fetched posts on worker threads and write the rows in batches
+
+    Fetching, parsing and writing overlap: each post is handed to a parse
+    worker as soon as `posts` yields it, and rows are flushed through
+    `write_batch` every `batch_size` parsed posts. Writes stay on the calling
+    thread (one sqlite writer).
+
+    Args:
+        posts: Iterable of fetched post dicts (error entries are collected)
+        write_batch: callable(rows) -> number of rows written
+        batch_size: Rows per write_batch call
+
+    Returns:
+        Tuple of (rows written, error entries [{url, error}])
+    """
+    written = 0
+    errors = []
+    batch = []
+    pending = {}
+
+    def collect(done):
+        nonlocal written, batch
+        for future in done:
+            url = pending.pop(future)
+            try:
+                batch.append(future.result())
+            except Exception as e:
+                logger.warning(f"[EditorPipeline] Failed to parse {url}: {e}")
+                errors.append({'url': url, 'error': f'Parse error: {e}'})
+
+        while len(batch) >= batch_size:
+            written += write_batch(batch[:batch_size])
+            batch = batch[batch_size:]
+
+    with ThreadPoolExecutor(max_workers=PARSE_WORKERS) as executor:
+        for post in posts:
+            if post.get('error') or not post.get('id'):
+                errors.append({'url': post.get('url'), 'error': post.get('error', 'Post not found')})
+                continue
+
+            pending[executor.submit(editor_row, post)] = post.get('url')
+            post = None  # Chỉ worker giữ post; content bị bỏ ngay sau khi parse
+
+            if len(pending) >= MAX_PENDING_PARSES:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            else:
+                done = [future for future in pending if future.done()]
+            collect(done)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            collect(done)
+
+    if batch:
+        written += write_batch(batch)
+
+    return written, errors
+
+
+def create_session_from_urls(wp_site: Dict, urls: List[str], session_name: Optional[str] = None) -> Dict:
+    """
+    Fetch the posts of a URL list into a new working session
+
+    Args:
+        wp_site: wp_sites row (id, site_url, username, app_password)
+        urls: Post URLs
+        session_name: Optional session name
+
+    Returns:
+        Summary dict (session_id, domain, total_posts, requested, errors, elapsed);
+        session_id is None when no post could be fetched
+    """
+    start_time = time.time()
+    wp_site_id = wp_site['id']
+    domain = urlparse(urls[0]).hostname or urlparse(wp_site['site_url']).hostname
+    session_id = str(uuid.uuid4())
+
+    start_editor_session(session_id, wp_site_id, domain, session_name)
+    wp_service = get_wordpress_service(wp_site['site_url'], wp_site['username'], wp_site['app_password'])
+
+    try:
+        total, errors = run_link_pipeline(
+            iter_posts_indexed(wp_site_id, wp_service, urls, fields=EDITOR_FIELDS),
+            lambda rows: add_editor_posts(session_id, wp_site_id, rows),
+            batch_size=SESSION_BATCH_SIZE
+        )
+    except Exception:
+        delete_editor_session(session_id)
+        raise
+
+    if total == 0:
+        delete_editor_session(session_id)
+        session_id = None
+
+    elapsed = round(time.time() - start_time, 2)
+    logger.info(f"[EditorPipeline] Session {session_id} for {domain}: {total}/{len(urls)} posts, "
+                f"{len(errors)} errors in {elapsed}s")
+    return {
+        'session_id': session_id,
+        'domain': domain,
+        'total_posts': total,
+        'requested': len(urls),
+        'errors': errors,
+        'elapsed': elapsed
+    }
+
+
+def changed_session_posts(wp_service: WordPressService, posts: List[Dict]) -> List[Dict]:
+    """
+    Session posts whose WordPress modified date differs from the stored date_modified
+
+    Only id and modified are requested (batched include= lookups). Posts
+    WordPress no longer returns by id are kept so the URL fetch reports them.
+
+    Args:
+        wp_service: WordPressService of the site
+        posts: Session posts (post_id, url, date_modified)
+
+    Returns:
+        Subset of posts that need a full fetch
+
+    Raises:
+        WordPressAPIError: If a lookup fails
+    """
+    modified = wp_service.fetch_modified_dates([post['post_id'] for post in posts])
+    return [
+        post for post in posts
+        if post['post_id'] not in modified
+        or not post.get('date_modified')
+        or modified[post['post_id']] != post['date_modified']
+    ]
+
+
+def refresh_session_links(session_id: str, wp_site_id: int, wp_service: WordPressService,
+                          posts: List[Dict], incremental: bool = True) -> Dict:
+    """
+    Re-fetch session posts and rewrite their outgoing links
+
+    Incremental by default: WordPress is first asked for the modified date of
+    every post and only posts modified since their stored date_modified are
+    fetched and parsed. A changed post whose content has no outgoing links
+    is stored with an empty list; a post whose content could not be parsed
+    is not written (reported in errors) so it is retried next refresh.
+
+    Args:
+        session_id: Editor session ID
+        wp_site_id: WordPress site ID of the session
+        wp_service: WordPressService of the site
+        posts: Session posts (post_id, url, date_modified)
+        incremental: Skip posts that did not change
+
+    Returns:
+        Summary dict (updated_count, fetched, skipped, incremental, errors, elapsed)
+    """
+    start_time = time.time()
+
+    to_fetch = posts
+    if incremental:
+        try:
+            to_fetch = changed_session_posts(wp_service, posts)
+        except WordPressAPIError as e:
+            logger.warning(f"[EditorPipeline] Modified-date lookup failed, refreshing all posts: {e}")
+            incremental = False
+
+    parse_errors = []
+
+    def write_batch(rows):
+        # Post đã sửa mà không còn link vẫn ghi [] để links cũ không bị giữ lại;
+        # post không parse được (None) thì bỏ qua, không ghi cả date_modified
+        parsed = []
+        for row in rows:
+            if row['outgoing_links'] is None:
+                parse_errors.append({'url': row['url'], 'error': 'Parse error: could not read content'})
+            else:
+                parsed.append(row)
+        return update_editor_outgoing_links(session_id, parsed)
+
+    urls = [post['url'] for post in to_fetch]
+    updated, errors = 0, []
+    if urls:
+        updated, errors = run_link_pipeline(
+            iter_posts_indexed(
+                wp_site_id, wp_service, urls, fields=LINK_FIELDS,
+                fallback=lambda missing: wp_service.iter_posts_concurrent(missing, max_workers=5, fields=LINK_FIELDS)
+            ),
+            write_batch
+        )
+        errors.extend(parse_errors)
+
+    elapsed = round(time.time() - start_time, 2)
+    skipped = len(posts) - len(to_fetch)
+    logger.info(f"[EditorPipeline] Refreshed outgoing_links for {updated}/{len(posts)} posts "
+                f"of session {session_id} ({skipped} unchanged) in {elapsed}s")
+    return {
+        'updated_count': updated,
+        'fetched': len(to_fetch),
+        'skipped': skipped,
+        'incremental': incremental,
+        'errors': errors,
+        'elapsed': elapsed
+    }
+
+
+def start_refresh_job(session_id: str, wp_site_id: int, wp_service: WordPressService,
+                      posts: List[Dict], incremental: bool = True) -> Dict:
+    """
+    Run refresh_session_links in a background thread (one refresh per session at a time)
+
+    Returns:
+        Job dict; the running job of the session if there is one
+    """
+    with _jobs_lock:
+        for job in _refresh_jobs.values():
+            if job['session_id'] == session_id and job['status'] == 'running':
+                return dict(job)
+
+        job = {
+            'job_id': str(uuid.uuid4()),
+            'session_id': session_id,
+            'status': 'running',
+            'result': None,
+            'error': None,
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'finished_at': None
+        }
+        _refresh_jobs[job['job_id']] = job
+        while len(_refresh_jobs) > REFRESH_JOB_HISTORY:
+            _refresh_jobs.popitem(last=False)
+
+    def run():
+        try:
+            result = refresh_session_links(session_id, wp_site_id, wp_service, posts, incremental)
+            update = {'status': 'done', 'result': result}
+        except Exception as e:
+            logger.error(f"[EditorPipeline] Refresh job {job['job_id']} failed: {e}")
+            update = {'status': 'failed', 'error': str(e)}
+
+        with _jobs_lock:
+            job.update(update, finished_at=datetime.now(timezone.utc).isoformat())
+
+    threading.Thread(target=run, name=f"link-refresh-{session_id}", daemon=True).start()
+    return dict(job)
+
+
+def get_refresh_job(job_id: str) -> Optional[Dict]:
+    """Status of a refresh job (None if unknown or expired)"""
+    with _jobs_lock:
+        job = _refresh_jobs.get(job_id)
+        return dict(job) if job else None
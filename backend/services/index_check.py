@@ -0,0 +1,83 @@
+"""
+Index checking of URL and domain inputs
+Bare domains are expanded through their sitemap in parallel and checked as
+soon as each crawl finishes; results keep the order of the inputs
+"""
+import asyncio
+import math
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from services.serper_service import check_urls
+from services.sitemap_parser import fetch_sitemap_urls
+from utils.logger import logger
+
+BATCH_SIZE = 10  # Số URL xử lý song song mỗi batch
+DOMAIN_WORKERS = 5  # Số domain crawl sitemap song song
+
+
+async def process_batches(urls, batch_lock=None):
+    """
+    Check URLs theo từng batch.
+    batch_lock (asyncio.Lock) được chia sẻ khi nhiều danh sách URL được check
+    đồng thời, để tổng số request Serper song song vẫn là BATCH_SIZE.
+    """
+    results = []
+    total_batches = math.ceil(len(urls) / BATCH_SIZE)
+    for i in range(total_batches):
+        batch = urls[i * BATCH_SIZE:(i + 1) * BATCH_SIZE]
+        logger.info(f"Batch {i+1}/{total_batches}: {len(batch)} URLs")
+        if batch_lock:
+            async with batch_lock:
+                batch_results = await check_urls(batch)
+        else:
+            batch_results = await check_urls(batch)
+        results.extend(batch_results)
+    return results
+
+
+async def expand_and_check(entries, domain_filters=None):
+    """
+    Crawl sitemap của các domain song song và check index theo kiểu pipeline:
+    URL của một domain được check ngay khi sitemap của domain đó crawl xong,
+    không chờ các domain khác.
+    entries: list URL (bắt đầu bằng http) hoặc domain, theo thứ tự nhập
+    domain_filters: dict {domain: SitemapFilter} áp dụng khi crawl sitemap
+    Returns: kết quả check theo đúng thứ tự của entries (domain được thay bằng URL trong sitemap)
+    """
+    domain_filters = domain_filters or {}
+    loop = asyncio.get_running_loop()
+    batch_lock = asyncio.Lock()
+
+    async def expand_domain(executor, domain):
+        logger.info(f"🌐 Domain input detected: {domain}")
+        fetch = partial(fetch_sitemap_urls, domain, url_filter=domain_filters.get(domain))
+        domain_urls = await loop.run_in_executor(executor, fetch)
+        if domain_urls:
+            logger.info(f"Found {len(domain_urls)} URLs from sitemap of {domain}")
+        else:
+            # Nếu không có sitemap, coi như single URL và thêm https://
+            logger.info(f"No sitemap found, treating as single URL: https://{domain}")
+            domain_urls = [f"https://{domain}"]
+        return await process_batches(domain_urls, batch_lock)
+
+    # Gom các URL trực tiếp liên tiếp thành một nhóm để vẫn check theo batch
+    groups = []
+    for entry in entries:
+        if entry.startswith("http"):
+            if groups and groups[-1][0] == "urls":
+                groups[-1][1].append(entry)
+            else:
+                groups.append(("urls", [entry]))
+        else:
+            groups.append(("domain", entry))
+
+    domain_count = sum(1 for kind, _ in groups if kind == "domain")
+    with ThreadPoolExecutor(max_workers=max(1, min(DOMAIN_WORKERS, domain_count))) as executor:
+        # gather trả kết quả theo thứ tự task, không theo thứ tự hoàn thành
+        results = await asyncio.gather(*[
+            process_batches(value, batch_lock) if kind == "urls" else expand_domain(executor, value)
+            for kind, value in groups
+        ])
+
+    return [r for group in results for r in group]
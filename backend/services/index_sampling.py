@@ -0,0 +1,236 @@
+"""
+Index rate estimation by stratified random sampling
+For very large sites only a sample of URLs is checked; strata are the
+child sitemaps, and the sample grows until the target margin of error is met
+"""
+import math
+import random
+from statistics import NormalDist
+from utils.logger import logger
+
+INITIAL_SAMPLE = 100  # Cỡ mẫu ban đầu
+MAX_SAMPLE = 2000  # Cỡ mẫu tối đa cho một domain
+DEFAULT_MARGIN = 0.05  # Sai số mục tiêu (±5%)
+DEFAULT_CONFIDENCE = 0.95
+
+
+def strata_from_crawl(crawl):
+    """
+    Chia URL của một SitemapCrawl thành các strata theo sitemap con (urlset).
+    Returns: list of (name, urls)
+    """
+    if crawl.root is None:
+        return []
+
+    strata = []
+    stack = [crawl.root]
+    while stack:
+        node = stack.pop()
+        if node.urls:
+            strata.append((node.url, list(node.urls)))
+        stack.extend(reversed(node.children))
+    return strata
+
+
+class _Stratum:
+    """Sampling state of one stratum: shuffled URLs and check outcomes"""
+
+    def __init__(self, name, urls, rng):
+        self.name = name
+        self.population = len(urls)
+        self.order = list(urls)
+        rng.shuffle(self.order)
+        self.drawn = 0
+        self.indexed = 0
+        self.checked = 0  # Chỉ tính các URL check thành công (không Error)
+        self.errors = 0
+
+    def draw(self, target):
+        """Return the next URLs so that `target` URLs have been drawn in total"""
+        target = min(target, self.population)
+        urls = self.order[self.drawn:target]
+        self.drawn = max(self.drawn, target)
+        return urls
+
+    def to_dict(self):
+        return {
+            'sitemap': self.name,
+            'population': self.population,
+            'sampled': self.drawn,
+            'checked': self.checked,
+            'indexed': self.indexed,
+            'errors': self.errors
+        }
+
+
+class IndexRateEstimator:
+    """
+    Adaptive stratified sample of URLs for estimating a site's indexed ratio.
+
+    Allocation is proportional to stratum size (at least one URL per stratum
+    when the sample allows it). The variance uses the finite population
+    correction and an add-two adjustment so strata with 0% or 100% indexed
+    still contribute uncertainty.
+    """
+
+    def __init__(self, strata, target_margin=DEFAULT_MARGIN, confidence=DEFAULT_CONFIDENCE,
+                 initial_size=INITIAL_SAMPLE, max_size=MAX_SAMPLE, seed=None):
+        if not 0 < target_margin < 1:
+            raise ValueError("target_margin must be between 0 and 1")
+        if not 0 < confidence < 1:
+            raise ValueError("confidence must be between 0 and 1")
+
+        rng = random.Random(seed)
+        self.strata = [_Stratum(name, urls, rng) for name, urls in strata if urls]
+        self.population = sum(s.population for s in self.strata)
+        self.target_margin = target_margin
+        self.confidence = confidence
+        self.z = NormalDist().inv_cdf((1 + confidence) / 2)
+        self.initial_size = max(1, initial_size)
+        self.max_size = max(self.initial_size, max_size)
+        self.rounds = 0
+
+    @property
+    def sampled(self):
+        return sum(s.drawn for s in self.strata)
+
+    def _allocate(self, size):
+        """
+        Proportional allocation of `size` draws across strata (largest remainder).
+        Mỗi stratum có ít nhất 1 URL khi size đủ lớn; tổng đúng bằng size (tối đa
+        là population) và không stratum nào vượt quá population của nó
+        """
+        size = min(size, self.population)
+        base = [1 if size >= len(self.strata) else 0 for _ in self.strata]
+        capacity = [s.population - b for s, b in zip(self.strata, base)]
+        rest = size - sum(base)
+        total = sum(capacity)
+        if rest <= 0 or total == 0:
+            return base
+
+        shares = [rest * c / total for c in capacity]
+        allocation = [b + math.floor(share) for b, share in zip(base, shares)]
+        remaining = size - sum(allocation)
+        by_remainder = sorted(range(len(shares)), key=lambda i: shares[i] - math.floor(shares[i]), reverse=True)
+        for i in by_remainder[:remaining]:
+            allocation[i] += 1
+        return allocation
+
+    def next_batch(self, size):
+        """Draw URLs so that the total sample reaches `size`; returns {url: stratum}"""
+        batch = {}
+        for stratum, target in zip(self.strata, self._allocate(size)):
+            for url in stratum.draw(target):
+                batch[url] = stratum
+
+        # Làm tròn có thể khiến mẫu không tăng: bổ sung từ strata còn nhiều URL nhất
+        while self.sampled < min(size, self.population):
+            stratum = max(self.strata, key=lambda s: s.population - s.drawn)
+            for url in stratum.draw(stratum.drawn + 1):
+                batch[url] = stratum
+        return batch
+
+    def record(self, batch, results):
+        """Record check results for a batch returned by next_batch"""
+        for result in results:
+            stratum = batch.get(result.get('url'))
+            if stratum is None:
+                continue
+            status = result.get('status', '')
+            if status == 'Error':
+                stratum.errors += 1
+                continue
+            stratum.checked += 1
+            if 'Indexed ✅' in status:
+                stratum.indexed += 1
+
+    def estimate(self):
+        """Current estimate: (indexed_ratio, margin_of_error)"""
+        ratio = 0.0
+        variance = 0.0
+        for stratum in self.strata:
+            weight = stratum.population / self.population
+            n = stratum.checked
+            if n == 0:
+                # Chưa có dữ liệu: coi như hoàn toàn không chắc chắn
+                variance += weight ** 2 * 0.25
+                ratio += weight * 0.5
+                continue
+            p = stratum.indexed / n
+            p_adj = (stratum.indexed + 1) / (n + 2)
+            fpc = 1 - n / stratum.population if stratum.population > 1 else 0
+            ratio += weight * p
+            variance += weight ** 2 * p_adj * (1 - p_adj) / n * max(fpc, 0)
+        return ratio, self.z * math.sqrt(variance)
+
+    def done(self):
+        """Whether the target margin is met or the sample cannot grow"""
+        if self.sampled >= min(self.population, self.max_size):
+            return True
+        if self.rounds == 0:
+            return False
+        return self.estimate()[1] <= self.target_margin
+
+    def next_size(self):
+        """Sample size for the next round, grown from the current margin"""
+        if self.rounds == 0:
+            return min(self.initial_size, self.population, self.max_size)
+        _, margin = self.estimate()
+        current = self.sampled
+        # Sai số tỉ lệ với 1/sqrt(n): ước lượng cỡ mẫu cần thiết, tăng tối đa gấp đôi mỗi vòng
+        needed = math.ceil(current * (margin / self.target_margin) ** 2) if margin else current
+        return min(max(needed, current + 1), current * 2, self.population, self.max_size)
+
+    def to_dict(self):
+        ratio, margin = self.estimate()
+        checked = sum(s.checked for s in self.strata)
+        return {
+            'population': self.population,
+            'sampled': self.sampled,
+            'checked': checked,
+            'errors': sum(s.errors for s in self.strata),
+            'indexed_ratio': round(ratio, 4),
+            'margin_of_error': round(margin, 4),
+            'confidence': self.confidence,
+            'confidence_interval': [round(max(0.0, ratio - margin), 4), round(min(1.0, ratio + margin), 4)],
+            'estimated_indexed': round(ratio * self.population),
+            'target_margin': self.target_margin,
+            'target_met': checked > 0 and margin <= self.target_margin,
+            'rounds': self.rounds,
+            'strata': [s.to_dict() for s in self.strata]
+        }
+
+
+async def estimate_index_rate(strata, check, **options):
+    """
+    Run adaptive sampling rounds until the target margin of error is reached.
+
+    Args:
+        strata: list of (name, urls)
+        check: async callable(urls) -> list of result dicts ({'url', 'status'})
+        **options: IndexRateEstimator options (target_margin, confidence,
+            initial_size, max_size, seed)
+
+    Returns:
+        Tuple (estimate dict, list of sampled check results)
+    """
+    estimator = IndexRateEstimator(strata, **options)
+    results = []
+
+    while estimator.population and not estimator.done():
+        size = estimator.next_size()
+        batch = estimator.next_batch(size)
+        if not batch:
+            break
+        estimator.rounds += 1
+        batch_results = await check(list(batch))
+        estimator.record(batch, batch_results)
+        results.extend(batch_results)
+
+        ratio, margin = estimator.estimate()
+        logger.info(
+            f"[Sampling] Round {estimator.rounds}: sampled {estimator.sampled}/{estimator.population}, "
+            f"indexed≈{ratio:.1%} ±{margin:.1%}"
+        )
+
+    return estimator.to_dict(), results
@@ -0,0 +1,243 @@
+"""
+Bulk link rewrite
+Finds outgoing links matching a rule (URL, domain or anchor text) across many
+posts and rewrites only those <a> elements in the raw post content. Changes
+are previewed with a dry run and saved through WordPressService.update_posts_bulk
+"""
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from models.wp_editor_sessions import update_editor_outgoing_links
+from services.wordpress_service import WordPressService
+from utils.html_parser import rewrite_links, extract_outgoing_links
+
+logger = logging.getLogger(__name__)
+
+REWRITE_TARGETS = ('url', 'domain', 'anchor')
+REWRITE_WORKERS = 4  # Posts rewritten in parallel
+
+
+def _normalize_domain(domain):
+    domain = (domain or '').lower()
+    return domain[4:] if domain.startswith('www.') else domain
+
+
+class LinkRule:
+    """
+    Match / replace rule for links
+
+    `target` is what `pattern` is compared with: 'url' (href, trailing slash
+    ignored), 'domain' (href host, case and www. ignored) or 'anchor' (link
+    text, case ignored). With regex=True the pattern is searched instead, and a
+    replacement for the same target substitutes only the matched part
+    (\\1-style group references allowed).
+    """
+
+    def __init__(self, target: str, pattern: str, regex: bool = False,
+                 replace_url: Optional[str] = None, replace_domain: Optional[str] = None,
+                 replace_anchor: Optional[str] = None):
+        if target not in REWRITE_TARGETS:
+            raise ValueError(f"target must be one of: {', '.join(REWRITE_TARGETS)}")
+        if not pattern:
+            raise ValueError("pattern is required")
+        if replace_url is None and replace_domain is None and replace_anchor is None:
+            raise ValueError("At least one of replace_url, replace_domain, replace_anchor is required")
+        if replace_url is not None and replace_domain is not None:
+            raise ValueError("replace_url and replace_domain cannot be combined")
+
+        self.target = target
+        self.pattern = pattern
+        self.regex = bool(regex)
+        self.replace_url = replace_url
+        self.replace_domain = replace_domain
+        self.replace_anchor = replace_anchor
+
+        if self.regex:
+            flags = re.IGNORECASE if target == 'domain' else 0
+            try:
+                self._compiled = re.compile(pattern, flags)
+            except re.error as e:
+                raise ValueError(f"Invalid pattern: {e}")
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'LinkRule':
+        """
+        Build a rule from a request body dict
+
+        Raises:
+            ValueError: If the rule is incomplete or invalid
+        """
+        if not isinstance(data, dict):
+            raise ValueError("rule must be an object")
+        return cls(
+            target=data.get('target'),
+            pattern=data.get('pattern'),
+            regex=data.get('regex', False),
+            replace_url=data.get('replace_url'),
+            replace_domain=data.get('replace_domain'),
+            replace_anchor=data.get('replace_anchor')
+        )
+
+    def _value(self, url: str, anchor: str) -> str:
+        if self.target == 'url':
+            return url
+        if self.target == 'domain':
+            return urlparse(url).hostname or ''
+        return anchor
+
+    def matches(self, url: str, anchor: str) -> bool:
+        """Whether a link (href, anchor text) matches the rule"""
+        value = self._value(url, anchor)
+        if self.regex:
+            return self._compiled.search(value) is not None
+        if self.target == 'url':
+            return value.rstrip('/') == self.pattern.rstrip('/')
+        if self.target == 'domain':
+            return value != '' and _normalize_domain(value) == _normalize_domain(self.pattern)
+        return value.lower() == self.pattern.strip().lower()
+
+    def _replace(self, target: str, value: str, replacement: str) -> str:
+        if self.regex and self.target == target:
+            return self._compiled.sub(replacement, value)
+        return replacement
+
+    def apply(self, url: str, anchor: str) -> Optional[Tuple[str, str]]:
+        """
+        Rewrite a link
+
+        Returns:
+            (new_url, new_anchor), or None if the link does not match
+        """
+        if not self.matches(url, anchor):
+            return None
+
+        new_url, new_anchor = url, anchor
+        if self.replace_url is not None:
+            new_url = self._replace('url', url, self.replace_url)
+        elif self.replace_domain is not None:
+            parsed = urlparse(url)
+            host = self._replace('domain', parsed.hostname or '', self.replace_domain)
+            userinfo = parsed.netloc.rpartition('@')[0]
+            netloc = (f'{userinfo}@' if userinfo else '') + host + (f':{parsed.port}' if parsed.port else '')
+            new_url = parsed._replace(netloc=netloc).geturl()
+        if self.replace_anchor is not None:
+            new_anchor = self._replace('anchor', anchor, self.replace_anchor)
+
+        return new_url, new_anchor
+
+
+def plan_link_rewrite(wp_service: WordPressService, post_ids: List[int],
+                      rule: LinkRule) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Fetch raw content and rewrite matching links in memory
+
+    Args:
+        wp_service: WordPressService of the site
+        post_ids: Post or page ids
+        rule: LinkRule to apply
+
+    Returns:
+        Tuple of (affected posts [{post_id, post_type, url, modified, changes,
+        content}] in input order, error entries [{post_id, error}])
+
+    Raises:
+        WordPressAPIError: If fetching content fails
+    """
+    raw_posts = wp_service.fetch_raw_contents(post_ids)
+    errors = [{'post_id': post_id, 'error': 'Post not found'} for post_id in post_ids if post_id not in raw_posts]
+    found = [post_id for post_id in dict.fromkeys(post_ids) if post_id in raw_posts]
+
+    def rewrite(post_id):
+        content, changes = rewrite_links(raw_posts[post_id]['raw'], rule.apply)
+        raw = raw_posts[post_id]
+        return {'post_id': post_id, 'post_type': raw['post_type'], 'url': raw['url'], 'modified': raw['modified'],
+                'changes': changes, 'content': content}
+
+    with ThreadPoolExecutor(max_workers=REWRITE_WORKERS) as executor:
+        planned = [post for post in executor.map(rewrite, found) if post['changes']]
+
+    return planned, errors
+
+
+def rewrite_post_links(wp_service: WordPressService, post_ids: List[int], rule: LinkRule,
+                       dry_run: bool = True, session_id: Optional[str] = None,
+                       expected_modified: Optional[Dict[int, str]] = None) -> Dict:
+    """
+    Find and replace links across many posts
+
+    Before saving, the modified date of every affected post is read again;
+    posts edited since their content was read (or since the preview, when
+    `expected_modified` is given) are not saved and are reported with
+    'conflict': True, so an edit made meanwhile is never overwritten.
+
+    Args:
+        wp_service: WordPressService of the site
+        post_ids: Post or page ids
+        rule: LinkRule to apply
+        dry_run: Only report the affected posts and their link changes
+        session_id: Editor session whose stored outgoing links are updated
+            for the saved posts
+        expected_modified: {post_id: modified} from the preview; posts whose
+            modified date differs are not saved
+
+    Returns:
+        Summary dict (total, matched, dry_run, posts, errors; plus updated,
+        failed and conflicts when applied). Each post entry has post_id, url,
+        modified and changes, and success / error when applied
+
+    Raises:
+        WordPressAPIError: If fetching content or modified dates fails
+    """
+    start_time = time.time()
+    planned, errors = plan_link_rewrite(wp_service, post_ids, rule)
+
+    summary = {
+        'total': len(post_ids),
+        'matched': len(planned),
+        'links': sum(len(post['changes']) for post in planned),
+        'dry_run': dry_run,
+        'posts': [{key: post[key] for key in ('post_id', 'url', 'modified', 'changes')} for post in planned],
+        'errors': errors
+    }
+
+    if not dry_run and planned:
+        expected_modified = expected_modified or {}
+        current = wp_service.fetch_modified_dates([post['post_id'] for post in planned])
+        to_save = []
+        for post, entry in zip(planned, summary['posts']):
+            expected = expected_modified.get(post['post_id'], post['modified'])
+            if current.get(post['post_id']) != post['modified'] or expected != post['modified']:
+                # Post đã bị sửa (sheet, WordPress) sau khi đọc/preview: không ghi đè
+                entry.update({'success': False, 'conflict': True,
+                              'error': 'Post was modified since it was read; preview again'})
+            else:
+                to_save.append((post, entry))
+
+        # Page phải ghi qua /wp/v2/pages/{id}: truyền post type đã xác định khi đọc nội dung
+        results = wp_service.update_posts_bulk(
+            [(post['post_id'], {'content': post['content']}) for post, _ in to_save], max_workers=5,
+            post_types={post['post_id']: post['post_type'] for post, _ in to_save}
+        )
+        for (_, entry), result in zip(to_save, results):
+            entry['success'] = result['success']
+            if not result['success']:
+                entry['error'] = result.get('error')
+
+        summary['updated'] = sum(1 for result in results if result['success'])
+        summary['conflicts'] = len(planned) - len(to_save)
+        summary['failed'] = len(planned) - summary['updated']
+
+        if session_id:
+            update_editor_outgoing_links(session_id, [
+                {'id': post['post_id'], 'outgoing_links': extract_outgoing_links(post['content'], post['url'])}
+                for (post, _), result in zip(to_save, results) if result['success']
+            ])
+
+    summary['elapsed'] = round(time.time() - start_time, 2)
+    logger.info(f"[LinkRewrite] {'Previewed' if dry_run else 'Applied'} {summary['links']} link changes "
+                f"in {summary['matched']}/{len(post_ids)} posts on {wp_service.site_url}")
+    return summary
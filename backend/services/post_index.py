@@ -0,0 +1,268 @@
+"""
+Local post index sync and URL resolution
+Pages through /wp/v2/posts and /wp/v2/pages into the wp_post_index table, then
+resolves post URLs with a local lookup and one batched include= fetch per type
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from models.wp_post_index import (
+    upsert_indexed_posts,
+    lookup_indexed_posts,
+    delete_stale_indexed_posts,
+    get_post_index_state,
+    set_post_index_sync_state,
+    normalize_post_path,
+)
+from services.wordpress_service import WordPressService, PostTypeRouter, SLUG_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+SYNC_WORKERS = 4  # Trang listing tải song song cho mỗi post type
+SYNC_INTERVAL = 15 * 60  # Giây: index cũ hơn thì sync incremental ở background
+SYNC_RETRY_DELAY = 5 * 60  # Giây chờ sau một lần sync thất bại trước khi thử lại
+REST_TYPE_ENDPOINTS = {'post': 'posts', 'page': 'pages'}
+
+_running_syncs = set()
+_sync_lock = threading.Lock()
+
+
+def _index_rows(posts: List[Dict]) -> List[Dict]:
+    return [{
+        'post_id': post.get('id'),
+        'link': post.get('link'),
+        'slug': post.get('slug'),
+        'type': post.get('type'),
+        'modified': post.get('modified')
+    } for post in posts]
+
+
+def _sync_post_type(wp_site_id: int, service: WordPressService, post_type: str,
+                    modified_after: Optional[str], synced_at: str) -> Tuple[int, int]:
+    """
+    Page through one listing endpoint into the index
+
+    Page 1 gives X-WP-TotalPages; the remaining pages are fetched in parallel.
+
+    Returns:
+        Tuple of (posts written, requests made)
+    """
+    posts, total_pages = service.list_posts(post_type, page=1, modified_after=modified_after)
+    written = upsert_indexed_posts(wp_site_id, _index_rows(posts), synced_at)
+
+    if total_pages > 1:
+        with ThreadPoolExecutor(max_workers=min(SYNC_WORKERS, total_pages - 1)) as executor:
+            futures = [
+                executor.submit(service.list_posts, post_type, page, SLUG_BATCH_SIZE, modified_after)
+                for page in range(2, total_pages + 1)
+            ]
+            for future in as_completed(futures):
+                page_posts, _ = future.result()
+                written += upsert_indexed_posts(wp_site_id, _index_rows(page_posts), synced_at)
+
+    return written, total_pages
+
+
+def sync_post_index(wp_site_id: int, service: WordPressService, full: bool = False) -> Dict:
+    """
+    Sync a site's post index from the REST listings
+
+    Incremental by default: only posts modified after the newest indexed
+    modified date are fetched (modified_after). A full sync refetches
+    everything and drops posts that no longer exist.
+
+    Args:
+        wp_site_id: WordPress site ID
+        service: WordPressService of the site
+        full: Refetch the whole listing
+
+    Returns:
+        Summary dict
+    """
+    start_time = time.time()
+    synced_at = datetime.now(timezone.utc).isoformat()
+    state = get_post_index_state(wp_site_id)
+
+    modified_after = None
+    if not full and state['post_count'] and state['last_modified']:
+        # modified_after là so sánh "sau" (không bằng): lùi 1 giây để không bỏ sót post sửa cùng giây
+        last_modified = datetime.fromisoformat(state['last_modified']) - timedelta(seconds=1)
+        modified_after = last_modified.isoformat()
+
+    set_post_index_sync_state(wp_site_id, 'running')
+    try:
+        summary = {'wp_site_id': wp_site_id, 'incremental': modified_after is not None, 'requests': 0}
+        with ThreadPoolExecutor(max_workers=len(PostTypeRouter.POST_TYPES)) as executor:
+            futures = {
+                executor.submit(_sync_post_type, wp_site_id, service, post_type, modified_after, synced_at): post_type
+                for post_type in PostTypeRouter.POST_TYPES
+            }
+            for future in as_completed(futures):
+                written, requests_made = future.result()
+                summary[futures[future]] = written
+                summary['requests'] += requests_made
+
+        if full:
+            summary['deleted'] = delete_stale_indexed_posts(wp_site_id, synced_at)
+    except Exception as e:
+        logger.error(f"[PostIndex] Sync failed for site {wp_site_id}: {e}")
+        set_post_index_sync_state(wp_site_id, 'failed', error=str(e),
+                                  failed_at=datetime.now(timezone.utc).isoformat())
+        raise
+
+    set_post_index_sync_state(wp_site_id, 'done', synced_at=synced_at)
+    summary['elapsed'] = round(time.time() - start_time, 2)
+    logger.info(f"[PostIndex] Synced site {wp_site_id}: {summary}")
+    return summary
+
+
+def start_post_index_sync(wp_site_id: int, service: WordPressService, full: bool = False) -> bool:
+    """
+    Run sync_post_index in a background thread (one sync per site at a time)
+
+    Returns:
+        True if a sync was started, False if one is already running
+    """
+    with _sync_lock:
+        if wp_site_id in _running_syncs:
+            return False
+        _running_syncs.add(wp_site_id)
+
+    def run():
+        try:
+            sync_post_index(wp_site_id, service, full=full)
+        except Exception:
+            pass  # Đã log và lưu trạng thái failed
+        finally:
+            with _sync_lock:
+                _running_syncs.discard(wp_site_id)
+
+    threading.Thread(target=run, name=f"post-index-sync-{wp_site_id}", daemon=True).start()
+    return True
+
+
+def is_sync_running(wp_site_id: int) -> bool:
+    with _sync_lock:
+        return wp_site_id in _running_syncs
+
+
+def index_is_stale(state: Dict) -> bool:
+    """
+    Whether the index was never synced or is older than SYNC_INTERVAL
+
+    After a failed sync the index is not considered stale again until
+    SYNC_RETRY_DELAY has passed, so lookups do not restart a failing sync.
+    """
+    now = datetime.now(timezone.utc)
+    if state.get('status') == 'failed' and state.get('failed_at'):
+        failed_at = datetime.fromisoformat(state['failed_at'])
+        if (now - failed_at).total_seconds() < SYNC_RETRY_DELAY:
+            return False
+    if not state.get('synced_at'):
+        return True
+    synced_at = datetime.fromisoformat(state['synced_at'])
+    return (now - synced_at).total_seconds() > SYNC_INTERVAL
+
+
+def iter_posts_indexed(wp_site_id: int, service: WordPressService, urls: List[str],
+                       fields: Optional[Tuple[str, ...]] = None,
+                       fallback: Optional[Callable[[List[str]], Iterable[Dict]]] = None):
+    """
+    Fetch posts by URL using the local index, yielding posts as they arrive
+
+    URLs found in the index are fetched by id (include=, SLUG_BATCH_SIZE ids
+    per request, posts and pages in parallel). URLs missing from the index,
+    or whose indexed post moved, go to `fallback` (slug lookups) and are
+    added to the index. A stale index is refreshed in the background.
+
+    Args:
+        wp_site_id: WordPress site ID
+        service: WordPressService of the site
+        urls: List of post URLs
+        fields: Keys of parse_post_data() output to fetch (None = full post)
+        fallback: callable(urls) -> iterable of post dicts; defaults to
+            service.iter_posts_concurrent
+
+    Yields:
+        Post dicts (or error entries for failed fetches)
+    """
+    if fallback is None:
+        def fallback(missing):
+            return service.iter_posts_concurrent(missing, max_workers=10, fields=fields)
+
+    if not urls:
+        return
+
+    if index_is_stale(get_post_index_state(wp_site_id)):
+        start_post_index_sync(wp_site_id, service)
+
+    indexed = lookup_indexed_posts(wp_site_id, urls)
+
+    # Gom id theo endpoint
+    ids_by_type: Dict[str, List[int]] = {}
+    urls_by_id: Dict[int, List[str]] = {}
+    for url, entry in indexed.items():
+        post_type = REST_TYPE_ENDPOINTS.get(entry['type'])
+        if post_type is None:
+            continue
+        if entry['post_id'] not in urls_by_id:
+            ids_by_type.setdefault(post_type, []).append(entry['post_id'])
+        urls_by_id.setdefault(entry['post_id'], []).append(url)
+
+    resolved = set()
+    if ids_by_type:
+        with ThreadPoolExecutor(max_workers=SYNC_WORKERS) as executor:
+            futures = {}
+            for post_type, ids in ids_by_type.items():
+                for i in range(0, len(ids), SLUG_BATCH_SIZE):
+                    future = executor.submit(service.fetch_posts_by_ids, ids[i:i + SLUG_BATCH_SIZE], post_type, fields)
+                    futures[future] = post_type
+
+            for future in as_completed(futures):
+                try:
+                    posts = future.result()
+                except Exception as e:
+                    logger.warning(f"[PostIndex] Id lookup failed, falling back to slugs: {e}")
+                    continue
+                for post in posts:
+                    for url in urls_by_id.get(post.get('id'), []):
+                        # Slug đổi sau lần sync: để fallback tìm lại theo slug
+                        if post.get('link') and normalize_post_path(post['link']) != normalize_post_path(url):
+                            continue
+                        resolved.add(url)
+                        yield service.resolved_post_result(url, post, None, fields)
+
+    missing = [url for url in urls if url not in resolved]
+    logger.info(f"[PostIndex] Site {wp_site_id}: {len(resolved)}/{len(urls)} URLs resolved from index")
+
+    if missing:
+        found = []
+        for post in fallback(missing):
+            if post.get('id') and not post.get('error'):
+                found.append(post)
+            yield post
+
+        # modified để trống: mốc incremental sync chỉ lấy từ các listing đã sync
+        upsert_indexed_posts(wp_site_id, [
+            {'post_id': post['id'], 'link': post.get('url'),
+             'slug': service.slug_from_url(post.get('url') or ''),
+             'type': 'page' if service.type_router.guess(post.get('url') or '') == 'pages' else 'post',
+             'modified': None}
+            for post in found
+        ])
+
+
+def fetch_posts_indexed(wp_site_id: int, service: WordPressService, urls: List[str],
+                        fields: Optional[Tuple[str, ...]] = None,
+                        fallback: Optional[Callable[[List[str]], Iterable[Dict]]] = None) -> List[Dict]:
+    """
+    Fetch posts by URL using the local index (see iter_posts_indexed)
+
+    Returns:
+        List of post dicts (includes error entries for failed fetches)
+    """
+    return list(iter_posts_indexed(wp_site_id, service, urls, fields, fallback))
@@ -0,0 +1,186 @@
+"""
+Background connection-health probing of WordPress sites
+Checks every configured site (GET /wp-json/wp/v2/users/me) in parallel on a
+schedule and stores status, latency and last error in wp_site_health, so the
+sites page can read the health of all sites without live round-trips
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from models.wp_sites import get_all_wp_sites
+from models.wp_site_health import save_site_health
+from services.wordpress_service import get_wordpress_service
+
+logger = logging.getLogger(__name__)
+
+HEALTH_WORKERS = 10  # Sites probed in parallel
+SITE_HEALTH_INTERVAL = 10 * 60  # Giây giữa hai lần kiểm tra toàn bộ sites
+AUTH_FAILURE_CODES = (401, 403)
+
+_prober_state = {'running': False, 'last_run': None, 'last_summary': None, 'interval': None}
+_prober_lock = threading.Lock()
+_wake = threading.Event()
+_prober_thread: Optional[threading.Thread] = None
+
+
+def probe_site(site: Dict) -> Dict:
+    """
+    Check one site's REST API and application password
+
+    Args:
+        site: wp_sites row (id, site_url, username, app_password)
+
+    Returns:
+        Health dict (wp_site_id, status, status_code, latency, error, checked_at);
+        status is 'ok', 'auth_failed' (401/403), 'error' (other HTTP status)
+        or 'unreachable' (timeout, connection error)
+    """
+    start_time = time.time()
+    try:
+        wp_service = get_wordpress_service(site['site_url'], site['username'], site['app_password'])
+        # Một request duy nhất, không retry và không qua circuit breaker: đo đúng trạng thái hiện tại
+        success, result = wp_service.test_connection(single_attempt=True)
+    except Exception as e:
+        success, result = False, {'error': str(e)}
+    latency = round(time.time() - start_time, 3)
+
+    status_code = result.get('status_code')
+    if success:
+        status = 'ok'
+    elif status_code in AUTH_FAILURE_CODES:
+        status = 'auth_failed'
+    elif status_code:
+        status = 'error'
+    else:
+        status = 'unreachable'
+
+    return {
+        'wp_site_id': site['id'],
+        'status': status,
+        'status_code': 200 if success else status_code,
+        'latency': latency,
+        'error': None if success else result.get('error'),
+        'checked_at': datetime.now(timezone.utc).isoformat()
+    }
+
+
+def probe_all_sites() -> Dict:
+    """
+    Probe all configured sites in parallel and store the results
+
+    Returns:
+        Summary dict (total, count per status, elapsed)
+    """
+    with _prober_lock:
+        if _prober_state['running']:
+            return {'skipped': True, 'reason': 'Probe already running'}
+        _prober_state['running'] = True
+
+    start_time = time.time()
+    try:
+        sites = get_all_wp_sites()
+        results = []
+        if sites:
+            with ThreadPoolExecutor(max_workers=min(HEALTH_WORKERS, len(sites))) as executor:
+                results = list(executor.map(probe_site, sites))
+        save_site_health(results)
+
+        summary = {'total': len(results)}
+        for result in results:
+            summary[result['status']] = summary.get(result['status'], 0) + 1
+        summary['elapsed'] = round(time.time() - start_time, 2)
+    finally:
+        with _prober_lock:
+            _prober_state['running'] = False
+
+    with _prober_lock:
+        _prober_state['last_run'] = datetime.now(timezone.utc).isoformat()
+        _prober_state['last_summary'] = summary
+
+    logger.info(f"[SiteHealth] Probed {summary['total']} sites: {summary}")
+    return summary
+
+
+def _probe_loop(interval: int):
+    """Probe all sites now and then every `interval` seconds (or when woken), forever"""
+    while True:
+        try:
+            probe_all_sites()
+        except Exception as e:
+            logger.error(f"[SiteHealth] Probe failed: {e}")
+        _wake.wait(interval)
+        _wake.clear()
+
+
+def start_site_health_prober(interval: int = SITE_HEALTH_INTERVAL) -> bool:
+    """
+    Start the background prober thread (probes immediately, then every `interval` seconds)
+
+    Call it from the process entry point, not at import time: every process
+    that calls it probes all sites, so multi-worker servers should run the
+    prober in one process only (see run_site_health_prober).
+
+    Args:
+        interval: Seconds between probes; 0 disables the prober
+
+    Returns:
+        True if the prober was started, False if disabled or already running
+    """
+    global _prober_thread
+
+    if interval <= 0:
+        logger.info("[SiteHealth] Background prober disabled")
+        return False
+
+    with _prober_lock:
+        if _prober_thread is not None and _prober_thread.is_alive():
+            return False
+        _prober_state['interval'] = interval
+        _prober_thread = threading.Thread(target=_probe_loop, args=(interval,), name="site-health-prober",
+                                          daemon=True)
+        _prober_thread.start()
+
+    logger.info(f"[SiteHealth] Background prober started (every {interval}s)")
+    return True
+
+
+def run_site_health_prober(interval: int = SITE_HEALTH_INTERVAL):
+    """
+    Run the prober in the current thread until the process stops
+
+    For deployments with several web workers: run it as one dedicated
+    process next to the workers instead of starting it in each of them.
+
+    Args:
+        interval: Seconds between probes (must be > 0)
+    """
+    if interval <= 0:
+        raise ValueError("interval must be > 0")
+    with _prober_lock:
+        _prober_state['interval'] = interval
+    logger.info(f"[SiteHealth] Prober running in foreground (every {interval}s)")
+    _probe_loop(interval)
+
+
+def request_site_health_probe() -> bool:
+    """
+    Ask the background prober to run now
+
+    Returns:
+        True if the prober thread was woken, False if it is not running
+    """
+    with _prober_lock:
+        alive = _prober_thread is not None and _prober_thread.is_alive()
+    if alive:
+        _wake.set()
+    return alive
+
+
+def get_prober_state() -> Dict:
+    """Prober status (running, last_run, last_summary, interval)"""
+    with _prober_lock:
+        return dict(_prober_state)
@@ -0,0 +1,165 @@
+"""
+Sitemap URL filtering rules
+Include/exclude rules applied while a sitemap is crawled, so unwanted child
+sitemaps are never fetched and unwanted URLs never reach the index checker
+"""
+import re
+from datetime import datetime, timezone
+from fnmatch import fnmatch
+from urllib.parse import urlparse, unquote
+
+# Tên sitemap con của WordPress core, Yoast SEO và Rank Math
+_WP_CORE_POSTS = re.compile(r'wp-sitemap-posts-([a-z0-9_-]+?)-\d+\.xml$')
+_WP_CORE_TAXONOMIES = re.compile(r'wp-sitemap-taxonomies-([a-z0-9_-]+?)-\d+\.xml$')
+_WP_CORE_USERS = re.compile(r'wp-sitemap-users-\d+\.xml$')
+_PLUGIN_SITEMAP = re.compile(r'([a-z0-9_-]+?)[-_]sitemap\d*\.xml$')
+
+
+def child_sitemap_type(url: str):
+    """
+    Đoán post type / taxonomy của sitemap con từ tên file
+    (post-sitemap2.xml -> 'post', wp-sitemap-posts-page-1.xml -> 'page',
+    wp-sitemap-users-1.xml -> 'author').
+    Returns None nếu không nhận ra.
+    """
+    filename = urlparse(url).path.rstrip('/').rsplit('/', 1)[-1].lower()
+
+    if filename == 'wp-sitemap.xml':
+        return None  # Sitemap index của WordPress core
+    if _WP_CORE_USERS.search(filename):
+        return 'author'
+    for pattern in (_WP_CORE_POSTS, _WP_CORE_TAXONOMIES, _PLUGIN_SITEMAP):
+        match = pattern.search(filename)
+        if match:
+            return match.group(1)
+    return None
+
+
+def parse_lastmod(value):
+    """Parse sitemap <lastmod> (W3C datetime) thành datetime UTC; None nếu không hợp lệ"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+class SitemapFilter:
+    """
+    Rules for selecting sitemap URLs.
+
+    Rule keys (all optional):
+        include / exclude: glob patterns matched against the URL path
+            (e.g. "/blog/*", "/tag/*", "*/page/*")
+        include_regex / exclude_regex: regexes searched in the full URL
+        post_types: child sitemap types to crawl (e.g. ["post", "page"]);
+            child sitemaps of other recognised types are never fetched
+        lastmod_after / lastmod_before: ISO dates bounding <lastmod>;
+            entries without lastmod are kept
+    """
+
+    RULE_KEYS = ('include', 'exclude', 'include_regex', 'exclude_regex',
+                 'post_types', 'lastmod_after', 'lastmod_before')
+
+    def __init__(self, include=None, exclude=None, include_regex=None, exclude_regex=None,
+                 post_types=None, lastmod_after=None, lastmod_before=None):
+        self.include = tuple(include or ())
+        self.exclude = tuple(exclude or ())
+        self.include_regex = tuple(re.compile(p) for p in include_regex or ())
+        self.exclude_regex = tuple(re.compile(p) for p in exclude_regex or ())
+        self.post_types = frozenset(t.lower() for t in post_types or ())
+        self.lastmod_after = self._parse_bound(lastmod_after, 'lastmod_after')
+        self.lastmod_before = self._parse_bound(lastmod_before, 'lastmod_before')
+
+    @staticmethod
+    def _parse_bound(value, name):
+        if not value:
+            return None
+        parsed = parse_lastmod(value)
+        if parsed is None:
+            raise ValueError(f"{name} must be an ISO date, got {value!r}")
+        return parsed
+
+    @classmethod
+    def from_dict(cls, rules):
+        """
+        Build filter from request JSON.
+        Returns None when no rules are given; raises ValueError for invalid rules.
+        """
+        if not rules:
+            return None
+        if not isinstance(rules, dict):
+            raise ValueError("filters must be an object")
+
+        unknown = set(rules) - set(cls.RULE_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown filter rules: {', '.join(sorted(unknown))}")
+
+        kwargs = {}
+        for key in cls.RULE_KEYS:
+            value = rules.get(key)
+            if value is None:
+                continue
+            if key.startswith('lastmod'):
+                kwargs[key] = value
+            else:
+                kwargs[key] = [value] if isinstance(value, str) else list(value)
+
+        try:
+            return cls(**kwargs)
+        except re.error as e:
+            raise ValueError(f"Invalid filter regex: {e}")
+
+    def key(self):
+        """Hashable representation, used as part of the crawl cache key"""
+        return (
+            self.include,
+            self.exclude,
+            tuple(p.pattern for p in self.include_regex),
+            tuple(p.pattern for p in self.exclude_regex),
+            tuple(sorted(self.post_types)),
+            self.lastmod_after,
+            self.lastmod_before,
+        )
+
+    def _in_lastmod_window(self, lastmod):
+        modified = parse_lastmod(lastmod)
+        if modified is None:
+            return True
+        if self.lastmod_after and modified < self.lastmod_after:
+            return False
+        if self.lastmod_before and modified > self.lastmod_before:
+            return False
+        return True
+
+    def allows_child(self, url: str, lastmod=None) -> bool:
+        """Whether a child sitemap from a <sitemapindex> should be fetched"""
+        if self.post_types:
+            child_type = child_sitemap_type(url)
+            if child_type is not None and child_type not in self.post_types:
+                return False
+        # lastmod của sitemap con là lần sửa mới nhất của các URL bên trong:
+        # cũ hơn lastmod_after thì không URL nào nằm trong khoảng thời gian.
+        # lastmod_before không loại được sitemap con (có thể chứa URL cũ hơn).
+        modified = parse_lastmod(lastmod)
+        if self.lastmod_after and modified is not None and modified < self.lastmod_after:
+            return False
+        return True
+
+    def allows_url(self, url: str, lastmod=None) -> bool:
+        """Whether a page URL from a <urlset> should be kept"""
+        path = unquote(urlparse(url).path) or '/'
+
+        if self.include and not any(fnmatch(path, p) for p in self.include):
+            return False
+        if self.exclude and any(fnmatch(path, p) for p in self.exclude):
+            return False
+        if self.include_regex and not any(p.search(url) for p in self.include_regex):
+            return False
+        if self.exclude_regex and any(p.search(url) for p in self.exclude_regex):
+            return False
+        return self._in_lastmod_window(lastmod)
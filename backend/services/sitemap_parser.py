@@ -1,118 +1,508 @@
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 from utils.logger import logger
+from services.sitemap_filters import SitemapFilter
 import urllib3
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
 
 # Disable SSL warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-def fetch_sitemap_urls(domain: str, max_urls: int = 10000):
+PROBE_TIMEOUT = 10  # Timeout (giây) cho mỗi probe sitemap
+MAX_DEPTH = 4  # Độ sâu tối đa của sitemap index lồng nhau
+MAX_BYTES = 100 * 1024 * 1024  # Tổng dung lượng sitemap tối đa cho một lần crawl
+TIME_BUDGET = 60  # Thời gian crawl tối đa (giây)
+CACHE_TTL = 120  # Thời gian giữ kết quả crawl trong cache (giây)
+CACHE_MAX_URLS = 200000  # Tổng số URL tối đa của các kết quả crawl trong cache (LRU)
+POOL_HOSTS = 20  # Số host giữ connection pool cùng lúc
+POOL_MAXSIZE = 4  # Số connection keep-alive tối đa cho mỗi host
+
+_session = None
+_session_lock = threading.Lock()
+
+_crawl_cache = OrderedDict()  # key -> (expires_at, SitemapCrawl)
+_crawl_inflight = {}  # key -> Future của crawl đang chạy
+_cache_url_count = 0  # Tổng số URL của các kết quả trong _crawl_cache
+_cache_lock = threading.Lock()
+
+
+def _get_session() -> requests.Session:
     """
-    Thử tìm và đọc sitemap từ domain.
-    Trả về danh sách URL hợp lệ (tối đa max_urls).
+    Shared keep-alive session for all sitemap requests.
+    Connections to the same host are reused (no new TCP/TLS handshake or DNS
+    lookup per child sitemap) and capped at POOL_MAXSIZE per host.
     """
-    sitemap_candidates = [
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=POOL_HOSTS,
+                    pool_maxsize=POOL_MAXSIZE,
+                    pool_block=True  # Chờ connection rảnh thay vì mở thêm
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update({"User-Agent": "Mozilla/5.0"})
+                session.verify = False  # Skip SSL verification for problematic certificates
+                _session = session
+    return _session
+
+
+def _sitemap_candidates(domain: str):
+    """Danh sách URL sitemap thử cho domain, theo thứ tự ưu tiên"""
+    return [
         f"https://{domain}/sitemap.xml",
         f"https://{domain}/sitemap_index.xml",
         f"http://{domain}/sitemap.xml",
         f"http://{domain}/sitemap_index.xml",
     ]
 
-    visited = set()
-    all_urls = []
 
-    for sitemap_url in sitemap_candidates:
-        try:
-            logger.info(f"Fetching sitemap: {sitemap_url}")
-            resp = requests.get(
-                sitemap_url,
-                timeout=10,
-                headers={"User-Agent": "Mozilla/5.0"},
-                allow_redirects=True,  # Follow redirects
-                verify=False  # Skip SSL verification for problematic certificates
-            )
-            if resp.status_code != 200:
-                logger.warning(f"Sitemap not found: {sitemap_url} ({resp.status_code})")
+def _probe_sitemap(sitemap_url: str):
+    """
+    Fetch one sitemap candidate.
+    Returns (response or None, outcome, elapsed seconds); response is only set
+    when the probe returned a 200 XML/text document.
+    Response được stream: body chỉ tải khi đọc .content, probe thua được đóng
+    ngay để trả connection về pool (xem _close_probe).
+    """
+    start = time.time()
+    try:
+        resp = _get_session().get(
+            sitemap_url,
+            timeout=PROBE_TIMEOUT,
+            allow_redirects=True,  # Follow redirects
+            stream=True
+        )
+    except requests.exceptions.Timeout:
+        return None, "timeout", time.time() - start
+    except Exception as e:
+        return None, f"error: {e}", time.time() - start
+
+    elapsed = time.time() - start
+    if resp.status_code != 200:
+        resp.close()
+        return None, f"HTTP {resp.status_code}", elapsed
+
+    # Check if response is XML
+    content_type = resp.headers.get('Content-Type', '')
+    if 'xml' not in content_type and 'text' not in content_type:
+        resp.close()
+        return None, f"not XML ({content_type})", elapsed
+
+    return resp, "ok", elapsed
+
+
+def _close_probe(future: Future):
+    """Đóng response của một probe không được dùng (done callback)"""
+    try:
+        resp = future.result()[0]
+    except Exception:
+        return
+    if resp is not None:
+        resp.close()
+
+
+# Extensions to exclude (images, media files)
+EXCLUDED_EXTENSIONS = (
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.ico',  # Images
+    '.pdf', '.doc', '.docx', '.xls', '.xlsx',  # Documents
+    '.zip', '.rar', '.tar', '.gz',  # Archives
+    '.mp4', '.avi', '.mov', '.mp3', '.wav',  # Media
+    '.css', '.js'  # Assets
+)
+
+
+class SitemapNode:
+    """One fetched sitemap document (index or urlset) in the crawl tree"""
+
+    def __init__(self, url: str, depth: int = 0):
+        self.url = url
+        self.depth = depth
+        self.kind = None  # 'sitemapindex', 'urlset' hoặc None nếu không phải sitemap
+        self.url_count = 0
+        self.filtered_count = 0  # URL bị loại bởi SitemapFilter
+        self.bytes = 0
+        self.fetch_time = 0.0
+        self.error = None
+        self.children = []
+        self.urls = []  # URL thu được từ urlset này (không trả về qua API)
+
+    def iter_urls(self):
+        """Yield every page URL in this subtree, in crawl order"""
+        yield from self.urls
+        for child in self.children:
+            yield from child.iter_urls()
+
+    def total_url_count(self) -> int:
+        """Number of page URLs in this subtree"""
+        return self.url_count + sum(c.total_url_count() for c in self.children)
+
+    def total_filtered_count(self) -> int:
+        """Number of page URLs removed by the SitemapFilter in this subtree"""
+        return self.filtered_count + sum(c.total_filtered_count() for c in self.children)
+
+    def to_dict(self):
+        """Convert node (and its children) to dictionary for JSON response"""
+        return {
+            'url': self.url,
+            'kind': self.kind,
+            'depth': self.depth,
+            'url_count': self.url_count,
+            'total_url_count': self.total_url_count(),
+            'filtered_count': self.filtered_count,
+            'bytes': self.bytes,
+            'fetch_time': round(self.fetch_time, 3),
+            'error': self.error,
+            'children': [c.to_dict() for c in self.children]
+        }
+
+
+class SitemapCrawlContext:
+    """
+    Shared state and budget for one sitemap crawl.
+    Tracks visited sitemap URLs (cycle detection), collected page URLs,
+    depth, total bytes and a wall-clock deadline.
+    """
+
+    def __init__(self, max_urls: int = 10000, max_depth: int = MAX_DEPTH,
+                 max_bytes: int = MAX_BYTES, time_budget: float = TIME_BUDGET,
+                 url_filter: SitemapFilter = None):
+        self.max_urls = max_urls
+        self.url_filter = url_filter
+        self.max_depth = max_depth
+        self.max_bytes = max_bytes
+        self.deadline = time.time() + time_budget
+        self.visited = set()
+        self.seen_urls = set()
+        self.total_bytes = 0
+        self.fetch_count = 0
+        self.stop_reason = None  # Lý do crawl bị dừng sớm (partial result)
+        self.skipped = []  # Nhánh bị bỏ qua (cycle, quá sâu)
+
+    def should_stop(self) -> bool:
+        """Check global budgets; records stop_reason the first time one is exceeded"""
+        if self.stop_reason:
+            return True
+        if len(self.seen_urls) >= self.max_urls:
+            self.stop_reason = 'max_urls'
+        elif self.total_bytes >= self.max_bytes:
+            self.stop_reason = 'max_bytes'
+        elif time.time() >= self.deadline:
+            self.stop_reason = 'deadline'
+        return self.stop_reason is not None
+
+    def remaining_time(self) -> float:
+        """Seconds left before the deadline"""
+        return max(0.0, self.deadline - time.time())
+
+    def request_timeout(self) -> float:
+        """Per-request timeout, never past the crawl deadline"""
+        return max(0.1, min(PROBE_TIMEOUT, self.remaining_time()))
+
+
+class SitemapCrawl:
+    """Result of crawling a domain's sitemap: tree, flat URL list and probe log"""
+
+    def __init__(self, domain: str, max_urls: int):
+        self.domain = domain
+        self.max_urls = max_urls
+        self.root = None
+        self.urls = []
+        self.probes = []
+        self.elapsed = 0.0
+        self.stop_reason = None
+        self.skipped = []
+
+    def to_dict(self):
+        """Convert crawl result to dictionary for JSON response (without URL list)"""
+        return {
+            'domain': self.domain,
+            'max_urls': self.max_urls,
+            'count': len(self.urls),
+            'elapsed': round(self.elapsed, 3),
+            'truncated': self.stop_reason is not None,
+            'stop_reason': self.stop_reason,
+            'skipped': self.skipped,
+            'probes': self.probes,
+            'tree': self.root.to_dict() if self.root else None
+        }
+
+
+def fetch_sitemap_urls(domain: str, max_urls: int = 10000, url_filter: SitemapFilter = None):
+    """
+    Thử tìm và đọc sitemap từ domain.
+    Trả về danh sách URL hợp lệ (tối đa max_urls), đã áp dụng url_filter nếu có.
+    """
+    return list(crawl_sitemap(domain, max_urls=max_urls, url_filter=url_filter).urls)
+
+
+def crawl_sitemap(domain: str, max_urls: int = 10000, max_depth: int = MAX_DEPTH,
+                  max_bytes: int = MAX_BYTES, time_budget: float = TIME_BUDGET,
+                  url_filter: SitemapFilter = None, use_cache: bool = True) -> SitemapCrawl:
+    """
+    Crawl sitemap của domain, dùng cache LRU ngắn hạn.
+    Kết quả được cache CACHE_TTL giây theo (domain, giới hạn, filter); các crawl đồng
+    thời cho cùng key chỉ chạy một lần, các caller khác chờ kết quả đó.
+    Cache giới hạn theo tổng số URL (CACHE_MAX_URLS), không theo số kết quả. Chỉ
+    crawl đầy đủ được cache: crawl không tìm thấy sitemap (root = None) hoặc bị cắt
+    bởi deadline / byte budget thì lần sau crawl lại. Dừng vì max_urls vẫn là kết
+    quả đầy đủ với key này (max_urls nằm trong key).
+    Kết quả trả về được chia sẻ giữa các caller - không được sửa.
+    """
+    global _cache_url_count
+
+    if not use_cache:
+        return _crawl_sitemap(domain, max_urls, max_depth, max_bytes, time_budget, url_filter)
+
+    filter_key = url_filter.key() if url_filter else None
+    key = (domain.lower(), max_urls, max_depth, max_bytes, time_budget, filter_key)
+    with _cache_lock:
+        cached = _crawl_cache.get(key)
+        if cached and cached[0] > time.time():
+            _crawl_cache.move_to_end(key)
+            logger.info(f"[SitemapCache] Hit for {domain} (max_urls={max_urls})")
+            return cached[1]
+
+        future = _crawl_inflight.get(key)
+        owner = future is None
+        if owner:
+            future = Future()
+            _crawl_inflight[key] = future
+
+    if not owner:
+        logger.info(f"[SitemapCache] Waiting for in-flight crawl of {domain}")
+        return future.result()
+
+    try:
+        crawl = _crawl_sitemap(domain, max_urls, max_depth, max_bytes, time_budget, url_filter)
+    except Exception as e:
+        with _cache_lock:
+            _crawl_inflight.pop(key, None)
+        future.set_exception(e)
+        raise
+
+    with _cache_lock:
+        complete = crawl.stop_reason in (None, 'max_urls')
+        if crawl.root is not None and complete and len(crawl.urls) <= CACHE_MAX_URLS:
+            _cache_pop(key)
+            _crawl_cache[key] = (time.time() + CACHE_TTL, crawl)
+            _cache_url_count += len(crawl.urls)
+            while _cache_url_count > CACHE_MAX_URLS:
+                _cache_pop(next(iter(_crawl_cache)))
+        _crawl_inflight.pop(key, None)
+    future.set_result(crawl)
+    return crawl
+
+
+def _cache_pop(key):
+    """Xoá một kết quả khỏi cache và trừ số URL của nó (gọi khi đang giữ _cache_lock)"""
+    global _cache_url_count
+    cached = _crawl_cache.pop(key, None)
+    if cached:
+        _cache_url_count -= len(cached[1].urls)
+
+
+def clear_sitemap_cache():
+    """Xoá toàn bộ kết quả crawl đã cache"""
+    global _cache_url_count
+    with _cache_lock:
+        _crawl_cache.clear()
+        _cache_url_count = 0
+
+
+def _crawl_sitemap(domain: str, max_urls: int, max_depth: int, max_bytes: int,
+                   time_budget: float, url_filter: SitemapFilter = None) -> SitemapCrawl:
+    """
+    Tìm sitemap của domain và crawl toàn bộ cây sitemap.
+    Tất cả candidate được probe song song; response đầu tiên là sitemap có URL
+    (hoặc có URL nhưng đều bị filter loại) sẽ được dùng, response của các probe
+    còn lại được đóng khi chúng xong.
+    Mọi candidate dùng chung một SitemapCrawlContext: sitemap đã crawl qua
+    candidate trước không bị tải lại, byte budget và deadline tính cho cả crawl.
+    Khi vượt giới hạn (max_urls, max_bytes, deadline) crawl dừng lại và trả về
+    kết quả một phần kèm stop_reason.
+    """
+    crawl = SitemapCrawl(domain, max_urls)
+    candidates = _sitemap_candidates(domain)
+    race_start = time.time()
+    ctx = SitemapCrawlContext(max_urls=max_urls, max_depth=max_depth,
+                              max_bytes=max_bytes, time_budget=time_budget,
+                              url_filter=url_filter)
+
+    executor = ThreadPoolExecutor(max_workers=len(candidates))
+    future_to_url = {executor.submit(_probe_sitemap, url): url for url in candidates}
+
+    pending = set(future_to_url)
+    try:
+        for future in as_completed(future_to_url):
+            pending.discard(future)
+            sitemap_url = future_to_url[future]
+            resp, outcome, elapsed = future.result()
+            logger.info(f"[SitemapProbe] {sitemap_url} -> {outcome} ({elapsed:.2f}s)")
+            crawl.probes.append({'url': sitemap_url, 'outcome': outcome, 'elapsed': round(elapsed, 3)})
+
+            if resp is None:
+                continue
+            if sitemap_url in ctx.visited or resp.url in ctx.visited:
+                # Ví dụ http:// redirect tới sitemap https:// đã crawl
+                logger.info(f"[SitemapProbe] {sitemap_url} already crawled, skipping")
+                resp.close()
                 continue
 
-            # Check if response is XML
-            content_type = resp.headers.get('Content-Type', '')
-            if 'xml' not in content_type and 'text' not in content_type:
-                logger.warning(f"Not XML content: {content_type}")
+            root = SitemapNode(resp.url)
+            root.fetch_time = elapsed
+            ctx.visited.update({sitemap_url, resp.url})
+            skipped_before = len(ctx.skipped)
+            try:
+                _crawl_node(root, resp.content, ctx)
+            except Exception as e:
+                logger.warning(f"Error reading {sitemap_url}: {e}")
                 continue
+            finally:
+                resp.close()
 
-            # Pass max_urls to parse_sitemap
-            remaining_limit = max_urls - len(all_urls)
-            urls = parse_sitemap(resp.text, base_url=resp.url, max_urls=remaining_limit)
-
-            if urls:
-                logger.info(f"Found {len(urls)} URLs in {sitemap_url}")
-                for u in urls:
-                    if u not in visited:
-                        visited.add(u)
-                        all_urls.append(u)
-                        if len(all_urls) >= max_urls:
-                            logger.info(f"🚫 Reached limit {max_urls} URLs.")
-                            return all_urls
-                # If we found URLs, no need to try other candidates
-                if all_urls:
-                    break
-        except Exception as e:
-            logger.warning(f"Error reading {sitemap_url}: {e}")
+            filtered = root.total_filtered_count() or any(
+                skip['reason'] == 'filtered' for skip in ctx.skipped[skipped_before:]
+            )
+            if ctx.seen_urls or filtered:
+                crawl.root = root
+                crawl.urls = list(root.iter_urls())
+                if ctx.stop_reason:
+                    logger.warning(f"[SitemapCrawl] {domain}: stopped early ({ctx.stop_reason}), partial result")
+                logger.info(
+                    f"[SitemapProbe] Using {sitemap_url}: {len(crawl.urls)} URLs "
+                    f"(race won after {time.time() - race_start:.2f}s)"
+                )
+                break
+            if ctx.stop_reason:
+                # Hết budget của cả crawl: không thử candidate tiếp theo
+                logger.warning(f"[SitemapCrawl] {domain}: stopped ({ctx.stop_reason}) before finding URLs")
+                break
+    finally:
+        # Các probe đang chạy không huỷ được: không chờ chúng, nhưng đóng response
+        # ngay khi có để connection không bị giữ tới hết PROBE_TIMEOUT
+        for future in pending:
+            future.add_done_callback(_close_probe)
+        executor.shutdown(wait=False)
+
+    crawl.skipped = ctx.skipped
+    crawl.stop_reason = ctx.stop_reason
+    crawl.elapsed = time.time() - race_start
+    logger.info(f"Found {len(crawl.urls)} URLs in sitemap")
+    return crawl
 
-    logger.info(f"Found {len(all_urls)} URLs in sitemap")
-    return all_urls
 
-def parse_sitemap(xml_text: str, base_url: str, max_urls: int = 999999):
-    """Phân tích file XML, đọc <loc> với giới hạn max_urls"""
-    urls = []
+def parse_sitemap(xml_text, base_url: str = None):
+    """
+    Phân tích file XML sitemap.
+    Loại sitemap được xác định bằng root element (<sitemapindex> hoặc <urlset>).
+
+    Returns:
+        Tuple (kind, entries) với entries là list dict {'loc', 'lastmod'};
+        kind là None nếu tài liệu không phải sitemap (HTML, RSS...)
+    """
     soup = BeautifulSoup(xml_text, "xml")
-    loc_tags = soup.find_all("loc")
-
-    # Extensions to exclude (images, media files)
-    excluded_extensions = (
-        '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.ico',  # Images
-        '.pdf', '.doc', '.docx', '.xls', '.xlsx',  # Documents
-        '.zip', '.rar', '.tar', '.gz',  # Archives
-        '.mp4', '.avi', '.mov', '.mp3', '.wav',  # Media
-        '.css', '.js'  # Assets
-    )
-
-    for loc in loc_tags:
+    root = soup.find(True)
+    if root is None or root.name not in ('sitemapindex', 'urlset'):
+        return None, []
+
+    kind = root.name
+    entry_tag = 'sitemap' if kind == 'sitemapindex' else 'url'
+
+    entries = []
+    for entry in root.find_all(entry_tag, recursive=False):
+        loc = entry.find('loc')
+        if loc is None or not loc.text.strip():
+            continue
         url = loc.text.strip()
-        if url:
+        if base_url:
+            url = urljoin(base_url, url)
+        lastmod = entry.find('lastmod')
+        entries.append({
+            'loc': url,
+            'lastmod': lastmod.text.strip() if lastmod is not None else None
+        })
+
+    return kind, entries
+
+
+def _crawl_node(node: SitemapNode, xml_content, ctx: SitemapCrawlContext):
+    """Parse a fetched sitemap document into node, recursing into child sitemaps"""
+    node.bytes = len(xml_content)
+    ctx.total_bytes += node.bytes
+    ctx.fetch_count += 1
+    kind, entries = parse_sitemap(xml_content, base_url=node.url)
+    node.kind = kind
+
+    if kind is None:
+        node.error = 'Not a sitemap document'
+        return
+
+    if kind == 'urlset':
+        for entry in entries:
+            url = entry['loc']
             # Filter out URLs with excluded extensions
-            url_lower = url.lower()
-            if not any(url_lower.endswith(ext) for ext in excluded_extensions):
-                urls.append(url)
-                # Check limit while collecting URLs
-                if len(urls) >= max_urls:
-                    return urls
-
-    # Nếu sitemap là index (gồm các sitemap con)
-    if not urls or any("sitemap" in u for u in urls):
-        subs = []
-        for sub in urls:
-            # Check if we've reached limit
-            if len(subs) >= max_urls:
+            if url.lower().endswith(EXCLUDED_EXTENSIONS) or url in ctx.seen_urls:
+                continue
+            if ctx.url_filter and not ctx.url_filter.allows_url(url, entry['lastmod']):
+                node.filtered_count += 1
+                continue
+            ctx.seen_urls.add(url)
+            node.urls.append(url)
+            # Check limit while collecting URLs
+            if len(ctx.seen_urls) >= ctx.max_urls:
+                ctx.should_stop()
                 break
+        node.url_count = len(node.urls)
+        return
 
-            try:
-                logger.info(f"↳ Fetching nested sitemap: {sub}")
-                resp = requests.get(sub, timeout=10, allow_redirects=True, headers={"User-Agent": "Mozilla/5.0"}, verify=False)
-                if resp.status_code == 200:
-                    # Pass remaining limit to nested call
-                    remaining = max_urls - len(subs)
-                    nested_urls = parse_sitemap(resp.text, base_url=resp.url, max_urls=remaining)
-                    subs.extend(nested_urls)
-
-                    # Check if we've reached limit after extending
-                    if len(subs) >= max_urls:
-                        break
-            except Exception as e:
-                logger.warning(f"Error fetching nested sitemap {sub}: {e}")
-                continue
-        urls = subs
+    # Sitemap index: fetch từng sitemap con
+    for entry in entries:
+        if ctx.should_stop():
+            break
 
-    return urls[:max_urls]  # Ensure we don't exceed limit
\ No newline at end of file
+        child_url = entry['loc']
+        if child_url in ctx.visited:
+            logger.warning(f"[SitemapCrawl] Cycle detected, skipping {child_url}")
+            ctx.skipped.append({'url': child_url, 'reason': 'already_visited'})
+            continue
+        if ctx.url_filter and not ctx.url_filter.allows_child(child_url, entry['lastmod']):
+            logger.info(f"[SitemapCrawl] Filtered out child sitemap {child_url}")
+            ctx.skipped.append({'url': child_url, 'reason': 'filtered'})
+            continue
+        if node.depth + 1 > ctx.max_depth:
+            logger.warning(f"[SitemapCrawl] Max depth {ctx.max_depth} reached, skipping {child_url}")
+            ctx.skipped.append({'url': child_url, 'reason': 'max_depth'})
+            continue
+        ctx.visited.add(child_url)
+
+        child = SitemapNode(child_url, depth=node.depth + 1)
+        node.children.append(child)
+        logger.info(f"↳ Fetching nested sitemap: {child.url}")
+        start = time.time()
+        try:
+            resp = _get_session().get(child.url, timeout=ctx.request_timeout(), allow_redirects=True)
+            child.fetch_time = time.time() - start
+            if resp.status_code != 200:
+                child.error = f"HTTP {resp.status_code}"
+                continue
+            if resp.url != child.url:
+                # Redirect tới sitemap đã crawl
+                if resp.url in ctx.visited:
+                    child.error = 'Redirected to an already visited sitemap'
+                    ctx.skipped.append({'url': child_url, 'reason': 'already_visited'})
+                    continue
+                ctx.visited.add(resp.url)
+            _crawl_node(child, resp.content, ctx)
+        except Exception as e:
+            child.fetch_time = time.time() - start
+            child.error = str(e)
+            logger.warning(f"Error fetching nested sitemap {child.url}: {e}")
@@ -0,0 +1,348 @@
+"""
+Asyncio WordPress REST API client
+Fetches, parses and updates posts on one event loop with aiohttp, so hundreds
+of requests across several sites can be in flight without a thread each.
+Lookup planning, post parsing and post type learning are shared with
+WordPressService; the sync helpers at the bottom keep Flask routes unchanged.
+They run on one long-lived event loop thread with a shared aiohttp session,
+so connections stay open (keep-alive) across Flask requests.
+"""
+import asyncio
+import atexit
+import base64
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+
+from services.wordpress_service import (
+    WordPressService,
+    WordPressAPIError,
+    SlugResolution,
+    SLUG_BATCH_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_CONNECTIONS = 200  # Open connections across all sites
+MAX_CONNECTIONS_PER_HOST = 20  # Open connections to one WordPress site
+
+# Event loop dùng chung cho các sync facade (chạy trên thread riêng) và session của nó
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_thread: Optional[threading.Thread] = None
+_loop_lock = threading.Lock()
+_shared_session: Optional[aiohttp.ClientSession] = None
+
+
+def create_client_session(limit: int = MAX_CONNECTIONS,
+                          limit_per_host: int = MAX_CONNECTIONS_PER_HOST) -> aiohttp.ClientSession:
+    """
+    Create an aiohttp session with per-host connection limits
+
+    Must be called from a running event loop.
+
+    Args:
+        limit: Maximum open connections in total
+        limit_per_host: Maximum open connections to a single site
+
+    Returns:
+        aiohttp.ClientSession (caller closes it)
+    """
+    # ssl=False: same as verify=False in WordPressService (self-signed certificates)
+    connector = aiohttp.TCPConnector(limit=limit, limit_per_host=limit_per_host, ssl=False)
+    return aiohttp.ClientSession(connector=connector)
+
+
+class AsyncWordPressClient:
+    """aiohttp counterpart of WordPressService for one site"""
+
+    def __init__(self, service: WordPressService, session: aiohttp.ClientSession):
+        """
+        Initialize async client
+
+        Args:
+            service: WordPressService of the site (credentials, parsing, post type routing)
+            session: Shared aiohttp session (see create_client_session)
+        """
+        self.service = service
+        self.session = session
+        self.site_url = service.site_url
+        credentials = f"{service.username}:{service.app_password}".encode('utf-8')
+        self.headers = {'Authorization': f"Basic {base64.b64encode(credentials).decode('ascii')}"}
+        self.timeout = aiohttp.ClientTimeout(total=service.timeout)
+        # Giới hạn request đồng thời theo SiteThrottle.limit (throttle dùng threading nên không chờ được trên loop)
+        self._in_flight = 0
+        self._slot = asyncio.Condition()
+
+    async def _acquire(self):
+        """Wait until fewer than the site's current throttle limit requests are in flight"""
+        async with self._slot:
+            await self._slot.wait_for(lambda: self._in_flight < int(self.service.throttle.limit))
+            self._in_flight += 1
+
+    async def _release(self):
+        async with self._slot:
+            self._in_flight -= 1
+            # Limit có thể đã tăng: đánh thức mọi request đang chờ
+            self._slot.notify_all()
+
+    async def _request(self, method: str, endpoint: str, **kwargs) -> Tuple[int, object]:
+        """
+        Make HTTP request to WordPress API
+
+        Shares the site's circuit breaker and adaptive limit with
+        WordPressService: requests in flight stay below SiteThrottle.limit,
+        so 429s and failures lower this client's concurrency too.
+
+        Args:
+            method: HTTP method
+            endpoint: API endpoint (e.g., '/wp-json/wp/v2/posts')
+            **kwargs: Additional arguments for aiohttp (params, json)
+
+        Returns:
+            Tuple of (status code, decoded JSON body or None)
+
+        Raises:
+            WordPressAPIError: If request fails
+        """
+        url = f"{self.site_url}{endpoint}"
+        throttle = self.service.throttle
+        await self._acquire()
+        try:
+            probe = throttle.check_circuit()  # Fail fast on sites that are down
+            start = time.time()
+            try:
+                async with self.session.request(method, url, headers=self.headers, timeout=self.timeout,
+                                                **kwargs) as resp:
+                    try:
+                        data = await resp.json(content_type=None)
+                    except ValueError:
+                        data = None
+            except asyncio.TimeoutError:
+                throttle.record('failed', time.time() - start)
+                raise WordPressAPIError(f"Request timeout after {self.service.timeout}s", status_code=408)
+            except aiohttp.ClientConnectionError as e:
+                throttle.record('failed', time.time() - start)
+                raise WordPressAPIError(f"Connection error: {str(e)}", status_code=503)
+            except aiohttp.ClientError as e:
+                throttle.record('failed', time.time() - start)
+                raise WordPressAPIError(f"Request failed: {str(e)}")
+            except asyncio.CancelledError:
+                # Huỷ (ví dụ gather bị dừng) không nói gì về site: chỉ trả lại lượt probe
+                if probe:
+                    throttle.abandon_probe()
+                raise
+            except Exception as e:
+                throttle.record('failed', time.time() - start)
+                raise WordPressAPIError(f"Request failed: {str(e)}")
+
+            if resp.status == 429:
+                throttle.record('throttled', time.time() - start)
+            elif resp.status in (502, 503, 504):
+                throttle.record('failed', time.time() - start)
+            else:
+                throttle.record('ok', time.time() - start)
+            return resp.status, data
+        finally:
+            await self._release()
+
+    async def fetch_posts_by_slugs(self, slugs: List[str], post_type: str = 'posts',
+                                   fields: Optional[Tuple[str, ...]] = None) -> List[Dict]:
+        """
+        Fetch several posts by slug in a single request
+
+        Returns:
+            List of raw post dicts
+
+        Raises:
+            WordPressAPIError: If the request fails
+        """
+        params = {'slug': ','.join(slugs), 'per_page': SLUG_BATCH_SIZE}
+        # aiohttp only accepts str/int params
+        for key, value in self.service._projection_params(fields).items():
+            params[key] = '1' if value is True else value
+
+        status, data = await self._request('GET', f'/wp-json/wp/v2/{post_type}', params=params)
+        if status != 200:
+            raise WordPressAPIError(f"Batch slug lookup failed with status {status}", status_code=status)
+        return data or []
+
+    async def fetch_posts(self, urls: List[str], fields: Optional[Tuple[str, ...]] = None) -> List[Dict]:
+        """
+        Fetch and parse posts by URL
+
+        Same lookup plan as WordPressService.fetch_posts_concurrent, with every
+        chunk of a round in flight at once (bounded by the site's throttle limit).
+
+        Args:
+            urls: List of post URLs
+            fields: Keys of parse_post_data() output to fetch (None = full post)
+
+        Returns:
+            List of post dicts (includes error entries for failed fetches)
+        """
+        if not urls:
+            return []
+        self.service._projection_params(fields)  # Raises ValueError for unknown fields before any request
+
+        start_time = time.time()
+        resolution = SlugResolution(self.service, urls)
+        results = []
+
+        for round_number in range(2):
+            plan = resolution.plan_round(round_number)
+            lookups = [(post_type, chunk) for post_type, chunks in plan.items() for chunk in chunks]
+            if not lookups:
+                break
+
+            outcomes = await asyncio.gather(
+                *(self.fetch_posts_by_slugs(chunk, post_type, fields) for post_type, chunk in lookups),
+                return_exceptions=True
+            )
+            for (post_type, chunk), outcome in zip(lookups, outcomes):
+                if isinstance(outcome, Exception):
+                    logger.error(f"Error resolving {len(chunk)} slugs as {post_type}: {outcome}")
+                    resolved = resolution.chunk_failed(chunk, str(outcome))
+                else:
+                    resolved = resolution.chunk_found(post_type, chunk, outcome)
+                results.extend(self.service.resolved_post_result(*item, fields) for item in resolved)
+
+            results.extend(self.service.resolved_post_result(*item, fields) for item in resolution.finish_round())
+
+        results.extend(self.service.resolved_post_result(*item) for item in resolution.unresolved())
+
+        logger.info(f"[AsyncWordPressClient] Fetched {len(results)} posts from {self.site_url} "
+                    f"in {time.time() - start_time:.1f}s")
+        return results
+
+    async def update_post(self, post_id: int, update_data: Dict) -> Tuple[bool, Dict]:
+        """
+        Update WordPress post (only changed fields, see PostFingerprintStore)
+
+        Returns:
+            Tuple of (success: bool, updated_post: dict or error)
+        """
+        changes = self.service.fingerprints.diff(post_id, update_data)
+        if update_data and not changes:
+            return True, self.service.skipped_update_result(post_id)
+
+        try:
+            status, data = await self._request('POST', f'/wp-json/wp/v2/posts/{post_id}', json=changes)
+        except WordPressAPIError as e:
+            return False, {'error': e.message}
+
+        if status == 200:
+            self.service.fingerprints.remember(post_id, changes)
+            return True, self.service.parse_post_data(data)
+        error_msg = f"Update failed with status {status}"
+        if isinstance(data, dict):
+            error_msg = data.get('message', error_msg)
+        return False, {'error': error_msg}
+
+    async def update_posts(self, updates: List[Tuple[int, Dict]]) -> List[Tuple[bool, Dict]]:
+        """
+        Update several posts concurrently
+
+        Args:
+            updates: List of (post_id, update_data)
+
+        Returns:
+            List of (success, updated_post or error), in input order
+        """
+        return list(await asyncio.gather(*(self.update_post(post_id, data) for post_id, data in updates)))
+
+
+async def fetch_sites_posts(jobs: List[Tuple[WordPressService, List[str]]],
+                            fields: Optional[Tuple[str, ...]] = None,
+                            session: Optional[aiohttp.ClientSession] = None) -> List[List[Dict]]:
+    """
+    Fetch posts from several sites at once over one aiohttp session
+
+    Args:
+        jobs: List of (service, urls)
+        fields: Keys of parse_post_data() output to fetch (None = full post)
+        session: Session to use (None = a new one, closed afterwards)
+
+    Returns:
+        One result list per job, in input order
+    """
+    if session is None:
+        async with create_client_session() as session:
+            return await fetch_sites_posts(jobs, fields, session)
+    return list(await asyncio.gather(*(
+        AsyncWordPressClient(service, session).fetch_posts(urls, fields) for service, urls in jobs
+    )))
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Start the shared event loop thread if it is not running (e.g. first call, or after a fork)"""
+    global _loop, _loop_thread, _shared_session
+
+    with _loop_lock:
+        if _loop_thread is None or not _loop_thread.is_alive():
+            _loop = asyncio.new_event_loop()
+            _shared_session = None  # Session của loop cũ không dùng được trên loop mới
+            _loop_thread = threading.Thread(target=_loop.run_forever, name='wp-async-loop', daemon=True)
+            _loop_thread.start()
+        return _loop
+
+
+async def _get_session() -> aiohttp.ClientSession:
+    """Long-lived session of the shared loop (only called on the loop thread)"""
+    global _shared_session
+
+    if _shared_session is None or _shared_session.closed:
+        _shared_session = create_client_session()
+    return _shared_session
+
+
+def _run_shared(make_coro):
+    """
+    Run a coroutine on the shared loop and wait for its result
+
+    Args:
+        make_coro: async callable(session) -> result
+
+    Returns:
+        The coroutine's result (exceptions are re-raised in the caller)
+    """
+    async def run():
+        return await make_coro(await _get_session())
+
+    return asyncio.run_coroutine_threadsafe(run(), _get_loop()).result()
+
+
+@atexit.register
+def close_shared_loop():
+    """Close the shared session and stop the shared loop thread"""
+    global _loop_thread, _shared_session
+
+    with _loop_lock:
+        if _loop_thread is None or not _loop_thread.is_alive():
+            return
+        if _shared_session is not None:
+            asyncio.run_coroutine_threadsafe(_shared_session.close(), _loop).result()
+            _shared_session = None
+        _loop.call_soon_threadsafe(_loop.stop)
+        _loop_thread.join()
+        _loop_thread = None
+        _loop.close()
+
+
+def fetch_posts_sync(service: WordPressService, urls: List[str],
+                     fields: Optional[Tuple[str, ...]] = None) -> List[Dict]:
+    """Sync facade: fetch and parse posts of one site on the shared event loop"""
+    return fetch_sites_posts_sync([(service, urls)], fields)[0]
+
+
+def fetch_sites_posts_sync(jobs: List[Tuple[WordPressService, List[str]]],
+                           fields: Optional[Tuple[str, ...]] = None) -> List[List[Dict]]:
+    """Sync facade for fetch_sites_posts"""
+    return _run_shared(lambda session: fetch_sites_posts(jobs, fields, session))
+
+
+def update_posts_sync(service: WordPressService, updates: List[Tuple[int, Dict]]) -> List[Tuple[bool, Dict]]:
+    """Sync facade: update several posts of one site concurrently"""
+    return _run_shared(lambda session: AsyncWordPressClient(service, session).update_posts(updates))
@@ -3,12 +3,21 @@ WordPress REST API Service Layer
 Handles all WordPress API operations with authentication, caching, and error handling
 """
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
 import urllib3
+import hashlib
+import json
 import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from html import unescape
 from typing import Dict, List, Optional, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 import time
+from contextlib import contextmanager
+from urllib.parse import urlparse, unquote, quote
 from utils.exceptions import ExternalServiceError
 
 # Disable SSL verification warnings for sites with self-signed certificates
@@ -16,6 +25,73 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_POOL_SIZE = 10  # Keep-alive connections per site (matches max fetch workers)
+SLUG_BATCH_SIZE = 100  # WordPress REST API per_page maximum
+# REST fields needed for each key of parse_post_data() output
+POST_FIELD_SOURCES = {
+    'id': ('id',),
+    'url': ('link',),
+    'title': ('title',),
+    'content': ('content',),
+    'excerpt': ('excerpt',),
+    'status': ('status',),
+    'categories': ('_links', '_embedded'),
+    'featured_image': ('_links', '_embedded'),
+    'seo_title': ('yoast_head_json', 'title'),
+    'seo_description': ('yoast_head_json',),
+    'date_modified': ('modified',),
+    'author_id': ('author',),
+}
+# Embedded relations needed for each key of parse_post_data() output
+POST_FIELD_EMBEDS = {
+    'categories': 'wp:term',
+    'featured_image': 'wp:featuredmedia',
+}
+# Fields always requested: needed to match posts back to URLs
+POST_MATCH_FIELDS = ('id', 'slug', 'link', 'type')
+
+# Common projections
+LINK_FIELDS = ('id', 'url', 'content', 'date_modified')
+EDITOR_FIELDS = ('id', 'url', 'title', 'status', 'content', 'date_modified')
+VERSION_FIELDS = ('id', 'date_modified')
+
+# REST fields stored in the local post index
+INDEX_FIELDS = ('id', 'link', 'slug', 'type', 'modified')
+
+BATCH_UPDATE_SIZE = 25  # WordPress batch API request limit
+SLUG_BATCH_MAX_CHARS = 6000  # Encoded query length cap, under common 8 KB request-line limits
+
+# Update body key -> parse_post_data() key, for fields tracked by PostFingerprintStore
+FINGERPRINT_FIELDS = {
+    'title': 'title',
+    'content': 'content',
+    'excerpt': 'excerpt',
+    'status': 'status',
+    'categories': 'categories',
+    'yoast_wpseo_title': 'seo_title',
+    'yoast_wpseo_metadesc': 'seo_description',
+}
+FINGERPRINT_TTL = 3600  # Seconds a remembered field value is trusted
+FINGERPRINT_MAX_POSTS = 20000  # Posts remembered per site
+
+# Adaptive concurrency and circuit breaker (SiteThrottle)
+THROTTLE_INITIAL_LIMIT = 4  # Requests in flight to a site at start
+THROTTLE_MAX_LIMIT = 16
+THROTTLE_SLOW_LATENCY = 3.0  # Seconds; slower responses do not raise the limit
+CIRCUIT_FAILURE_THRESHOLD = 5  # Consecutive failures that open the circuit
+CIRCUIT_COOLDOWN = 30  # Seconds the circuit stays open before a probe request
+REQUEST_RETRIES = 2  # Retries of idempotent (GET) requests after throttling or failures
+RETRY_AFTER_MAX = 10  # Seconds; cap on honoured Retry-After headers
+
+CATEGORY_FIELDS = ('id', 'name', 'slug', 'count', 'parent')
+CATEGORY_CACHE_TTL = 600  # Seconds the category catalog of a site is reused
+CATEGORY_WORKERS = 4  # Category pages fetched in parallel
+
+# Post write queue
+WRITE_CONCURRENCY = 2  # Post updates in flight per site
+WRITE_WAIT_TIMEOUT = 60  # Seconds a save request waits for its queued write
+VERSION_WORKERS = 4  # include= lookups of modified dates run in parallel
+
 
 class WordPressAPIError(ExternalServiceError):
     """Custom exception for WordPress API errors"""
@@ -23,10 +99,646 @@ class WordPressAPIError(ExternalServiceError):
         super().__init__('WordPress API', message, status_code=status_code or 503)
 
 
+class PostTypeRouter:
+    """
+    Per-site memory of which REST endpoint ('posts' or 'pages') serves a URL
+
+    Learns slug -> type and path prefix -> type from earlier lookups so
+    later lookups hit the likely endpoint first. Tracks how often the
+    guess was right.
+    """
+
+    POST_TYPES = ('posts', 'pages')
+    MIN_PREFIX_OBSERVATIONS = 3  # Observations needed before trusting a path prefix
+    PREFIX_DOMINANCE = 0.8  # Share of one type needed to route by prefix
+
+    def __init__(self):
+        self._slug_types: Dict[str, str] = {}
+        self._prefix_counts: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.unknown = 0
+
+    @staticmethod
+    def _slug_key(url: str) -> str:
+        return unquote(url.rstrip('/').split('/')[-1]).lower()
+
+    @staticmethod
+    def path_prefix(url: str) -> str:
+        """Path without its last segment ('/blog/2024/my-post/' -> '/blog/2024')"""
+        segments = [seg for seg in urlparse(url).path.split('/') if seg]
+        return '/' + '/'.join(segments[:-1]).lower()
+
+    def guess(self, url: str) -> Optional[str]:
+        """
+        Guess the post type for a URL
+
+        Returns:
+            'posts', 'pages', or None when there is not enough evidence
+        """
+        with self._lock:
+            known = self._slug_types.get(self._slug_key(url))
+            if known:
+                return known
+
+            counts = self._prefix_counts.get(self.path_prefix(url))
+            if not counts:
+                return None
+            total = sum(counts.values())
+            post_type, count = max(counts.items(), key=lambda item: item[1])
+            if total >= self.MIN_PREFIX_OBSERVATIONS and count / total >= self.PREFIX_DOMINANCE:
+                return post_type
+            return None
+
+    def learn(self, url: str, post_type: str, guessed: Optional[str] = None):
+        """
+        Record the endpoint that actually served a URL
+
+        Args:
+            url: Post URL
+            post_type: Endpoint that returned the post
+            guessed: What guess() returned before the lookup
+        """
+        with self._lock:
+            if guessed is None:
+                self.unknown += 1
+            elif guessed == post_type:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+            self._slug_types[self._slug_key(url)] = post_type
+            counts = self._prefix_counts.setdefault(self.path_prefix(url), {})
+            counts[post_type] = counts.get(post_type, 0) + 1
+
+    def stats(self) -> Dict:
+        """Routing statistics (hit rate over lookups that had a guess)"""
+        with self._lock:
+            guessed = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'unknown': self.unknown,
+                'hit_rate': round(self.hits / guessed, 3) if guessed else None,
+                'known_slugs': len(self._slug_types),
+                'known_prefixes': len(self._prefix_counts)
+            }
+
+
+class PostFingerprintStore:
+    """
+    Per-site hashes of the last known value of each editable post field
+
+    Filled from fetched posts and from successful updates. Used to drop
+    fields that did not change from an update, and to skip updates where
+    nothing changed. Entries expire after FINGERPRINT_TTL so edits made
+    outside the app are not hidden for long.
+    """
+
+    def __init__(self, ttl: int = FINGERPRINT_TTL, max_posts: int = FINGERPRINT_MAX_POSTS):
+        self.ttl = ttl
+        self.max_posts = max_posts
+        self._posts: 'OrderedDict[int, Dict[str, Tuple[str, float]]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.skipped_updates = 0
+        self.skipped_fields = 0
+
+    @staticmethod
+    def _hash(field: str, value) -> str:
+        if field == 'categories':
+            value = sorted(int(cat['id'] if isinstance(cat, dict) else cat) for cat in value or [])
+        return hashlib.sha1(json.dumps(value, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+    def remember(self, post_id: int, values: Dict):
+        """
+        Record field values known to be on WordPress
+
+        Args:
+            post_id: WordPress post ID
+            values: Dict keyed by update body field (see FINGERPRINT_FIELDS)
+        """
+        now = time.time()
+        hashes = {field: (self._hash(field, value), now) for field, value in values.items()
+                  if field in FINGERPRINT_FIELDS}
+        if not post_id or not hashes:
+            return
+        with self._lock:
+            entry = self._posts.setdefault(post_id, {})
+            entry.update(hashes)
+            self._posts.move_to_end(post_id)
+            while len(self._posts) > self.max_posts:
+                self._posts.popitem(last=False)
+
+    def remember_fetched(self, post: Dict, parsed: Dict, fields: Optional[Tuple[str, ...]] = None):
+        """
+        Record the fields of a fetched post that were actually fetched
+
+        Args:
+            post: Raw post from the REST API
+            parsed: parse_post_data() output for it
+            fields: Projection used for the fetch (None = full post)
+        """
+        values = {}
+        for field, parsed_key in FINGERPRINT_FIELDS.items():
+            if fields is not None and parsed_key not in fields:
+                continue
+            if parsed_key == 'categories' and 'wp:term' not in post.get('_embedded', {}):
+                continue
+            if parsed_key.startswith('seo_') and 'yoast_head_json' not in post:
+                continue
+            if parsed_key in ('title', 'content', 'excerpt') and parsed_key not in post:
+                continue
+            if parsed_key == 'status' and 'status' not in post:
+                continue
+            values[field] = parsed.get(parsed_key)
+        self.remember(parsed.get('id'), values)
+
+    def diff(self, post_id: int, update_data: Dict) -> Dict:
+        """
+        Drop fields whose value matches the remembered one
+
+        Returns:
+            Dict with only the fields that changed (or are not tracked)
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._posts.get(post_id, {})
+            changed = {}
+            for field, value in update_data.items():
+                known = entry.get(field)
+                if known and now - known[1] <= self.ttl and known[0] == self._hash(field, value):
+                    continue
+                changed[field] = value
+
+            self.skipped_fields += len(update_data) - len(changed)
+            if update_data and not changed:
+                self.skipped_updates += 1
+        return changed
+
+    def forget(self, post_id: int):
+        with self._lock:
+            self._posts.pop(post_id, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'posts': len(self._posts),
+                'skipped_updates': self.skipped_updates,
+                'skipped_fields': self.skipped_fields
+            }
+
+
+class CategoryCatalog:
+    """
+    Cached list of all categories of one site
+
+    Loaded on first use and reused for CATEGORY_CACHE_TTL seconds. Concurrent
+    callers wait for a single load instead of each fetching the catalog.
+    """
+
+    def __init__(self, ttl: int = CATEGORY_CACHE_TTL):
+        self.ttl = ttl
+        self._categories: Optional[List[Dict]] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def get(self, load, refresh: bool = False) -> List[Dict]:
+        """
+        Return the cached catalog, calling load() when missing, expired or refresh=True
+        """
+        with self._lock:
+            if refresh or self._categories is None or time.time() - self._loaded_at > self.ttl:
+                self._categories = load()
+                self._loaded_at = time.time()
+                self.loads += 1
+            return self._categories
+
+    def invalidate(self):
+        """Drop the cached catalog; the next get() reloads it"""
+        with self._lock:
+            self._categories = None
+
+    @staticmethod
+    def _fold(text: str) -> str:
+        """Lowercase and strip accents ('Tin tức' -> 'tin tuc')"""
+        decomposed = unicodedata.normalize('NFD', (text or '').lower().replace('đ', 'd'))
+        return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+    @classmethod
+    def search(cls, categories: List[Dict], query: str) -> List[Dict]:
+        """Categories whose name contains query; names starting with it come first"""
+        needle = cls._fold(query).strip()
+        if not needle:
+            return list(categories)
+        matches = [(cls._fold(unescape(cat.get('name') or '')), cat) for cat in categories]
+        matches = [(name, cat) for name, cat in matches if needle in name]
+        matches.sort(key=lambda item: not item[0].startswith(needle))  # Stable: keeps name order
+        return [cat for _, cat in matches]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'cached': self._categories is not None,
+                'count': len(self._categories) if self._categories is not None else 0,
+                'age': round(time.time() - self._loaded_at, 1) if self._categories is not None else None,
+                'loads': self.loads
+            }
+
+
+class SiteThrottle:
+    """
+    Adaptive concurrency limit and circuit breaker for one site
+
+    The limit on requests in flight is halved when the site throttles
+    (429) or fails (timeouts, connection errors, 502/503/504), and grows
+    by about one per limit's worth of fast successful responses (AIMD).
+    After CIRCUIT_FAILURE_THRESHOLD consecutive failures the circuit
+    opens: requests fail immediately until CIRCUIT_COOLDOWN has passed,
+    then a single probe request decides whether it closes again.
+    """
+
+    def __init__(self, initial_limit: int = THROTTLE_INITIAL_LIMIT, max_limit: int = THROTTLE_MAX_LIMIT,
+                 failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD, cooldown: float = CIRCUIT_COOLDOWN):
+        self.limit = float(initial_limit)
+        self.max_limit = max_limit
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+        self.consecutive_failures = 0
+        self.latency: Optional[float] = None  # Exponential moving average (seconds)
+        self.counts = {'ok': 0, 'throttled': 0, 'failed': 0, 'rejected': 0}
+        self._cond = threading.Condition()
+
+    def _check_circuit(self) -> bool:
+        """
+        Raise when the circuit is open; lets one probe through after the cooldown
+
+        Returns:
+            True if the caller's request is the half-open probe
+        """
+        if self.opened_at is None:
+            return False
+        remaining = self.cooldown - (time.time() - self.opened_at)
+        if remaining > 0 or self.probing:
+            self.counts['rejected'] += 1
+            raise WordPressAPIError(
+                f"Site unavailable (circuit open after {self.consecutive_failures} failures), "
+                f"retry in {max(remaining, 0):.0f}s",
+                status_code=503
+            )
+        self.probing = True
+        return True
+
+    def acquire(self):
+        """
+        Wait for a request slot
+
+        Raises:
+            WordPressAPIError: If the circuit is open
+        """
+        with self._cond:
+            self._check_circuit()
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+                self._check_circuit()
+            self.in_flight += 1
+
+    def check_circuit(self) -> bool:
+        """
+        Raise WordPressAPIError when the circuit is open (for callers that limit concurrency themselves)
+
+        Returns:
+            True if the caller's request is the half-open probe; it must end
+            with record() or abandon_probe()
+        """
+        with self._cond:
+            return self._check_circuit()
+
+    def abandon_probe(self):
+        """Give up the half-open probe without an outcome (request cancelled), so another request can probe"""
+        with self._cond:
+            self.probing = False
+            self._cond.notify_all()
+
+    def release(self, outcome: str, latency: float):
+        """
+        Record the outcome of a request and free its slot
+
+        Args:
+            outcome: 'ok', 'throttled' (429) or 'failed'
+            latency: Request duration in seconds
+        """
+        with self._cond:
+            self.in_flight -= 1
+            self._record(outcome, latency)
+            self._cond.notify_all()
+
+    def record(self, outcome: str, latency: float):
+        """Record the outcome of a request made without acquire()"""
+        with self._cond:
+            self._record(outcome, latency)
+            self._cond.notify_all()
+
+    def _record(self, outcome: str, latency: float):
+        """Update limit and circuit state (caller holds the lock)"""
+        self.counts[outcome] += 1
+
+        if outcome == 'failed':
+            self.limit = max(1.0, self.limit / 2)
+            self.consecutive_failures += 1
+            if self.probing or self.consecutive_failures >= self.failure_threshold:
+                if self.opened_at is None or self.probing:
+                    logger.warning(f"[SiteThrottle] Circuit opened after {self.consecutive_failures} failures")
+                self.opened_at = time.time()
+            self.probing = False
+        else:
+            # The site answered: close the circuit
+            if self.opened_at is not None:
+                logger.info("[SiteThrottle] Circuit closed")
+            self.opened_at = None
+            self.probing = False
+            self.consecutive_failures = 0
+
+            if outcome == 'throttled':
+                self.limit = max(1.0, self.limit / 2)
+            else:
+                self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+                if latency <= THROTTLE_SLOW_LATENCY:
+                    self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                'limit': int(self.limit),
+                'in_flight': self.in_flight,
+                'circuit': 'open' if self.opened_at is not None else 'closed',
+                'consecutive_failures': self.consecutive_failures,
+                'latency': round(self.latency, 3) if self.latency is not None else None,
+                **self.counts
+            }
+
+
+class PostWriteQueue:
+    """
+    Ordered write queue for one site's post updates
+
+    Updates for the same post run one at a time, in submission order. While
+    an update of a post is queued (waiting behind the concurrency limit or
+    behind an in-flight write of that post), later updates of the post are
+    merged into it, so a burst of saves becomes one request carrying the
+    latest value of every field. At most `max_concurrent` writes run at once.
+    Writes made outside the queue (bulk updates) take hold() on their posts to
+    stay in order with queued ones.
+    """
+
+    def __init__(self, write, max_concurrent: int = WRITE_CONCURRENCY):
+        """
+        Args:
+            write: callable(post_id, update_data) -> (success, result)
+            max_concurrent: Maximum writes in flight
+        """
+        self._write = write
+        self.max_concurrent = max_concurrent
+        self._pending: 'OrderedDict[int, Dict]' = OrderedDict()  # post_id -> {data, waiters, queued_at}
+        self._in_flight = set()
+        self._held = set()  # Post đang được ghi ngoài queue (hold)
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._closing = False
+        self.counts = {'submitted': 0, 'coalesced': 0, 'written': 0, 'failed': 0}
+
+    def submit(self, post_id: int, update_data: Dict) -> Future:
+        """
+        Queue an update
+
+        Args:
+            post_id: WordPress post ID
+            update_data: Fields to update
+
+        Returns:
+            Future resolving to update_post()'s (success, result); updates
+            merged into one request share its result
+        """
+        future = Future()
+        with self._lock:
+            self.counts['submitted'] += 1
+            pending = self._pending.get(post_id)
+            if pending:
+                pending['data'].update(update_data)
+                pending['waiters'].append(future)
+                self.counts['coalesced'] += 1
+            else:
+                self._pending[post_id] = {'data': dict(update_data), 'waiters': [future], 'queued_at': time.time()}
+            self._dispatch()
+        return future
+
+    def _dispatch(self):
+        """Start queued writes while slots are free (caller holds the lock)"""
+        while len(self._in_flight) < self.max_concurrent:
+            post_id = next((pid for pid in self._pending
+                            if pid not in self._in_flight and pid not in self._held), None)
+            if post_id is None:
+                return
+            pending = self._pending.pop(post_id)
+            self._in_flight.add(post_id)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix='wp-write')
+            self._executor.submit(self._run, post_id, pending)
+
+    @contextmanager
+    def hold(self, post_ids):
+        """
+        Reserve posts for a write made outside the queue
+
+        Waits until queued and in-flight updates of the posts have finished,
+        then keeps later submits of them queued until the block exits, so
+        they run after the outside write instead of racing it.
+
+        Args:
+            post_ids: Post IDs the outside write touches
+        """
+        post_ids = set(post_ids)
+        with self._released:
+            self._released.wait_for(
+                lambda: not post_ids & (self._in_flight | self._held | set(self._pending)))
+            self._held |= post_ids
+        try:
+            yield
+        finally:
+            with self._released:
+                self._held -= post_ids
+                self._released.notify_all()
+                self._dispatch()
+
+    def _shutdown_if_idle(self):
+        """Stop the worker threads of a closed queue once it has drained (caller holds the lock)"""
+        if self._closing and self._executor is not None and not self._pending and not self._in_flight:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def close(self):
+        """
+        Shut down the worker threads once queued and in-flight writes finish
+
+        Writes already submitted still complete and resolve their futures.
+        """
+        with self._lock:
+            self._closing = True
+            self._shutdown_if_idle()
+
+    def _run(self, post_id: int, pending: Dict):
+        try:
+            success, result = self._write(post_id, pending['data'])
+        except Exception as e:
+            logger.error(f"[PostWriteQueue] Write of post {post_id} failed: {e}")
+            success, result = False, {'error': str(e)}
+
+        with self._lock:
+            self._in_flight.discard(post_id)
+            self.counts['written' if success else 'failed'] += 1
+            self._released.notify_all()
+            self._dispatch()
+            self._shutdown_if_idle()
+
+        for future in pending['waiters']:
+            future.set_result((success, result))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            oldest = min((p['queued_at'] for p in self._pending.values()), default=None)
+            return {
+                'depth': len(self._pending),
+                'in_flight': len(self._in_flight),
+                'max_concurrent': self.max_concurrent,
+                'oldest_wait': round(time.time() - oldest, 2) if oldest is not None else None,
+                **self.counts
+            }
+
+
+class SlugResolution:
+    """
+    Planning state for resolving URLs to posts with batched slug lookups
+
+    Shared by the threaded and asyncio fetchers: the driver asks for each
+    round's plan, runs the lookups however it likes and feeds results back.
+    Each resolve step returns (url, raw post or None, error or None) tuples.
+    """
+
+    def __init__(self, service: 'WordPressService', urls: List[str]):
+        self.service = service
+        self.slug_to_urls: Dict[str, List[str]] = {}
+        for url in urls:
+            key = service._normalize_slug(service.slug_from_url(url))
+            self.slug_to_urls.setdefault(key, []).append(url)
+
+        # Send the original slug text, one per normalized slug
+        self.slug_text = {key: service.slug_from_url(url_list[0]) for key, url_list in self.slug_to_urls.items()}
+        self.guesses = {key: service.type_router.guess(url_list[0]) for key, url_list in self.slug_to_urls.items()}
+        self.pending = set(self.slug_to_urls)
+        self.tried: Dict[str, set] = {key: set() for key in self.slug_to_urls}
+        self.dual = set()
+        self.dual_found: Dict[str, Dict[str, List[Dict]]] = {}
+        self.errors: Dict[str, str] = {}  # Last lookup error of slugs still pending
+
+    def _pending_in_order(self) -> List[str]:
+        return [key for key in self.slug_to_urls if key in self.pending]  # Keep input order
+
+    def plan_round(self, round_number: int) -> Dict[str, List[List[str]]]:
+        """
+        Plan which endpoint(s) each pending slug goes to this round
+
+        Returns:
+            Dict post_type -> list of slug chunks (one request each)
+        """
+        plan: Dict[str, List[str]] = {post_type: [] for post_type in PostTypeRouter.POST_TYPES}
+        for key in self._pending_in_order():
+            remaining = [t for t in PostTypeRouter.POST_TYPES if t not in self.tried[key]]
+            if not remaining:
+                continue
+            if round_number == 0 and self.guesses[key] is None:
+                targets = remaining
+            else:
+                targets = [self.guesses[key] if self.guesses[key] in remaining else remaining[0]]
+            for post_type in targets:
+                plan[post_type].append(key)
+                self.tried[key].add(post_type)
+
+        # Slugs sent to both endpoints are settled once the round completes
+        self.dual = set(plan['posts']) & set(plan['pages'])
+        self.dual_found = {}
+
+        chunked = {}
+        for post_type, keys in plan.items():
+            chunks = self.service._chunk_slugs([self.slug_text[key] for key in keys])
+            if chunks:
+                logger.info(f"[WordPressService] Resolving {len(keys)} slugs as {post_type} in {len(chunks)} requests")
+            chunked[post_type] = chunks
+        return chunked
+
+    def _resolve(self, key: str, post_type: str, candidates: List[Dict]) -> List[Tuple]:
+        self.pending.discard(key)
+        resolved = []
+        for url in self.slug_to_urls[key]:
+            post = self.service._match_post(url, candidates)
+            self.service.type_router.learn(url, post_type, self.guesses[key])
+            resolved.append((url, post, None))
+        return resolved
+
+    def chunk_failed(self, chunk: List[str], error: str) -> List[Tuple]:
+        """Fail the slugs of a chunk whose request errored (dual slugs wait for the other endpoint)"""
+        failed = []
+        for key in (self.service._normalize_slug(slug) for slug in chunk):
+            if key in self.pending and key not in self.dual:
+                self.pending.discard(key)
+                failed.extend((url, None, error) for url in self.slug_to_urls[key])
+            elif key in self.pending:
+                self.errors[key] = error
+        return failed
+
+    def chunk_found(self, post_type: str, chunk: List[str], found: List[Dict]) -> List[Tuple]:
+        """Resolve the slugs of a chunk from the posts its request returned"""
+        by_slug: Dict[str, List[Dict]] = {}
+        for post in found:
+            by_slug.setdefault(self.service._normalize_slug(post.get('slug')), []).append(post)
+
+        resolved = []
+        for key in (self.service._normalize_slug(slug) for slug in chunk):
+            if key not in by_slug or key not in self.pending:
+                continue
+            if key in self.dual:
+                self.dual_found.setdefault(key, {})[post_type] = by_slug[key]
+            else:
+                resolved.extend(self._resolve(key, post_type, by_slug[key]))
+        return resolved
+
+    def finish_round(self) -> List[Tuple]:
+        """Settle slugs that were sent to both endpoints this round"""
+        resolved = []
+        for key, found_by_type in self.dual_found.items():
+            # Prefer the type whose post link matches the URL, then posts
+            url = self.slug_to_urls[key][0]
+            ordered = [t for t in PostTypeRouter.POST_TYPES if t in found_by_type]
+            best = self.service._match_post(url, [post for t in ordered for post in found_by_type[t]])
+            post_type = next(t for t in ordered if best in found_by_type[t])
+            resolved.extend(self._resolve(key, post_type, found_by_type[post_type]))
+        self.dual_found = {}
+        return resolved
+
+    def unresolved(self) -> List[Tuple]:
+        """URLs not found as post or page (with the lookup error, if any)"""
+        return [(url, None, self.errors.get(key)) for key in self._pending_in_order() for url in self.slug_to_urls[key]]
+
+
 class WordPressService:
     """WordPress REST API service with connection pooling and error handling"""
 
-    def __init__(self, site_url: str, username: str, app_password: str):
+    def __init__(self, site_url: str, username: str, app_password: str,
+                 pool_size: int = DEFAULT_POOL_SIZE):
         """
         Initialize WordPress service
 
@@ -34,17 +746,69 @@ class WordPressService:
             site_url: WordPress site URL (without trailing slash)
             username: WordPress username
             app_password: WordPress application password
+            pool_size: Number of keep-alive connections kept to the site
         """
         self.site_url = site_url.rstrip('/')
         self.username = username
         self.app_password = app_password
         self.auth = HTTPBasicAuth(username, app_password)
         self.timeout = 10
+        self.type_router = PostTypeRouter()
+        self.batch_supported: Optional[bool] = None  # Learned on the first bulk update
+        self.fingerprints = PostFingerprintStore()
+        self.categories = CategoryCatalog()
+        self.throttle = SiteThrottle()
+        self.write_queue = PostWriteQueue(self.update_post)
+
+        # Keep-alive session: connections are reused across requests and threads
+        self.session = requests.Session()
+        self.pool_size = 0
+        self._pool_lock = threading.Lock()
+        self._ensure_pool(pool_size)
+
+    def _ensure_pool(self, size: int):
+        """
+        Make sure the connection pool can serve `size` concurrent requests
+
+        Args:
+            size: Number of concurrent workers that will share the session
+        """
+        with self._pool_lock:
+            if size <= self.pool_size:
+                return
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size)
+            self.session.mount('https://', adapter)
+            self.session.mount('http://', adapter)
+            self.pool_size = size
+
+    def close(self):
+        """Close pooled connections and shut down the write queue after it drains"""
+        self.write_queue.close()
+        self.session.close()
+
+    def stats(self) -> Dict:
+        """Runtime statistics for this site's service"""
+        return {
+            'site_url': self.site_url,
+            'username': self.username,
+            'pool_size': self.pool_size,
+            'batch_supported': self.batch_supported,
+            'post_type_routing': self.type_router.stats(),
+            'fingerprints': self.fingerprints.stats(),
+            'categories': self.categories.stats(),
+            'throttle': self.throttle.stats(),
+            'write_queue': self.write_queue.stats()
+        }
 
     def _make_request(self, method: str, endpoint: str, **kwargs) -> requests.Response:
         """
         Make HTTP request to WordPress API with standard settings
 
+        Requests go through the site's SiteThrottle (adaptive concurrency
+        limit and circuit breaker). GET requests are retried up to
+        REQUEST_RETRIES times after throttling, 5xx gateway errors and
+        network failures.
+
         Args:
             method: HTTP method (GET, POST, PUT, DELETE)
             endpoint: API endpoint (e.g., '/wp-json/wp/v2/posts')
@@ -63,9 +827,56 @@ class WordPressService:
         kwargs.setdefault('timeout', self.timeout)
         kwargs.setdefault('verify', False)  # Disable SSL verification for internal use
 
-        try:
-            response = requests.request(method, url, **kwargs)
+        retries = REQUEST_RETRIES if method.upper() == 'GET' else 0
+        for attempt in range(retries + 1):
+            self.throttle.acquire()  # Raises WordPressAPIError when the circuit is open
+            start = time.time()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.exceptions.RequestException as e:
+                self.throttle.release('failed', time.time() - start)
+                if attempt < retries:
+                    time.sleep(0.5 * 2 ** attempt)
+                    continue
+                if isinstance(e, requests.exceptions.Timeout):
+                    raise WordPressAPIError(f"Request timeout after {self.timeout}s", status_code=408)
+                if isinstance(e, requests.exceptions.ConnectionError):
+                    raise WordPressAPIError(f"Connection error: {str(e)}", status_code=503)
+                raise WordPressAPIError(f"Request failed: {str(e)}")
+            except Exception as e:
+                self.throttle.release('failed', time.time() - start)
+                raise WordPressAPIError(f"Request failed: {str(e)}")
+
+            if response.status_code == 429:
+                outcome = 'throttled'
+            elif response.status_code in (502, 503, 504):
+                outcome = 'failed'
+            else:
+                outcome = 'ok'
+            self.throttle.release(outcome, time.time() - start)
+
+            if outcome != 'ok' and attempt < retries:
+                time.sleep(self._retry_delay(response, attempt))
+                continue
             return response
+
+    def _probe_request(self, method: str, endpoint: str, **kwargs) -> requests.Response:
+        """
+        Make a single HTTP request outside the site's throttle
+
+        No retries, no concurrency slot and no circuit breaker: the outcome
+        reflects the site right now and does not change the throttle state.
+
+        Raises:
+            WordPressAPIError: If request fails
+        """
+        url = f"{self.site_url}{endpoint}"
+        kwargs.setdefault('auth', self.auth)
+        kwargs.setdefault('timeout', self.timeout)
+        kwargs.setdefault('verify', False)
+
+        try:
+            return self.session.request(method, url, **kwargs)
         except requests.exceptions.Timeout:
             raise WordPressAPIError(f"Request timeout after {self.timeout}s", status_code=408)
         except requests.exceptions.ConnectionError as e:
@@ -73,15 +884,39 @@ class WordPressService:
         except Exception as e:
             raise WordPressAPIError(f"Request failed: {str(e)}")
 
-    def test_connection(self) -> Tuple[bool, Dict]:
+    @staticmethod
+    def _retry_delay(response: requests.Response, attempt: int) -> float:
+        """Seconds to wait before retrying: Retry-After header (capped) or exponential backoff"""
+        try:
+            return min(float(response.headers.get('Retry-After')), RETRY_AFTER_MAX)
+        except (TypeError, ValueError):
+            return 0.5 * 2 ** attempt
+
+    @staticmethod
+    def _total_pages(response: requests.Response) -> int:
+        """Page count from the X-WP-TotalPages header (1 when missing)"""
+        try:
+            return max(1, int(response.headers.get('X-WP-TotalPages') or 1))
+        except (TypeError, ValueError):
+            return 1
+
+    def test_connection(self, single_attempt: bool = False) -> Tuple[bool, Dict]:
         """
         Test WordPress REST API connection
 
+        Args:
+            single_attempt: Send one request without retries, bypassing the
+                site's throttle and circuit breaker (background health probes)
+
         Returns:
-            Tuple of (success: bool, data: dict with user info or error)
+            Tuple of (success: bool, data: dict with user info or error;
+            'status_code' is set when WordPress answered with an error)
         """
         try:
-            response = self._make_request('GET', '/wp-json/wp/v2/users/me')
+            if single_attempt:
+                response = self._probe_request('GET', '/wp-json/wp/v2/users/me')
+            else:
+                response = self._make_request('GET', '/wp-json/wp/v2/users/me')
 
             if response.status_code == 200:
                 user_data = response.json()
@@ -92,25 +927,59 @@ class WordPressService:
                 }
             else:
                 return False, {
-                    'error': f'Authentication failed with status {response.status_code}'
+                    'error': f'Authentication failed with status {response.status_code}',
+                    'status_code': response.status_code
                 }
         except WordPressAPIError as e:
             return False, {'error': e.message}
 
-    def fetch_post_by_slug(self, slug: str, post_type: str = 'posts') -> Optional[Dict]:
+    @staticmethod
+    def _projection_params(fields: Optional[Tuple[str, ...]] = None) -> Dict:
+        """
+        Build _fields/_embed query params for a field projection
+
+        Args:
+            fields: Keys of parse_post_data() output the caller needs,
+                or None for the full post with all embeds
+
+        Returns:
+            Query params dict
+        """
+        if fields is None:
+            return {'_embed': True}
+
+        unknown = set(fields) - set(POST_FIELD_SOURCES)
+        if unknown:
+            raise ValueError(f"Unknown post fields: {', '.join(sorted(unknown))}")
+
+        rest_fields = list(POST_MATCH_FIELDS)
+        for field in fields:
+            for source in POST_FIELD_SOURCES[field]:
+                if source not in rest_fields:
+                    rest_fields.append(source)
+
+        params = {'_fields': ','.join(rest_fields)}
+        embeds = sorted({POST_FIELD_EMBEDS[f] for f in fields if f in POST_FIELD_EMBEDS})
+        if embeds:
+            params['_embed'] = ','.join(embeds)
+        return params
+
+    def fetch_post_by_slug(self, slug: str, post_type: str = 'posts',
+                           fields: Optional[Tuple[str, ...]] = None) -> Optional[Dict]:
         """
         Fetch a single post by slug
 
         Args:
             slug: Post slug from URL
             post_type: 'posts' or 'pages'
+            fields: Keys of parse_post_data() output to fetch (None = full post)
 
         Returns:
             Post data dict or None if not found
         """
         try:
             endpoint = f'/wp-json/wp/v2/{post_type}'
-            params = {'slug': slug, '_embed': True}
+            params = {'slug': slug, **self._projection_params(fields)}
 
             response = self._make_request('GET', endpoint, params=params)
 
@@ -124,28 +993,6 @@ class WordPressService:
             logger.error(f"Error fetching post by slug {slug}: {e.message}")
             return None
 
-    def fetch_post_by_url(self, url: str) -> Optional[Dict]:
-        """
-        Fetch post by full URL (tries both posts and pages)
-
-        Args:
-            url: Full post URL
-
-        Returns:
-            Post data dict or None if not found
-        """
-        # Extract slug from URL
-        slug = url.rstrip('/').split('/')[-1]
-
-        # Try as post first
-        post = self.fetch_post_by_slug(slug, post_type='posts')
-        if post:
-            return post
-
-        # Try as page
-        post = self.fetch_post_by_slug(slug, post_type='pages')
-        return post
-
     def parse_post_data(self, post: Dict, url: str = None) -> Dict:
         """
         Parse WordPress API post response into standardized format
@@ -198,90 +1045,359 @@ class WordPressService:
             'author_id': post.get('author')
         }
 
-    def fetch_posts_concurrent(self, urls: List[str], max_workers: int = 10) -> List[Dict]:
+    @staticmethod
+    def slug_from_url(url: str) -> str:
+        """Extract the post slug (last path segment) from a post URL"""
+        return url.rstrip('/').split('/')[-1]
+
+    @staticmethod
+    def _normalize_slug(slug: str) -> str:
+        """Normalize slug for matching (WordPress stores percent-encoded, lowercase slugs)"""
+        return unquote(slug or '').lower()
+
+    @staticmethod
+    def _chunk_slugs(slugs: List[str]) -> List[List[str]]:
+        """Split slugs into chunks of at most SLUG_BATCH_SIZE slugs / SLUG_BATCH_MAX_CHARS encoded characters"""
+        chunks = []
+        current = []
+        length = 0
+        for slug in slugs:
+            encoded_length = len(quote(slug, safe='')) + 3  # + encoded comma separator
+            if current and (len(current) >= SLUG_BATCH_SIZE or length + encoded_length > SLUG_BATCH_MAX_CHARS):
+                chunks.append(current)
+                current = []
+                length = 0
+            current.append(slug)
+            length += encoded_length
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def fetch_posts_by_slugs(self, slugs: List[str], post_type: str = 'posts',
+                             fields: Optional[Tuple[str, ...]] = None) -> List[Dict]:
         """
-        Fetch multiple posts concurrently
+        Fetch several posts by slug in a single request
+
+        Args:
+            slugs: Up to SLUG_BATCH_SIZE slugs
+            post_type: 'posts' or 'pages'
+            fields: Keys of parse_post_data() output to fetch (None = full post)
+
+        Returns:
+            List of raw post dicts (posts that were not found are simply absent)
+
+        Raises:
+            WordPressAPIError: If the request fails
+        """
+        endpoint = f'/wp-json/wp/v2/{post_type}'
+        # WordPress parses comma-separated lists for array arguments such as slug
+        params = {'slug': ','.join(slugs), 'per_page': SLUG_BATCH_SIZE, **self._projection_params(fields)}
+
+        response = self._make_request('GET', endpoint, params=params)
+        if response.status_code != 200:
+            raise WordPressAPIError(
+                f"Batch slug lookup failed with status {response.status_code}",
+                status_code=response.status_code
+            )
+        return response.json()
+
+    def fetch_posts_by_ids(self, post_ids: List[int], post_type: str = 'posts',
+                           fields: Optional[Tuple[str, ...]] = None,
+                           context: Optional[str] = None) -> List[Dict]:
+        """
+        Fetch several posts by id in a single request (include=)
+
+        Args:
+            post_ids: Up to SLUG_BATCH_SIZE post ids
+            post_type: 'posts' or 'pages'
+            fields: Keys of parse_post_data() output to fetch (None = full post)
+            context: REST context ('edit' adds raw content/title)
+
+        Returns:
+            List of raw post dicts (missing or deleted ids are simply absent)
+
+        Raises:
+            WordPressAPIError: If the request fails
+        """
+        endpoint = f'/wp-json/wp/v2/{post_type}'
+        params = {
+            'include': ','.join(str(post_id) for post_id in post_ids),
+            'per_page': SLUG_BATCH_SIZE,
+            **self._projection_params(fields)
+        }
+        if context:
+            params['context'] = context
+
+        response = self._make_request('GET', endpoint, params=params)
+        if response.status_code != 200:
+            raise WordPressAPIError(
+                f"Batch id lookup failed with status {response.status_code}",
+                status_code=response.status_code
+            )
+        return response.json()
+
+    def _fetch_ids_any_type(self, post_ids: List[int], fields: Tuple[str, ...],
+                            context: Optional[str] = None) -> Dict[int, Dict]:
+        """
+        Fetch many posts by id when their type is unknown
+
+        Ids are looked up on /posts first and the remaining ones on /pages,
+        SLUG_BATCH_SIZE ids per request, VERSION_WORKERS requests in parallel.
+
+        Returns:
+            Dict {post_id: (post_type, raw post)} where post_type is the REST
+            endpoint ('posts' or 'pages'); ids found on neither endpoint are absent
+
+        Raises:
+            WordPressAPIError: If a lookup fails
+        """
+        found = {}
+        remaining = list(dict.fromkeys(post_ids))
+
+        for post_type in PostTypeRouter.POST_TYPES:
+            if not remaining:
+                break
+
+            chunks = [remaining[i:i + SLUG_BATCH_SIZE] for i in range(0, len(remaining), SLUG_BATCH_SIZE)]
+            with ThreadPoolExecutor(max_workers=min(VERSION_WORKERS, len(chunks))) as executor:
+                futures = [executor.submit(self.fetch_posts_by_ids, chunk, post_type, fields, context)
+                           for chunk in chunks]
+                for future in as_completed(futures):
+                    for post in future.result():
+                        found[post['id']] = (post_type, post)
+
+            remaining = [post_id for post_id in remaining if post_id not in found]
+
+        return found
+
+    def fetch_modified_dates(self, post_ids: List[int]) -> Dict[int, Optional[str]]:
+        """
+        Fetch only the modified date of many posts (include= lookups, _fields=id,modified)
+
+        Args:
+            post_ids: Post or page ids
+
+        Returns:
+            Dict {post_id: modified}; ids found on neither endpoint are absent
+
+        Raises:
+            WordPressAPIError: If a lookup fails
+        """
+        posts = self._fetch_ids_any_type(post_ids, VERSION_FIELDS)
+        return {post_id: post.get('modified') for post_id, (_, post) in posts.items()}
+
+    def fetch_raw_contents(self, post_ids: List[int]) -> Dict[int, Dict]:
+        """
+        Fetch the editable (raw) content of many posts (context=edit)
+
+        Rendered content has shortcodes and blocks expanded; anything written
+        back to WordPress must start from the raw content.
+
+        Args:
+            post_ids: Post or page ids
+
+        Returns:
+            Dict {post_id: {'url', 'raw', 'modified', 'post_type'}} where
+            post_type is the REST endpoint to write back to ('posts' or
+            'pages'); ids found on neither endpoint are absent
+
+        Raises:
+            WordPressAPIError: If a lookup fails
+        """
+        posts = self._fetch_ids_any_type(post_ids, LINK_FIELDS, context='edit')
+        return {
+            post_id: {
+                'url': post.get('link', ''),
+                'raw': (post.get('content') or {}).get('raw', ''),
+                'modified': post.get('modified'),
+                'post_type': post_type
+            }
+            for post_id, (post_type, post) in posts.items()
+        }
+
+    def list_posts(self, post_type: str = 'posts', page: int = 1, per_page: int = SLUG_BATCH_SIZE,
+                   modified_after: Optional[str] = None,
+                   rest_fields: Tuple[str, ...] = INDEX_FIELDS) -> Tuple[List[Dict], int]:
+        """
+        Fetch one page of a post listing
+
+        Args:
+            post_type: 'posts' or 'pages'
+            page: 1-based page number
+            per_page: Posts per page (max SLUG_BATCH_SIZE)
+            modified_after: Only posts modified after this ISO datetime (site time)
+            rest_fields: REST fields to return
+
+        Returns:
+            Tuple of (raw posts, total pages from X-WP-TotalPages)
+
+        Raises:
+            WordPressAPIError: If the request fails
+        """
+        endpoint = f'/wp-json/wp/v2/{post_type}'
+        params = {'page': page, 'per_page': per_page, 'orderby': 'id', 'order': 'asc',
+                  '_fields': ','.join(rest_fields)}
+        if modified_after:
+            params['modified_after'] = modified_after
+
+        response = self._make_request('GET', endpoint, params=params)
+        if response.status_code != 200:
+            raise WordPressAPIError(
+                f"Listing {post_type} page {page} failed with status {response.status_code}",
+                status_code=response.status_code
+            )
+        total_pages = self._total_pages(response)
+        return response.json(), total_pages
+
+    def _match_post(self, url: str, candidates: List[Dict]) -> Optional[Dict]:
+        """Pick the post for a URL among posts sharing its slug (prefers an exact link match)"""
+        if not candidates:
+            return None
+        path = unquote(urlparse(url).path).rstrip('/').lower()
+        for post in candidates:
+            link_path = unquote(urlparse(post.get('link') or '').path).rstrip('/').lower()
+            if link_path == path:
+                return post
+        return candidates[0]
+
+    def _iter_resolved_posts(self, urls: List[str], max_workers: int,
+                             fields: Optional[Tuple[str, ...]] = None):
+        """
+        Resolve URLs to raw posts with batched slug lookups, yielding per chunk
+
+        Each slug is sent to its learned endpoint first; slugs of unknown
+        type are sent to /posts and /pages in parallel. Slugs still missing
+        after the first round are looked up on the other endpoint.
+
+        Yields:
+            Tuples (url, raw post or None, error message or None)
+        """
+        resolution = SlugResolution(self, urls)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for round_number in range(2):
+                plan = resolution.plan_round(round_number)
+                if not any(plan.values()):
+                    break
+
+                future_to_chunk = {}
+                for post_type, chunks in plan.items():
+                    for chunk in chunks:
+                        future = executor.submit(self.fetch_posts_by_slugs, chunk, post_type, fields)
+                        future_to_chunk[future] = (post_type, chunk)
+
+                for future in as_completed(future_to_chunk):
+                    post_type, chunk = future_to_chunk[future]
+                    try:
+                        found = future.result()
+                    except Exception as e:
+                        logger.error(f"Error resolving {len(chunk)} slugs as {post_type}: {e}")
+                        yield from resolution.chunk_failed(chunk, str(e))
+                        continue
+                    yield from resolution.chunk_found(post_type, chunk, found)
+
+                yield from resolution.finish_round()
+
+        yield from resolution.unresolved()
+
+    def resolved_post_result(self, url: str, post: Optional[Dict], error: Optional[str],
+                             fields: Optional[Tuple[str, ...]] = None) -> Dict:
+        """Turn a resolved (url, raw post, error) tuple into a post dict or error entry"""
+        if post:
+            parsed = self.parse_post_data(post, url)
+            self.fingerprints.remember_fetched(post, parsed, fields)
+            return parsed
+        if error:
+            return {'url': url, 'error': error}
+        logger.warning(f"[WordPressService] Post not found for URL: {url} (slug: {self.slug_from_url(url)})")
+        return {'url': url, 'error': 'Post not found'}
+
+    def iter_posts_concurrent(self, urls: List[str], max_workers: int = 10,
+                              fields: Optional[Tuple[str, ...]] = None):
+        """
+        Fetch multiple posts concurrently, yielding each post as soon as its lookup completes
 
         Args:
             urls: List of post URLs
             max_workers: Maximum concurrent workers (default: 10)
+            fields: Keys of parse_post_data() output to fetch (None = full post)
 
-        Returns:
-            List of post dicts (includes error entries for failed fetches)
+        Yields:
+            Post dicts (or error entries for failed fetches), in completion order
         """
-        results = []
         start_time = time.time()
 
         logger.info(f"[WordPressService] Fetching {len(urls)} posts concurrently (workers={max_workers})")
 
+        if not urls:
+            return
+
         # Limit max workers
         max_workers = min(max_workers, len(urls))
+        self._ensure_pool(max_workers)
 
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Submit all tasks
-            future_to_url = {
-                executor.submit(self._fetch_single_post_safe, url): url
-                for url in urls
-            }
+        completed = 0
+        for url, post, error in self._iter_resolved_posts(urls, max_workers, fields):
+            yield self.resolved_post_result(url, post, error, fields)
 
-            # Collect results as they complete
-            completed = 0
-            for future in as_completed(future_to_url):
-                completed += 1
-                result = future.result()
-                results.append(result)
-
-                # Log progress every 10 posts
-                if completed % 10 == 0 or completed == len(urls):
-                    elapsed = time.time() - start_time
-                    logger.info(f"[Progress] {completed}/{len(urls)} posts ({elapsed:.1f}s)")
+            # Log progress every 10 posts
+            completed += 1
+            if completed % 10 == 0 or completed == len(urls):
+                elapsed = time.time() - start_time
+                logger.info(f"[Progress] {completed}/{len(urls)} posts ({elapsed:.1f}s)")
 
         elapsed_total = time.time() - start_time
-        logger.info(f"[Completed] Fetched {len(results)} posts in {elapsed_total:.1f}s")
-
-        return results
+        logger.info(f"[Completed] Fetched {completed} posts in {elapsed_total:.1f}s")
+        logger.info(f"[WordPressService] Post type routing for {self.site_url}: {self.type_router.stats()}")
 
-    def _fetch_single_post_safe(self, url: str) -> Dict:
+    def fetch_posts_concurrent(self, urls: List[str], max_workers: int = 10,
+                               fields: Optional[Tuple[str, ...]] = None) -> List[Dict]:
         """
-        Safely fetch single post (wraps exceptions into error dict)
+        Fetch multiple posts concurrently
+
+        URLs are resolved with batched slug lookups (up to SLUG_BATCH_SIZE
+        slugs per request), so N posts cost about N/100 requests for posts
+        plus one pass over pages for whatever is left.
 
         Args:
-            url: Post URL
+            urls: List of post URLs
+            max_workers: Maximum concurrent workers (default: 10)
+            fields: Keys of parse_post_data() output to fetch (None = full
+                post with embeds); e.g. LINK_FIELDS for link extraction
 
         Returns:
-            Post dict or error dict
+            List of post dicts (includes error entries for failed fetches)
         """
-        try:
-            post = self.fetch_post_by_url(url)
-            if post:
-                return self.parse_post_data(post, url)
-            else:
-                # Extract slug for debugging
-                slug = url.rstrip('/').split('/')[-1]
-                logger.warning(f"[WordPressService] Post not found for URL: {url} (slug: {slug})")
-                return {'url': url, 'error': 'Post not found'}
-        except Exception as e:
-            logger.error(f"Error fetching post {url}: {e}")
-            return {'url': url, 'error': str(e)}
+        return list(self.iter_posts_concurrent(urls, max_workers, fields))
 
-    def update_post(self, post_id: int, update_data: Dict) -> Tuple[bool, Dict]:
+    def update_post(self, post_id: int, update_data: Dict, post_type: str = 'posts') -> Tuple[bool, Dict]:
         """
         Update WordPress post
 
+        Only fields that differ from the last known value are sent; when
+        nothing differs no request is made and the result has 'skipped': True.
+
         Args:
             post_id: WordPress post ID
             update_data: Dict with fields to update
+            post_type: REST endpoint of the post ('posts' or 'pages')
 
         Returns:
             Tuple of (success: bool, updated_post: dict or error)
         """
+        changes = self.fingerprints.diff(post_id, update_data)
+        if update_data and not changes:
+            logger.info(f"[WordPressService] Post {post_id} unchanged, skipping update")
+            return True, self.skipped_update_result(post_id)
+
         try:
-            endpoint = f'/wp-json/wp/v2/posts/{post_id}'
+            endpoint = f'/wp-json/wp/v2/{post_type}/{post_id}'
 
-            response = self._make_request('POST', endpoint, json=update_data)
+            response = self._make_request('POST', endpoint, json=changes)
 
             if response.status_code == 200:
                 updated_post = response.json()
+                self.fingerprints.remember(post_id, changes)
                 return True, self.parse_post_data(updated_post)
             else:
                 error_msg = f"Update failed with status {response.status_code}"
@@ -294,31 +1410,234 @@ class WordPressService:
         except WordPressAPIError as e:
             return False, {'error': e.message}
 
-    def get_categories(self, per_page: int = 100) -> List[Dict]:
+    @staticmethod
+    def skipped_update_result(post_id: int) -> Dict:
+        """Result of an update that was skipped because nothing changed"""
+        return {'id': post_id, 'post_id': post_id, 'skipped': True}
+
+    def _update_result(self, status_code: int, body, post_id: int) -> Dict:
+        """Turn an update response (status, JSON body) into a per-post result dict"""
+        if status_code == 200 and isinstance(body, dict):
+            return {'post_id': post_id, 'success': True, 'post': self.parse_post_data(body)}
+        error_msg = f"Update failed with status {status_code}"
+        if isinstance(body, dict):
+            error_msg = body.get('message', error_msg)
+        return {'post_id': post_id, 'success': False, 'error': error_msg}
+
+    def update_posts_batch(self, updates: List[Tuple[int, Dict]],
+                           post_types: Optional[Dict[int, str]] = None) -> Optional[List[Dict]]:
         """
-        Get all WordPress categories
+        Update up to BATCH_UPDATE_SIZE posts in one /wp-json/batch/v1 request
 
         Args:
-            per_page: Number of categories per page (default: 100)
+            updates: List of (post_id, update_data)
+            post_types: REST endpoint per post id ('posts' or 'pages'); ids
+                not listed are sent to /posts
 
         Returns:
-            List of category dicts
+            Per-post result dicts in input order, or None when the site has
+            no batch endpoint (WordPress < 5.6 or REST batching disabled)
+
+        Raises:
+            WordPressAPIError: If the request fails
         """
-        try:
-            endpoint = '/wp-json/wp/v2/categories'
-            params = {'per_page': per_page, 'orderby': 'name', 'order': 'asc'}
+        post_types = post_types or {}
+        payload = {
+            'validation': 'normal',  # Mỗi request được xử lý độc lập
+            'requests': [
+                {'method': 'POST', 'path': f"/wp/v2/{post_types.get(post_id, 'posts')}/{post_id}", 'body': update_data}
+                for post_id, update_data in updates
+            ]
+        }
 
-            response = self._make_request('GET', endpoint, params=params)
+        response = self._make_request('POST', '/wp-json/batch/v1', json=payload)
+        if response.status_code in (404, 405):
+            return None
+        if response.status_code not in (200, 207):
+            raise WordPressAPIError(
+                f"Batch update failed with status {response.status_code}",
+                status_code=response.status_code
+            )
 
-            if response.status_code == 200:
-                return response.json()
+        responses = response.json().get('responses', [])
+        if len(responses) != len(updates):
+            raise WordPressAPIError(f"Batch update returned {len(responses)} responses for {len(updates)} requests")
+
+        results = []
+        for (post_id, update_data), item in zip(updates, responses):
+            result = self._update_result(item.get('status', 500), item.get('body'), post_id)
+            if result['success']:
+                self.fingerprints.remember(post_id, update_data)
+            results.append(result)
+        return results
+
+    def update_posts_bulk(self, updates: List[Tuple[int, Dict]], max_workers: int = 5,
+                          post_types: Optional[Dict[int, str]] = None) -> List[Dict]:
+        """
+        Update many posts
+
+        Unchanged fields are dropped (see PostFingerprintStore) and posts with
+        no changes are not sent. The rest go through the WordPress batch API
+        in groups of BATCH_UPDATE_SIZE. Sites without batch support fall back
+        to single updates with at most `max_workers` in flight. Queued
+        write_queue updates of the same posts are written first, and later
+        ones wait until this call returns.
+
+        Args:
+            updates: List of (post_id, update_data), one entry per post
+            max_workers: Maximum concurrent requests
+            post_types: REST endpoint per post id ('posts' or 'pages'); ids
+                not listed are updated through /posts
+
+        Returns:
+            List of {'post_id', 'success', 'post' or 'error'} in input order
+            ('skipped': True for posts with nothing to change)
+        """
+        if not updates:
+            return []
+
+        # Giữ thứ tự với các update đang nằm trong write_queue của cùng post
+        with self.write_queue.hold(post_id for post_id, _ in updates):
+            return self._update_posts_bulk(updates, max_workers, post_types or {})
+
+    def _update_posts_bulk(self, updates: List[Tuple[int, Dict]], max_workers: int,
+                           post_types: Dict[int, str]) -> List[Dict]:
+        """update_posts_bulk() body, run while the posts are held in the write queue"""
+        start_time = time.time()
+        results: List[Optional[Dict]] = [None] * len(updates)
+        updates = list(updates)
+        to_send = []
+        for i, (post_id, update_data) in enumerate(updates):
+            changes = self.fingerprints.diff(post_id, update_data)
+            if update_data and not changes:
+                results[i] = {'post_id': post_id, 'success': True, 'skipped': True}
+            else:
+                updates[i] = (post_id, changes)
+                to_send.append(i)
+
+        max_workers = max(1, min(max_workers, len(to_send) or 1))
+        self._ensure_pool(max_workers)
+        single = []  # Index các update cần gửi riêng lẻ
+
+        groups = [to_send[i:i + BATCH_UPDATE_SIZE] for i in range(0, len(to_send), BATCH_UPDATE_SIZE)]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            if self.batch_supported is not False:
+                futures = {
+                    executor.submit(self.update_posts_batch, [updates[i] for i in group], post_types): group
+                    for group in groups
+                }
+                for future in as_completed(futures):
+                    group = futures[future]
+                    try:
+                        group_results = future.result()
+                    except WordPressAPIError as e:
+                        logger.error(f"[WordPressService] Batch update of {len(group)} posts failed: {e.message}")
+                        for i in group:
+                            results[i] = {'post_id': updates[i][0], 'success': False, 'error': e.message}
+                        continue
+
+                    if group_results is None:
+                        self.batch_supported = False
+                        single.extend(group)
+                        continue
+                    self.batch_supported = True
+                    for i, result in zip(group, group_results):
+                        results[i] = result
             else:
-                logger.error(f"Failed to fetch categories: {response.status_code}")
-                return []
+                single = list(to_send)
+
+            if single:
+                logger.info(f"[WordPressService] Batch API unavailable on {self.site_url}; "
+                            f"sending {len(single)} single updates")
+                futures = {
+                    executor.submit(self.update_post, *updates[i], post_types.get(updates[i][0], 'posts')): i
+                    for i in single
+                }
+                for future in as_completed(futures):
+                    i = futures[future]
+                    success, result = future.result()
+                    if success:
+                        results[i] = {'post_id': updates[i][0], 'success': True, 'post': result}
+                        if result.get('skipped'):
+                            results[i]['skipped'] = True
+                    else:
+                        results[i] = {'post_id': updates[i][0], 'success': False,
+                                      'error': result.get('error', 'Update failed')}
+
+        updated = sum(1 for result in results if result['success'] and not result.get('skipped'))
+        logger.info(f"[WordPressService] Updated {updated}/{len(updates)} posts in {time.time() - start_time:.1f}s "
+                    f"({len(updates) - len(to_send)} unchanged, batch={self.batch_supported})")
+        return results
+
+    def _fetch_category_page(self, page: int, per_page: int) -> Tuple[List[Dict], int]:
+        """
+        Fetch one page of categories
+
+        Returns:
+            Tuple of (categories, total pages)
+
+        Raises:
+            WordPressAPIError: If the request fails
+        """
+        endpoint = '/wp-json/wp/v2/categories'
+        params = {'page': page, 'per_page': per_page, 'orderby': 'name', 'order': 'asc',
+                  '_fields': ','.join(CATEGORY_FIELDS)}
+
+        response = self._make_request('GET', endpoint, params=params)
+        if response.status_code != 200:
+            raise WordPressAPIError(
+                f"Failed to fetch categories page {page}: status {response.status_code}",
+                status_code=response.status_code
+            )
+        return response.json(), self._total_pages(response)
+
+    def _fetch_category_catalog(self, per_page: int = SLUG_BATCH_SIZE) -> List[Dict]:
+        """Fetch every category: page 1 gives X-WP-TotalPages, the other pages are fetched in parallel"""
+        categories, total_pages = self._fetch_category_page(1, per_page)
+
+        if total_pages > 1:
+            with ThreadPoolExecutor(max_workers=min(CATEGORY_WORKERS, total_pages - 1)) as executor:
+                pages = executor.map(lambda page: self._fetch_category_page(page, per_page)[0],
+                                     range(2, total_pages + 1))
+                for page_categories in pages:  # map() keeps page order (sorted by name)
+                    categories.extend(page_categories)
+
+        logger.info(f"[WordPressService] Loaded {len(categories)} categories from {self.site_url} ({total_pages} pages)")
+        return categories
+
+    def get_categories(self, per_page: int = 100, refresh: bool = False) -> List[Dict]:
+        """
+        Get all WordPress categories (cached per site for CATEGORY_CACHE_TTL)
+
+        Args:
+            per_page: Number of categories per request page (default: 100)
+            refresh: Ignore the cached catalog
+
+        Returns:
+            List of category dicts
+        """
+        try:
+            return self.categories.get(lambda: self._fetch_category_catalog(per_page), refresh=refresh)
         except WordPressAPIError as e:
             logger.error(f"Error fetching categories: {e.message}")
             return []
 
+    def search_categories(self, query: str = '', limit: int = 50, refresh: bool = False) -> Tuple[List[Dict], int]:
+        """
+        Search the cached category catalog by name
+
+        Args:
+            query: Name fragment (case and accent insensitive); empty matches all
+            limit: Maximum categories returned
+            refresh: Ignore the cached catalog
+
+        Returns:
+            Tuple of (matching categories up to limit, total matches)
+        """
+        matches = CategoryCatalog.search(self.get_categories(refresh=refresh), query)
+        return matches[:limit], len(matches)
+
     def update_post_content(self, post_id: int, content: str) -> Tuple[bool, Dict]:
         """
         Update post content only
@@ -359,3 +1678,62 @@ def create_wordpress_service(site_url: str, username: str, app_password: str) ->
         WordPressService instance
     """
     return WordPressService(site_url, username, app_password)
+
+
+MAX_CREDENTIALS_PER_SITE = 2  # Services kept per (site_url, username) with different app passwords
+
+# Process-wide registry of services, keyed by (site_url, username, app password hash), LRU order
+_service_registry: 'OrderedDict[Tuple[str, str, str], WordPressService]' = OrderedDict()
+_registry_lock = threading.Lock()
+
+
+def get_wordpress_service(site_url: str, username: str, app_password: str) -> WordPressService:
+    """
+    Get the shared WordPressService for a site, creating it on first use
+
+    Reusing the instance keeps its pooled keep-alive connections, fingerprints,
+    throttle state and write queue across requests. Services are keyed by the
+    app password too, so a request with a wrong password gets its own service
+    instead of replacing the working one. At most MAX_CREDENTIALS_PER_SITE
+    passwords are kept per site; the least recently used service is closed.
+
+    Args:
+        site_url: WordPress site URL
+        username: WordPress username
+        app_password: WordPress application password
+
+    Returns:
+        Shared WordPressService instance
+    """
+    site_key = (site_url.rstrip('/'), username)
+    key = site_key + (hashlib.sha256(app_password.encode('utf-8')).hexdigest(),)
+
+    with _registry_lock:
+        service = _service_registry.get(key)
+        if service is not None:
+            _service_registry.move_to_end(key)
+            return service
+
+        service = create_wordpress_service(site_url, username, app_password)
+        _service_registry[key] = service
+
+        same_site = [k for k in _service_registry if k[:2] == site_key]
+        for old_key in same_site[:-MAX_CREDENTIALS_PER_SITE]:
+            logger.info(f"[WordPress] Closing service of {site_key[0]} for a replaced app password")
+            _service_registry.pop(old_key).close()
+        return service
+
+
+def get_wordpress_service_stats() -> List[Dict]:
+    """Statistics of all shared services"""
+    with _registry_lock:
+        services = list(_service_registry.values())
+    return [service.stats() for service in services]
+
+
+def clear_wordpress_services():
+    """Close and forget all shared services"""
+    with _registry_lock:
+        for service in _service_registry.values():
+            service.close()
+        _service_registry.clear()
@@ -58,9 +58,12 @@ def temp_db():
     import models.wp_edit_history
     import models.wp_editor_sessions
     import models.wp_outgoing_urls
+    import models.wp_post_index
+    import models.wp_site_health
 
     for module in [models.auth_tokens, models.check_history, models.wp_sites,
-                   models.wp_edit_history, models.wp_editor_sessions, models.wp_outgoing_urls]:
+                   models.wp_edit_history, models.wp_editor_sessions, models.wp_outgoing_urls,
+                   models.wp_post_index, models.wp_site_health]:
         module.DB_PATH = db_path
 
     # Initialize database
@@ -71,7 +74,8 @@ def temp_db():
     # Cleanup: restore original path and delete temp file
     db_module.DB_PATH = original_db_path
     for module in [models.auth_tokens, models.check_history, models.wp_sites,
-                   models.wp_edit_history, models.wp_editor_sessions, models.wp_outgoing_urls]:
+                   models.wp_edit_history, models.wp_editor_sessions, models.wp_outgoing_urls,
+                   models.wp_post_index, models.wp_site_health]:
         module.DB_PATH = original_db_path
 
     os.close(db_fd)
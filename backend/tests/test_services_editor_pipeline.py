@@ -0,0 +1,195 @@
+"""
+Unit tests for the editor session pipeline
+Tests building editor sessions server-side from a URL list
+"""
+import time
+import pytest
+from unittest.mock import Mock, patch
+from models.wp_editor_sessions import get_editor_session
+from services import editor_pipeline
+from services.editor_pipeline import create_session_from_urls
+from services.wordpress_service import WordPressAPIError
+
+SITE = 'https://test.example.com'
+WP_SITE = {'id': 1, 'site_url': SITE, 'username': 'testuser', 'app_password': 'test_password'}
+
+
+def fetched_post(post_id, slug, content=''):
+    return {'id': post_id, 'url': f'{SITE}/{slug}/', 'title': slug.title(), 'status': 'publish',
+            'content': content, 'date_modified': '2025-01-01T10:00:00'}
+
+
+class TestCreateSessionFromUrls:
+    """Test suite for create_session_from_urls"""
+
+    @patch('services.editor_pipeline.get_wordpress_service', Mock())
+    @patch('services.editor_pipeline.iter_posts_indexed')
+    def test_rows_written_in_batches(self, mock_iter, temp_db):
+        """Test that posts are stored with their outgoing links, in batches"""
+        posts = [fetched_post(i, f'post-{i}', f'<a href="https://other.example.com/{i}">x</a>') for i in range(1, 6)]
+        mock_iter.return_value = iter(posts + [{'url': f'{SITE}/gone/', 'error': 'Post not found'}])
+
+        with patch.object(editor_pipeline, 'SESSION_BATCH_SIZE', 2), \
+             patch('services.editor_pipeline.add_editor_posts', wraps=editor_pipeline.add_editor_posts) as mock_add:
+            summary = create_session_from_urls(WP_SITE, [p['url'] for p in posts] + [f'{SITE}/gone/'])
+
+        assert summary['total_posts'] == 5
+        assert summary['requested'] == 6
+        assert summary['domain'] == 'test.example.com'
+        assert summary['errors'] == [{'url': f'{SITE}/gone/', 'error': 'Post not found'}]
+        batch_sizes = [len(call.args[2]) for call in mock_add.call_args_list]
+        assert sum(batch_sizes) == 5
+        assert max(batch_sizes) == 2
+
+        session = get_editor_session(summary['session_id'])
+        assert session['total_posts'] == 5
+        assert [p['post_id'] for p in session['posts']] == [1, 2, 3, 4, 5]
+        assert session['posts'][0]['outgoing_links'][0]['url'] == 'https://other.example.com/1'
+
+    @patch('services.editor_pipeline.get_wordpress_service', Mock())
+    @patch('services.editor_pipeline.iter_posts_indexed')
+    def test_no_posts_drops_session(self, mock_iter, temp_db):
+        """Test that a session with no fetched posts is not kept"""
+        mock_iter.return_value = iter([{'url': f'{SITE}/gone/', 'error': 'Post not found'}])
+
+        summary = create_session_from_urls(WP_SITE, [f'{SITE}/gone/'])
+
+        assert summary['session_id'] is None
+        assert summary['total_posts'] == 0
+
+
+class TestRunLinkPipeline:
+    """Test suite for run_link_pipeline"""
+
+    def test_content_dropped_and_rows_batched(self):
+        """Test that rows carry no content and are written in batches"""
+        posts = [fetched_post(i, f'post-{i}', '<p>Body</p>') for i in range(1, 8)]
+        batches = []
+
+        with patch.object(editor_pipeline, 'MAX_PENDING_PARSES', 2):
+            written, errors = editor_pipeline.run_link_pipeline(
+                iter(posts), lambda rows: batches.append(list(rows)) or len(rows), batch_size=3)
+
+        assert written == 7
+        assert errors == []
+        assert sum(len(b) for b in batches) == 7
+        assert all(len(b) <= 3 for b in batches)
+        assert all('content' not in row for b in batches for row in b)
+        assert all('content' not in post for post in posts)
+
+    def test_parse_error_reported(self):
+        """Test that a post failing to parse becomes an error entry"""
+        with patch('services.editor_pipeline.extract_outgoing_links', side_effect=ValueError('bad html')):
+            written, errors = editor_pipeline.run_link_pipeline(
+                iter([fetched_post(1, 'broken')]), lambda rows: len(rows))
+
+        assert written == 0
+        assert errors[0]['url'] == f'{SITE}/broken/'
+        assert 'bad html' in errors[0]['error']
+
+
+class TestRefreshSessionLinks:
+    """Test suite for refresh_session_links"""
+
+    @pytest.fixture
+    def session_id(self, temp_db):
+        with patch('services.editor_pipeline.iter_posts_indexed',
+                   return_value=iter([fetched_post(1, 'one'), fetched_post(2, 'two')])), \
+             patch('services.editor_pipeline.get_wordpress_service', Mock()):
+            return create_session_from_urls(WP_SITE, [f'{SITE}/one/', f'{SITE}/two/'])['session_id']
+
+    @patch('services.editor_pipeline.iter_posts_indexed')
+    def test_only_modified_posts_fetched(self, mock_iter, session_id):
+        """Test that unchanged posts are skipped and new links and dates are stored"""
+        wp_service = Mock()
+        wp_service.fetch_modified_dates.return_value = {1: '2025-01-01T10:00:00', 2: '2025-02-01T10:00:00'}
+        changed = fetched_post(2, 'two', '<a href="https://new.example.com/">new</a>')
+        changed['date_modified'] = '2025-02-01T10:00:00'
+        mock_iter.return_value = iter([changed])
+
+        posts = get_editor_session(session_id)['posts']
+        result = editor_pipeline.refresh_session_links(session_id, 1, wp_service, posts)
+
+        assert mock_iter.call_args.args[2] == [f'{SITE}/two/']
+        assert result['updated_count'] == 1
+        assert result['skipped'] == 1
+        assert result['incremental'] is True
+
+        stored = {p['post_id']: p for p in get_editor_session(session_id)['posts']}
+        assert [link['url'] for link in stored[2]['outgoing_links']] == ['https://new.example.com/']
+        assert stored[2]['date_modified'] == '2025-02-01T10:00:00'
+
+    @patch('services.editor_pipeline.iter_posts_indexed')
+    def test_removed_links_cleared(self, mock_iter, session_id):
+        """Test that a changed post whose links were all removed stores an empty list"""
+        wp_service = Mock()
+        wp_service.fetch_modified_dates.return_value = {1: '2025-01-01T10:00:00', 2: '2025-02-01T10:00:00'}
+        mock_iter.return_value = iter([fetched_post(2, 'two', '<a href="https://old.example.com/">old</a>')])
+        posts = get_editor_session(session_id)['posts']
+        editor_pipeline.refresh_session_links(session_id, 1, wp_service, posts)
+
+        wp_service.fetch_modified_dates.return_value = {1: '2025-01-01T10:00:00', 2: '2025-03-01T10:00:00'}
+        unlinked = fetched_post(2, 'two', '<p>No links</p>')
+        unlinked['date_modified'] = '2025-03-01T10:00:00'
+        mock_iter.return_value = iter([unlinked])
+        posts = get_editor_session(session_id)['posts']
+        result = editor_pipeline.refresh_session_links(session_id, 1, wp_service, posts)
+
+        assert result['updated_count'] == 1
+        stored = {p['post_id']: p for p in get_editor_session(session_id)['posts']}
+        assert stored[2]['outgoing_links'] == []
+        assert stored[2]['date_modified'] == '2025-03-01T10:00:00'
+
+    @patch('services.editor_pipeline.iter_posts_indexed')
+    def test_parse_failure_keeps_stored_links(self, mock_iter, session_id):
+        """Test that content that cannot be parsed neither wipes links nor advances date_modified"""
+        wp_service = Mock()
+        wp_service.fetch_modified_dates.return_value = {1: '2025-01-01T10:00:00', 2: '2025-02-01T10:00:00'}
+        mock_iter.return_value = iter([fetched_post(2, 'two', '<a href="https://old.example.com/">old</a>')])
+        posts = get_editor_session(session_id)['posts']
+        editor_pipeline.refresh_session_links(session_id, 1, wp_service, posts)
+
+        wp_service.fetch_modified_dates.return_value = {1: '2025-01-01T10:00:00', 2: '2025-03-01T10:00:00'}
+        broken = fetched_post(2, 'two', '<p>broken</p>')
+        broken['date_modified'] = '2025-03-01T10:00:00'
+        mock_iter.return_value = iter([broken])
+        posts = get_editor_session(session_id)['posts']
+        with patch('utils.html_parser.BeautifulSoup', side_effect=ValueError('bad html')):
+            result = editor_pipeline.refresh_session_links(session_id, 1, wp_service, posts)
+
+        assert result['updated_count'] == 0
+        assert result['errors'][0]['url'] == f'{SITE}/two/'
+        stored = {p['post_id']: p for p in get_editor_session(session_id)['posts']}
+        assert [link['url'] for link in stored[2]['outgoing_links']] == ['https://old.example.com/']
+        assert stored[2]['date_modified'] == '2025-01-01T10:00:00'
+
+    @patch('services.editor_pipeline.iter_posts_indexed')
+    def test_lookup_failure_refreshes_all(self, mock_iter, session_id):
+        """Test that a failed modified-date lookup falls back to a full refresh"""
+        wp_service = Mock()
+        wp_service.fetch_modified_dates.side_effect = WordPressAPIError('Connection error')
+        mock_iter.return_value = iter([{'url': f'{SITE}/gone/', 'error': 'Post not found'}])
+
+        posts = get_editor_session(session_id)['posts']
+        result = editor_pipeline.refresh_session_links(session_id, 1, wp_service, posts)
+
+        assert len(mock_iter.call_args.args[2]) == 2
+        assert result['incremental'] is False
+        assert result['skipped'] == 0
+        assert len(result['errors']) == 1
+
+    @patch('services.editor_pipeline.refresh_session_links')
+    def test_background_job(self, mock_refresh):
+        """Test that a refresh job records its result"""
+        mock_refresh.return_value = {'updated_count': 3}
+
+        job = editor_pipeline.start_refresh_job('session-1', 1, Mock(), [])
+        for _ in range(100):
+            status = editor_pipeline.get_refresh_job(job['job_id'])
+            if status['status'] != 'running':
+                break
+            time.sleep(0.01)
+
+        assert status['status'] == 'done'
+        assert status['result'] == {'updated_count': 3}
+        assert editor_pipeline.get_refresh_job('unknown') is None
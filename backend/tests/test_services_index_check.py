@@ -0,0 +1,52 @@
+"""
+Unit tests for index checking of URL and domain inputs
+Tests that domain expansion keeps the order of the inputs
+"""
+import asyncio
+import time
+from unittest.mock import patch
+from services.index_check import expand_and_check
+
+
+async def fake_check_urls(urls):
+    return [{'url': url, 'indexed': True} for url in urls]
+
+
+def fake_fetch_sitemap_urls(domain, url_filter=None):
+    # Domain đầu tiên crawl chậm hơn để kết quả hoàn thành lệch thứ tự nhập
+    if domain == 'slow.example.com':
+        time.sleep(0.2)
+        return [f'https://{domain}/a', f'https://{domain}/b']
+    if domain == 'fast.example.com':
+        return [f'https://{domain}/c']
+    return []
+
+
+class TestExpandAndCheck:
+    """Test suite for expand_and_check"""
+
+    @patch('services.index_check.fetch_sitemap_urls', side_effect=fake_fetch_sitemap_urls)
+    @patch('services.index_check.check_urls', side_effect=fake_check_urls)
+    def test_results_follow_input_order(self, mock_check, mock_fetch):
+        """Test that results keep input order even when a later domain finishes first"""
+        entries = [
+            'https://direct.example.com/1',
+            'slow.example.com',
+            'https://direct.example.com/2',
+            'https://direct.example.com/3',
+            'fast.example.com',
+            'empty.example.com',
+        ]
+
+        results = asyncio.run(expand_and_check(entries))
+
+        assert [r['url'] for r in results] == [
+            'https://direct.example.com/1',
+            'https://slow.example.com/a',
+            'https://slow.example.com/b',
+            'https://direct.example.com/2',
+            'https://direct.example.com/3',
+            'https://fast.example.com/c',
+            'https://empty.example.com',
+        ]
+        assert mock_fetch.call_count == 3
@@ -0,0 +1,86 @@
+"""
+Unit tests for index rate sampling
+Tests the stratified estimator with a fake index checker
+"""
+import asyncio
+import pytest
+from services.index_sampling import IndexRateEstimator, estimate_index_rate
+
+
+def make_strata():
+    """Three child sitemaps with 90%, 50% and 10% of URLs indexed"""
+    strata = []
+    for name, size in (('post-sitemap.xml', 3000), ('page-sitemap.xml', 1000), ('tag-sitemap.xml', 1000)):
+        urls = [f'https://example.com/{name}/{i}' for i in range(size)]
+        strata.append((name, urls))
+    return strata
+
+
+def fake_status(url):
+    """Deterministic index status matching make_strata rates"""
+    name, index = url.rsplit('/', 2)[-2:]
+    index = int(index)
+    if name == 'post-sitemap.xml':
+        return 'Not Indexed ❌' if index % 10 == 0 else 'Indexed ✅'
+    if name == 'page-sitemap.xml':
+        return 'Indexed ✅' if index % 2 == 0 else 'Not Indexed ❌'
+    return 'Indexed ✅' if index % 10 == 0 else 'Not Indexed ❌'
+
+
+async def fake_check(urls):
+    return [{'url': url, 'status': fake_status(url)} for url in urls]
+
+
+class TestIndexRateEstimator:
+    """Test suite for the adaptive stratified estimator"""
+
+    def test_estimate_reaches_target_margin(self):
+        """Test that sampling stops once the margin of error is met"""
+        estimate, results = asyncio.run(
+            estimate_index_rate(make_strata(), fake_check, target_margin=0.05, seed=1)
+        )
+
+        true_ratio = (2700 + 500 + 100) / 5000
+        assert estimate['target_met'] is True
+        assert estimate['margin_of_error'] <= 0.05
+        assert estimate['sampled'] < estimate['population']
+        assert len(results) == estimate['sampled']
+        low, high = estimate['confidence_interval']
+        assert low <= true_ratio <= high
+
+    def test_every_stratum_is_sampled(self):
+        """Test that each child sitemap contributes to the sample"""
+        estimator = IndexRateEstimator(make_strata(), initial_size=50, seed=1)
+        batch = estimator.next_batch(50)
+
+        assert len(batch) >= 50
+        assert all(s.drawn > 0 for s in estimator.strata)
+
+    def test_allocation_does_not_overshoot(self):
+        """Test that many small strata do not push the sample past its size"""
+        strata = [('post-sitemap.xml', [f'https://example.com/post-sitemap.xml/{i}' for i in range(1000)])]
+        strata += [(f'tag-sitemap{n}.xml', [f'https://example.com/tag-sitemap.xml/{n}']) for n in range(10)]
+        estimator = IndexRateEstimator(strata, seed=1)
+
+        allocation = estimator._allocate(20)
+        assert sum(allocation) == 20
+        assert all(a <= s.population for a, s in zip(allocation, estimator.strata))
+        assert len(estimator.next_batch(20)) == 20
+        assert sum(estimator._allocate(5000)) == estimator.population
+
+    def test_small_population_is_fully_checked(self):
+        """Test that a population smaller than the sample is checked entirely"""
+        strata = [('sitemap.xml', [f'https://example.com/post-sitemap.xml/{i}' for i in range(20)])]
+
+        estimate, results = asyncio.run(estimate_index_rate(strata, fake_check, seed=1))
+
+        assert estimate['sampled'] == 20
+        assert estimate['margin_of_error'] == 0
+        assert estimate['indexed_ratio'] == 0.9
+
+    def test_invalid_options(self):
+        """Test that invalid sampling options are rejected"""
+        with pytest.raises(ValueError):
+            IndexRateEstimator(make_strata(), target_margin=0)
+        with pytest.raises(ValueError):
+            IndexRateEstimator(make_strata(), confidence=1.5)
@@ -0,0 +1,170 @@
+"""
+Unit tests for bulk link rewrite
+Tests LinkRule matching, raw HTML rewriting and the dry-run / apply flow
+"""
+import pytest
+from unittest.mock import Mock
+from services.link_rewrite import LinkRule, rewrite_post_links
+from utils.html_parser import rewrite_links
+
+SITE = 'https://test.example.com'
+MODIFIED = '2026-01-01T00:00:00'
+
+CONTENT = (
+    '<!-- wp:paragraph --><p>Read <a class="btn" href="https://old.example.org/offer?a=1&amp;b=2" '
+    'rel="nofollow"><strong>Best</strong> offer</a> or <a href=\'https://other.example.org/\'>other</a>.</p>'
+    '<!-- /wp:paragraph -->[gallery ids="1,2"]'
+)
+
+
+class TestLinkRule:
+    """Test suite for LinkRule"""
+
+    def test_domain_rule_keeps_path(self):
+        """Test that a domain swap keeps the path and ignores www. and case"""
+        rule = LinkRule('domain', 'www.OLD.example.org', replace_domain='new.example.org')
+
+        assert rule.apply('https://old.example.org/offer?a=1', 'x') == ('https://new.example.org/offer?a=1', 'x')
+        assert rule.apply('https://other.example.org/', 'x') is None
+
+    def test_regex_substitutes_matched_part(self):
+        """Test that a regex replacement on the same target only replaces the match"""
+        rule = LinkRule('url', r'/offer\?a=(\d+)', regex=True, replace_url=r'/deal?id=\1')
+
+        assert rule.apply('https://old.example.org/offer?a=7', 'x') == ('https://old.example.org/deal?id=7', 'x')
+
+    def test_anchor_rule_case_insensitive(self):
+        """Test that anchor matching ignores case"""
+        rule = LinkRule('anchor', 'best offer', replace_anchor='New offer')
+
+        assert rule.apply('https://old.example.org/', 'Best Offer') == ('https://old.example.org/', 'New offer')
+
+    @pytest.mark.parametrize('data', [
+        {'target': 'title', 'pattern': 'x', 'replace_url': 'y'},
+        {'target': 'url', 'pattern': '', 'replace_url': 'y'},
+        {'target': 'url', 'pattern': 'x'},
+        {'target': 'url', 'pattern': '(', 'regex': True, 'replace_url': 'y'},
+    ])
+    def test_invalid_rules_rejected(self, data):
+        """Test that incomplete or invalid rules raise ValueError"""
+        with pytest.raises(ValueError):
+            LinkRule.from_dict(data)
+
+
+class TestRewriteLinks:
+    """Test suite for rewrite_links"""
+
+    def test_only_matching_anchor_changed(self):
+        """Test that other markup, attributes and links stay byte-identical"""
+        rule = LinkRule('domain', 'old.example.org', replace_url='https://new.example.org/?x=1&y=2',
+                        replace_anchor='New offer')
+
+        content, changes = rewrite_links(CONTENT, rule.apply)
+
+        assert content == CONTENT.replace(
+            'href="https://old.example.org/offer?a=1&amp;b=2"', 'href="https://new.example.org/?x=1&amp;y=2"'
+        ).replace('<strong>Best</strong> offer', '<strong>New offer</strong>')
+        assert changes == [{
+            'old_url': 'https://old.example.org/offer?a=1&b=2', 'new_url': 'https://new.example.org/?x=1&y=2',
+            'old_anchor': 'Best offer', 'new_anchor': 'New offer'
+        }]
+
+    def test_data_href_not_mistaken_for_href(self):
+        """Test that only the real href attribute is read and rewritten"""
+        content = '<a data-href="https://old.example.org/x" href="https://keep.example.org/">link</a>'
+        rule = LinkRule('domain', 'old.example.org', replace_domain='new.example.org')
+
+        assert rewrite_links(content, rule.apply) == (content, [])
+
+        rule = LinkRule('domain', 'keep.example.org', replace_domain='new.example.org')
+        new_content, changes = rewrite_links(content, rule.apply)
+        assert new_content == content.replace('href="https://keep.example.org/"', 'href="https://new.example.org/"')
+        assert 'data-href="https://old.example.org/x"' in new_content
+        assert len(changes) == 1
+
+    def test_no_match_returns_content_unchanged(self):
+        """Test that content without matching links is returned as is"""
+        rule = LinkRule('domain', 'nowhere.example.org', replace_domain='x.example.org')
+
+        assert rewrite_links(CONTENT, rule.apply) == (CONTENT, [])
+
+
+class TestRewritePostLinks:
+    """Test suite for rewrite_post_links"""
+
+    @pytest.fixture
+    def wp_service(self):
+        service = Mock()
+        service.site_url = SITE
+        service.fetch_raw_contents.return_value = {
+            1: {'url': f'{SITE}/one/', 'raw': CONTENT, 'modified': MODIFIED, 'post_type': 'posts'},
+            2: {'url': f'{SITE}/two/', 'raw': '<p>No links</p>', 'modified': MODIFIED, 'post_type': 'posts'},
+            10: {'url': f'{SITE}/about/', 'raw': CONTENT, 'modified': MODIFIED, 'post_type': 'pages'},
+        }
+        service.fetch_modified_dates.return_value = {1: MODIFIED, 2: MODIFIED, 10: MODIFIED}
+        return service
+
+    def test_dry_run_does_not_update(self, wp_service):
+        """Test that a dry run reports affected posts without saving"""
+        rule = LinkRule('domain', 'old.example.org', replace_domain='new.example.org')
+
+        summary = rewrite_post_links(wp_service, [1, 2, 3], rule)
+
+        assert summary['dry_run'] is True
+        assert summary['matched'] == 1
+        assert summary['posts'][0]['post_id'] == 1
+        assert summary['errors'] == [{'post_id': 3, 'error': 'Post not found'}]
+        wp_service.update_posts_bulk.assert_not_called()
+
+    def test_apply_sends_raw_content(self, wp_service):
+        """Test that applying saves the rewritten raw content of affected posts only"""
+        wp_service.update_posts_bulk.return_value = [{'post_id': 1, 'success': True}]
+        rule = LinkRule('domain', 'old.example.org', replace_domain='new.example.org')
+
+        summary = rewrite_post_links(wp_service, [1, 2], rule, dry_run=False)
+
+        updates = wp_service.update_posts_bulk.call_args.args[0]
+        assert [post_id for post_id, _ in updates] == [1]
+        assert 'https://new.example.org/offer?a=1&amp;b=2' in updates[0][1]['content']
+        assert '[gallery ids="1,2"]' in updates[0][1]['content']
+        assert summary['updated'] == 1
+        assert summary['posts'][0]['success'] is True
+
+    def test_apply_routes_pages(self, wp_service):
+        """Test that page ids are saved through the pages endpoint"""
+        wp_service.update_posts_bulk.return_value = [{'post_id': 1, 'success': True},
+                                                     {'post_id': 10, 'success': True}]
+        rule = LinkRule('domain', 'old.example.org', replace_domain='new.example.org')
+
+        summary = rewrite_post_links(wp_service, [1, 10], rule, dry_run=False)
+
+        call = wp_service.update_posts_bulk.call_args
+        assert [post_id for post_id, _ in call.args[0]] == [1, 10]
+        assert call.kwargs['post_types'] == {1: 'posts', 10: 'pages'}
+        assert summary['updated'] == 2
+
+    def test_apply_skips_post_modified_since_read(self, wp_service):
+        """Test that a post edited between reading and saving is not overwritten"""
+        wp_service.fetch_modified_dates.return_value = {1: '2026-01-02T00:00:00', 10: MODIFIED}
+        wp_service.update_posts_bulk.return_value = [{'post_id': 10, 'success': True}]
+        rule = LinkRule('domain', 'old.example.org', replace_domain='new.example.org')
+
+        summary = rewrite_post_links(wp_service, [1, 10], rule, dry_run=False)
+
+        assert [post_id for post_id, _ in wp_service.update_posts_bulk.call_args.args[0]] == [10]
+        assert summary['posts'][0]['conflict'] is True
+        assert summary['posts'][0]['success'] is False
+        assert summary['posts'][1]['success'] is True
+        assert (summary['updated'], summary['failed'], summary['conflicts']) == (1, 1, 1)
+
+    def test_apply_skips_post_modified_since_preview(self, wp_service):
+        """Test that expected_modified from the preview is checked too"""
+        wp_service.update_posts_bulk.return_value = []
+        rule = LinkRule('domain', 'old.example.org', replace_domain='new.example.org')
+
+        summary = rewrite_post_links(wp_service, [1], rule, dry_run=False,
+                                     expected_modified={1: '2025-12-31T00:00:00'})
+
+        assert wp_service.update_posts_bulk.call_args.args[0] == []
+        assert summary['posts'][0]['conflict'] is True
+        assert summary['updated'] == 0
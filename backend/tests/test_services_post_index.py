@@ -0,0 +1,134 @@
+"""
+Unit tests for the local post index
+Tests index sync from paginated listings and URL resolution through the index
+"""
+import pytest
+from unittest.mock import Mock, patch
+from models.wp_post_index import (
+    upsert_indexed_posts,
+    lookup_indexed_posts,
+    get_post_index_state,
+    set_post_index_sync_state,
+)
+from services.wordpress_service import WordPressService
+from services.post_index import sync_post_index, fetch_posts_indexed, index_is_stale
+
+SITE = 'https://test.example.com'
+
+
+def listing_post(post_id, slug, post_type='post', modified='2025-01-01T10:00:00'):
+    return {'id': post_id, 'slug': slug, 'type': post_type,
+            'link': f'{SITE}/{slug}/', 'modified': modified}
+
+
+class TestPostIndexSync:
+    """Test suite for sync_post_index"""
+
+    def test_full_sync_pages_through_listing(self, temp_db):
+        """Test that all pages reported by X-WP-TotalPages are indexed"""
+        service = Mock()
+        pages = {
+            ('posts', 1): ([listing_post(1, 'one')], 3),
+            ('posts', 2): ([listing_post(2, 'two')], 3),
+            ('posts', 3): ([listing_post(3, 'three', modified='2025-02-01T08:00:00')], 3),
+            ('pages', 1): ([listing_post(10, 'about', 'page')], 1),
+        }
+        service.list_posts.side_effect = lambda post_type, page=1, per_page=100, modified_after=None: pages[(post_type, page)]
+
+        summary = sync_post_index(1, service)
+
+        assert summary['posts'] == 3
+        assert summary['pages'] == 1
+        assert summary['requests'] == 4
+        assert summary['incremental'] is False
+
+        state = get_post_index_state(1)
+        assert state['post_count'] == 4
+        assert state['last_modified'] == '2025-02-01T08:00:00'
+        assert state['status'] == 'done'
+
+    def test_incremental_sync_uses_modified_after(self, temp_db):
+        """Test that a second sync only asks for recently modified posts"""
+        upsert_indexed_posts(1, [{'post_id': 1, 'link': f'{SITE}/one/', 'slug': 'one',
+                                  'type': 'post', 'modified': '2025-01-01T10:00:00'}])
+        service = Mock()
+        service.list_posts.return_value = ([], 1)
+
+        summary = sync_post_index(1, service)
+
+        assert summary['incremental'] is True
+        for call in service.list_posts.call_args_list:
+            assert call.kwargs['modified_after'] == '2025-01-01T09:59:59'
+
+    def test_failed_sync_backs_off(self, temp_db):
+        """Test that a failed sync is recorded and not retried until the delay passes"""
+        service = Mock()
+        service.list_posts.side_effect = Exception('Connection error')
+
+        with pytest.raises(Exception):
+            sync_post_index(1, service)
+
+        state = get_post_index_state(1)
+        assert state['status'] == 'failed'
+        assert state['synced_at'] is None
+        assert state['failed_at'] is not None
+        assert index_is_stale(state) is False
+
+        set_post_index_sync_state(1, 'failed', error='Connection error', failed_at='2025-01-01T00:00:00+00:00')
+        assert index_is_stale(get_post_index_state(1)) is True
+
+    def test_lookup_matches_normalized_path(self, temp_db):
+        """Test that lookups ignore trailing slashes, case and percent-encoding"""
+        upsert_indexed_posts(1, [{'post_id': 7, 'link': f'{SITE}/caf%C3%A9/', 'slug': 'caf%c3%a9',
+                                  'type': 'post', 'modified': None}])
+
+        found = lookup_indexed_posts(1, [f'{SITE}/Café', f'{SITE}/other/'])
+
+        assert list(found) == [f'{SITE}/Café']
+        assert found[f'{SITE}/Café']['post_id'] == 7
+
+
+class TestFetchPostsIndexed:
+    """Test suite for fetch_posts_indexed"""
+
+    @pytest.fixture
+    def wp_service(self):
+        return WordPressService(SITE, 'testuser', 'test_password')
+
+    @patch('services.post_index.start_post_index_sync')
+    def test_indexed_urls_fetched_by_id(self, mock_sync, temp_db, wp_service):
+        """Test that indexed URLs are fetched with include= and the rest fall back"""
+        upsert_indexed_posts(1, [
+            {'post_id': 1, 'link': f'{SITE}/one/', 'slug': 'one', 'type': 'post', 'modified': None},
+            {'post_id': 10, 'link': f'{SITE}/about/', 'slug': 'about', 'type': 'page', 'modified': None},
+        ])
+
+        def fetch_by_ids(ids, post_type, fields=None):
+            return [{'id': i, 'link': f'{SITE}/{"one" if i == 1 else "about"}/',
+                     'content': {'rendered': ''}} for i in ids]
+
+        fallback = Mock(return_value=[{'id': 5, 'url': f'{SITE}/new/', 'content': ''}])
+        urls = [f'{SITE}/one/', f'{SITE}/about/', f'{SITE}/new/']
+
+        with patch.object(wp_service, 'fetch_posts_by_ids', side_effect=fetch_by_ids) as mock_ids:
+            results = fetch_posts_indexed(1, wp_service, urls, fallback=fallback)
+
+        assert sorted(r['id'] for r in results) == [1, 5, 10]
+        assert sorted(call.args[1] for call in mock_ids.call_args_list) == ['pages', 'posts']
+        fallback.assert_called_once_with([f'{SITE}/new/'])
+        # Fallback results are added to the index
+        assert lookup_indexed_posts(1, [f'{SITE}/new/'])[f'{SITE}/new/']['post_id'] == 5
+
+    @patch('services.post_index.start_post_index_sync')
+    def test_moved_post_falls_back_to_slug(self, mock_sync, temp_db, wp_service):
+        """Test that an indexed id whose link changed is resolved again by slug"""
+        upsert_indexed_posts(1, [{'post_id': 1, 'link': f'{SITE}/old/', 'slug': 'old',
+                                  'type': 'post', 'modified': None}])
+        fallback = Mock(return_value=[{'url': f'{SITE}/old/', 'error': 'Post not found'}])
+
+        with patch.object(wp_service, 'fetch_posts_by_ids',
+                          return_value=[{'id': 1, 'link': f'{SITE}/renamed/'}]):
+            results = fetch_posts_indexed(1, wp_service, [f'{SITE}/old/'], fallback=fallback)
+
+        assert results == [{'url': f'{SITE}/old/', 'error': 'Post not found'}]
+        mock_sync.assert_called_once()
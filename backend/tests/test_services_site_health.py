@@ -0,0 +1,87 @@
+"""
+Unit tests for background site health probing
+Tests status classification and storing probe results per site
+"""
+from unittest.mock import Mock, patch
+from models.wp_sites import add_wp_site
+from models.wp_site_health import get_site_health, save_site_health
+from services.site_health import probe_site, probe_all_sites
+
+
+def service_returning(success, result):
+    service = Mock()
+    service.test_connection.return_value = (success, result)
+    return service
+
+
+class TestProbeSite:
+    """Test suite for probe_site"""
+
+    SITE = {'id': 1, 'site_url': 'https://test.example.com', 'username': 'user', 'app_password': 'pass'}
+
+    @patch('services.site_health.get_wordpress_service')
+    def test_status_classification(self, mock_get_service):
+        """Test that probe results map to ok / auth_failed / error / unreachable"""
+        cases = [
+            ((True, {'id': 1}), 'ok'),
+            ((False, {'error': 'Authentication failed with status 401', 'status_code': 401}), 'auth_failed'),
+            ((False, {'error': 'Authentication failed with status 500', 'status_code': 500}), 'error'),
+            ((False, {'error': 'Connection error: refused'}), 'unreachable'),
+        ]
+        for (success, result), expected in cases:
+            mock_get_service.return_value = service_returning(success, result)
+            health = probe_site(self.SITE)
+            assert health['status'] == expected
+            assert health['wp_site_id'] == 1
+            assert (health['error'] is None) == success
+            mock_get_service.return_value.test_connection.assert_called_once_with(single_attempt=True)
+
+
+class TestProbeAllSites:
+    """Test suite for probe_all_sites"""
+
+    @patch('services.site_health.get_wordpress_service')
+    def test_results_stored_per_site(self, mock_get_service, temp_db):
+        """Test that every site is probed and its latest result stored"""
+        ok_id = add_wp_site('Good', 'https://good.example.com', 'user', 'pass')
+        bad_id = add_wp_site('Bad', 'https://bad.example.com', 'user', 'wrong')
+
+        def get_service(site_url, username, app_password):
+            if 'bad' in site_url:
+                return service_returning(False, {'error': 'Authentication failed with status 401', 'status_code': 401})
+            return service_returning(True, {'id': 1})
+        mock_get_service.side_effect = get_service
+
+        summary = probe_all_sites()
+
+        assert summary['total'] == 2
+        assert summary['ok'] == 1
+        assert summary['auth_failed'] == 1
+
+        health = {row['wp_site_id']: row for row in get_site_health()}
+        assert health[ok_id]['status'] == 'ok'
+        assert health[ok_id]['last_ok_at'] == health[ok_id]['checked_at']
+        assert health[bad_id]['status'] == 'auth_failed'
+        assert health[bad_id]['last_ok_at'] is None
+
+    def test_last_ok_kept_after_failure(self, temp_db):
+        """Test that a failed check keeps the time of the last successful one"""
+        site_id = add_wp_site('Site', 'https://site.example.com', 'user', 'pass')
+        save_site_health([{'wp_site_id': site_id, 'status': 'ok', 'checked_at': '2025-01-01T00:00:00'}])
+        save_site_health([{'wp_site_id': site_id, 'status': 'unreachable', 'error': 'timeout',
+                           'checked_at': '2025-01-02T00:00:00'}])
+
+        row = get_site_health(site_id)[0]
+        assert row['status'] == 'unreachable'
+        assert row['last_ok_at'] == '2025-01-01T00:00:00'
+
+
+class TestProberStartup:
+    """Test suite for starting the background prober"""
+
+    def test_importing_app_does_not_start_prober(self, app):
+        """Test that the app module leaves starting the prober to its entry points"""
+        import services.site_health as site_health
+
+        assert site_health._prober_thread is None
+        assert 'site-health-prober' in app.cli.commands
@@ -0,0 +1,434 @@
+"""
+Unit tests for Sitemap Parser service
+Tests sitemap discovery and parsing with mocked HTTP responses
+"""
+import pytest
+from unittest.mock import Mock, patch
+from services.sitemap_parser import (
+    fetch_sitemap_urls,
+    crawl_sitemap,
+    parse_sitemap,
+    clear_sitemap_cache,
+    _get_session,
+    POOL_MAXSIZE
+)
+from services.sitemap_filters import SitemapFilter, child_sitemap_type
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Each test starts with an empty crawl cache"""
+    clear_sitemap_cache()
+    yield
+    clear_sitemap_cache()
+
+
+def make_response(url, text, status_code=200, content_type='application/xml'):
+    """Build a fake requests.Response for a sitemap URL"""
+    resp = Mock()
+    resp.url = url
+    resp.text = text
+    resp.content = text.encode('utf-8')
+    resp.status_code = status_code
+    resp.headers = {'Content-Type': content_type}
+    return resp
+
+
+URLSET = '''<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>https://example.com/post-1/</loc></url>
+  <url><loc>https://example.com/post-2/</loc></url>
+</urlset>'''
+
+SITEMAP_INDEX = '''<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>https://example.com/post-sitemap.xml</loc></sitemap>
+  <sitemap><loc>https://example.com/page-sitemap.xml</loc></sitemap>
+</sitemapindex>'''
+
+PAGE_URLSET = '''<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>https://example.com/html-sitemap/</loc></url>
+  <url><loc>https://example.com/logo.png</loc></url>
+</urlset>'''
+
+
+class TestParseSitemap:
+    """Test suite for sitemap document parsing"""
+
+    def test_detects_urlset(self):
+        """Test that <urlset> is detected by its root element"""
+        kind, entries = parse_sitemap(URLSET)
+
+        assert kind == 'urlset'
+        assert [e['loc'] for e in entries] == ['https://example.com/post-1/', 'https://example.com/post-2/']
+
+    def test_detects_sitemap_index(self):
+        """Test that <sitemapindex> is detected by its root element"""
+        kind, entries = parse_sitemap(SITEMAP_INDEX)
+
+        assert kind == 'sitemapindex'
+        assert len(entries) == 2
+
+    def test_page_slug_containing_sitemap_is_not_index(self):
+        """Test that a page URL containing 'sitemap' stays a page URL"""
+        kind, entries = parse_sitemap(PAGE_URLSET)
+
+        assert kind == 'urlset'
+        assert entries[0]['loc'] == 'https://example.com/html-sitemap/'
+
+    def test_html_is_not_sitemap(self):
+        """Test that HTML documents are rejected"""
+        kind, entries = parse_sitemap('<html><body>Not found</body></html>')
+
+        assert kind is None
+        assert entries == []
+
+
+class TestFetchSitemapUrls:
+    """Test suite for sitemap discovery"""
+
+    @patch('services.sitemap_parser.requests.Session.get')
+    def test_uses_first_valid_probe(self, mock_get):
+        """Test that a valid probe is used even when others fail"""
+        def fake_get(url, **kwargs):
+            if url == 'http://example.com/sitemap.xml':
+                return make_response(url, URLSET)
+            return make_response(url, 'Not found', status_code=404, content_type='text/html')
+        mock_get.side_effect = fake_get
+
+        urls = fetch_sitemap_urls('example.com')
+
+        assert urls == ['https://example.com/post-1/', 'https://example.com/post-2/']
+
+    @patch('services.sitemap_parser.requests.Session.get')
+    def test_no_sitemap_found(self, mock_get):
+        """Test that failing probes return an empty list"""
+        mock_get.side_effect = Exception('Connection refused')
+
+        urls = fetch_sitemap_urls('example.com')
+
+        assert urls == []
+
+    @patch('services.sitemap_parser.requests.Session.get')
+    def test_respects_max_urls(self, mock_get):
+        """Test that the URL limit is applied"""
+        mock_get.side_effect = lambda url, **kwargs: make_response(url, URLSET)
+
+        urls = fetch_sitemap_urls('example.com', max_urls=1)
+
+        assert urls == ['https://example.com/post-1/']
+
+    @patch('services.sitemap_parser.requests.Session.get')
+    def test_crawl_tree_stats(self, mock_get):
+        """Test that nested sitemaps are crawled into a tree with per-node stats"""
+        documents = {
+            'https://example.com/sitemap.xml': SITEMAP_INDEX,
+            'https://example.com/post-sitemap.xml': URLSET,
+            'https://example.com/page-sitemap.xml': PAGE_URLSET,
+        }
+
+        def fake_get(url, **kwargs):
+            if url in documents:
+                return make_response(url, documents[url])
+            return make_response(url, 'Not found', status_code=404, content_type='text/html')
+        mock_get.side_effect = fake_get
+
+        crawl = crawl_sitemap('example.com')
+        tree = crawl.to_dict()['tree']
+
+        assert crawl.urls == [
+            'https://example.com/post-1/',
+            'https://example.com/post-2/',
+            'https://example.com/html-sitemap/'
+        ]
+        assert tree['kind'] == 'sitemapindex'
+        assert tree['total_url_count'] == 3
+        assert [c['url_count'] for c in tree['children']] == [2, 1]
+        assert all(c['bytes'] > 0 for c in tree['children'])
+
+    @patch('services.sitemap_parser.requests.Session.get')
+    def test_self_referencing_index_stops(self, mock_get):
+        """Test that a sitemap index pointing at itself is not crawled in a loop"""
+        loop_index = '''<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>https://example.com/sitemap.xml</loc></sitemap>
+  <sitemap><loc>https://example.com/post-sitemap.xml</loc></sitemap>
+</sitemapindex>'''
+        documents = {
+            'https://example.com/sitemap.xml': loop_index,
+            'https://example.com/post-sitemap.xml': URLSET,
+        }
+
+        def fake_get(url, **kwargs):
+            if url in documents:
+                return make_response(url, documents[url])
+            return make_response(url, 'Not found', status_code=404, content_type='text/html')
+        mock_get.side_effect = fake_get
+
+        crawl = crawl_sitemap('example.com')
+
+        assert len(crawl.urls) == 2
+        assert crawl.skipped == [{'url': 'https://example.com/sitemap.xml', 'reason': 'already_visited'}]
+        assert crawl.stop_reason is None
+
+    @patch('services.sitemap_parser.requests.Session.get')
+    def test_byte_budget_returns_partial_result(self, mock_get):
+        """Test that exceeding the byte budget stops the crawl with a reason"""
+        documents = {
+            'https://example.com/sitemap.xml': SITEMAP_INDEX,
+            'https://example.com/post-sitemap.xml': URLSET,
+            'https://example.com/page-sitemap.xml': PAGE_URLSET,
+        }
+
+        def fake_get(url, **kwargs):
+            if url in documents:
+                return make_response(url, documents[url])
+            return make_response(url, 'Not found', status_code=404, content_type='text/html')
+        mock_get.side_effect = fake_get
+
+        crawl = crawl_sitemap('example.com', max_bytes=len(SITEMAP_INDEX) + 1)
+
+        assert crawl.urls == ['https://example.com/post-1/', 'https://example.com/post-2/']
+        assert crawl.stop_reason == 'max_bytes'
+        assert crawl.to_dict()['truncated'] is True
+
+
+    @patch('services.sitemap_parser.requests.Session.get')
+    def test_losing_probes_are_closed(self, mock_get):
+        """Test that responses of probes that lost the race are closed, not left holding connections"""
+        import time
+        responses = []
+
+        def fake_get(url, **kwargs):
+            assert kwargs['stream'] is True
+            if url != 'https://example.com/sitemap.xml':
+                time.sleep(0.05)
+            resp = make_response(url, URLSET)
+            responses.append(resp)
+            return resp
+        mock_get.side_effect = fake_get
+
+        crawl = crawl_sitemap('example.com', use_cache=False)
+
+        deadline = time.time() + 2
+        while time.time() < deadline and not (len(responses) == 4 and all(r.close.called for r in responses)):
+            time.sleep(0.01)
+        assert len(crawl.urls) == 2
+        assert len(responses) == 4
+        assert all(r.close.called for r in responses)
+
+
+    @patch('services.sitemap_parser.requests.Session.get')
+    def test_candidates_share_one_crawl_context(self, mock_get):
+        """Test that child sitemaps are fetched once across candidates and the budget is shared"""
+        from services import sitemap_parser
+        all_tags = URLSET.replace('/post-', '/tag/post-')
+
+        def fake_get(url, **kwargs):
+            if url.endswith(('/sitemap.xml', '/sitemap_index.xml')):
+                return make_response(url, SITEMAP_INDEX)
+            if url == 'https://example.com/post-sitemap.xml':
+                return make_response(url, all_tags)
+            return make_response(url, 'Not found', status_code=404, content_type='text/html')
+        mock_get.side_effect = fake_get
+
+        url_filter = SitemapFilter.from_dict({'exclude': ['/tag/*']})
+        with patch('services.sitemap_parser.SitemapCrawlContext',
+                   wraps=sitemap_parser.SitemapCrawlContext) as mock_ctx:
+            crawl = crawl_sitemap('example.com', url_filter=url_filter, use_cache=False)
+
+        fetched = [call.args[0] for call in mock_get.call_args_list]
+        assert fetched.count('https://example.com/post-sitemap.xml') == 1
+        assert fetched.count('https://example.com/page-sitemap.xml') == 1
+        assert mock_ctx.call_count == 1
+        assert crawl.urls == []
+        assert crawl.root is not None
+        assert crawl.root.total_filtered_count() == 2
+
+    @patch('services.sitemap_parser.requests.Session.get')
+    def test_exhausted_budget_stops_race(self, mock_get):
+        """Test that once the crawl deadline has passed no further candidate is crawled"""
+        mock_get.side_effect = lambda url, **kwargs: make_response(
+            url, SITEMAP_INDEX if url.endswith(('/sitemap.xml', '/sitemap_index.xml')) else URLSET
+        )
+
+        crawl = crawl_sitemap('example.com', time_budget=0, use_cache=False)
+
+        fetched = [call.args[0] for call in mock_get.call_args_list]
+        assert 'https://example.com/post-sitemap.xml' not in fetched
+        assert crawl.stop_reason == 'deadline'
+        assert crawl.root is None
+
+
+class TestSitemapCrawlCache:
+    """Test suite for the sitemap crawl cache"""
+
+    @patch('services.sitemap_parser.requests.Session.get')
+    def test_repeated_crawl_uses_cache(self, mock_get):
+        """Test that a second crawl of the same domain does not refetch"""
+        mock_get.side_effect = lambda url, **kwargs: make_response(url, URLSET)
+
+        first = fetch_sitemap_urls('example.com')
+        calls = mock_get.call_count
+        second = fetch_sitemap_urls('example.com')
+
+        assert first == second
+        assert mock_get.call_count == calls
+
+    @patch('services.sitemap_parser.requests.Session.get')
+    def test_concurrent_crawls_are_deduplicated(self, mock_get):
+        """Test that concurrent crawls of one domain share a single crawl"""
+        import threading
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+
+        started = threading.Event()
+
+        def slow_get(url, **kwargs):
+            started.set()
+            time.sleep(0.1)
+            return make_response(url, URLSET)
+        mock_get.side_effect = slow_get
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            first = executor.submit(crawl_sitemap, 'example.com')
+            started.wait()
+            second = executor.submit(crawl_sitemap, 'example.com')
+
+        assert first.result() is second.result()
+
+    @patch('services.sitemap_parser.requests.Session.get')
+    def test_cache_keyed_by_limit(self, mock_get):
+        """Test that a different URL limit triggers a new crawl"""
+        mock_get.side_effect = lambda url, **kwargs: make_response(url, URLSET)
+
+        assert len(fetch_sitemap_urls('example.com', max_urls=1)) == 1
+        assert len(fetch_sitemap_urls('example.com', max_urls=10)) == 2
+
+    @patch('services.sitemap_parser.requests.Session.get')
+    def test_crawl_without_sitemap_not_cached(self, mock_get):
+        """Test that a crawl that found no sitemap is retried next time"""
+        mock_get.side_effect = lambda url, **kwargs: make_response(url, 'Not found', status_code=404)
+
+        assert fetch_sitemap_urls('example.com') == []
+        calls = mock_get.call_count
+        assert fetch_sitemap_urls('example.com') == []
+
+        assert mock_get.call_count == 2 * calls
+
+    @patch('services.sitemap_parser.requests.Session.get')
+    def test_truncated_crawl_not_cached(self, mock_get):
+        """Test that a crawl cut short by the byte budget is crawled again next time"""
+        documents = {
+            'https://example.com/sitemap.xml': SITEMAP_INDEX,
+            'https://example.com/post-sitemap.xml': URLSET,
+            'https://example.com/page-sitemap.xml': PAGE_URLSET,
+        }
+
+        def fake_get(url, **kwargs):
+            if url in documents:
+                return make_response(url, documents[url])
+            return make_response(url, 'Not found', status_code=404, content_type='text/html')
+        mock_get.side_effect = fake_get
+
+        first = crawl_sitemap('example.com', max_bytes=len(SITEMAP_INDEX) + 1)
+        second = crawl_sitemap('example.com', max_bytes=len(SITEMAP_INDEX) + 1)
+
+        assert first.stop_reason == 'max_bytes'
+        assert second is not first
+
+    @patch('services.sitemap_parser.CACHE_MAX_URLS', 3)
+    @patch('services.sitemap_parser.requests.Session.get')
+    def test_cache_bounded_by_url_count(self, mock_get):
+        """Test that the least recently used crawls are evicted once the URL total exceeds the limit"""
+        mock_get.side_effect = lambda url, **kwargs: make_response(url, URLSET)
+
+        fetch_sitemap_urls('one.example.com')
+        fetch_sitemap_urls('two.example.com')
+        calls = mock_get.call_count
+        fetch_sitemap_urls('two.example.com')
+        assert mock_get.call_count == calls
+
+        fetch_sitemap_urls('one.example.com')
+        assert mock_get.call_count > calls
+
+
+class TestSitemapFilter:
+    """Test suite for sitemap include/exclude rules"""
+
+    def test_path_globs(self):
+        """Test include/exclude globs on the URL path"""
+        url_filter = SitemapFilter.from_dict({'exclude': ['/tag/*', '*/page/*']})
+
+        assert url_filter.allows_url('https://example.com/my-post/')
+        assert not url_filter.allows_url('https://example.com/tag/seo/')
+        assert not url_filter.allows_url('https://example.com/blog/page/2/')
+
+    def test_regex_and_lastmod_window(self):
+        """Test regex rules and lastmod bounds"""
+        url_filter = SitemapFilter.from_dict({
+            'include_regex': r'/\d{4}/',
+            'lastmod_after': '2024-01-01'
+        })
+
+        assert url_filter.allows_url('https://example.com/2024/post/', '2024-06-01T10:00:00+00:00')
+        assert not url_filter.allows_url('https://example.com/2023/post/', '2023-06-01')
+        assert not url_filter.allows_url('https://example.com/about/', '2024-06-01')
+        # Entries without lastmod are kept
+        assert url_filter.allows_url('https://example.com/2022/post/')
+
+    def test_child_sitemap_types(self):
+        """Test post type detection from child sitemap names"""
+        assert child_sitemap_type('https://example.com/post-sitemap2.xml') == 'post'
+        assert child_sitemap_type('https://example.com/post_tag-sitemap.xml') == 'post_tag'
+        assert child_sitemap_type('https://example.com/wp-sitemap-posts-page-1.xml') == 'page'
+        assert child_sitemap_type('https://example.com/wp-sitemap-users-1.xml') == 'author'
+        assert child_sitemap_type('https://example.com/sitemap.xml') is None
+
+    def test_invalid_rules(self):
+        """Test that invalid rules raise ValueError"""
+        with pytest.raises(ValueError):
+            SitemapFilter.from_dict({'include_regex': '('})
+        with pytest.raises(ValueError):
+            SitemapFilter.from_dict({'unknown': 'x'})
+        with pytest.raises(ValueError):
+            SitemapFilter.from_dict({'lastmod_after': 'yesterday'})
+
+    @patch('services.sitemap_parser.requests.Session.get')
+    def test_filtered_child_sitemap_not_fetched(self, mock_get):
+        """Test that child sitemaps of unwanted post types are never fetched"""
+        documents = {
+            'https://example.com/sitemap.xml': SITEMAP_INDEX,
+            'https://example.com/post-sitemap.xml': URLSET,
+            'https://example.com/page-sitemap.xml': PAGE_URLSET,
+        }
+
+        def fake_get(url, **kwargs):
+            if url in documents:
+                return make_response(url, documents[url])
+            return make_response(url, 'Not found', status_code=404, content_type='text/html')
+        mock_get.side_effect = fake_get
+
+        url_filter = SitemapFilter.from_dict({'post_types': ['post'], 'exclude': ['/post-2/']})
+        crawl = crawl_sitemap('example.com', url_filter=url_filter)
+
+        fetched = [call.args[0] for call in mock_get.call_args_list]
+        assert 'https://example.com/page-sitemap.xml' not in fetched
+        assert crawl.urls == ['https://example.com/post-1/']
+        assert crawl.to_dict()['tree']['children'][0]['filtered_count'] == 1
+
+
+class TestSitemapSession:
+    """Test suite for the pooled sitemap HTTP session"""
+
+    def test_session_is_shared(self):
+        """Test that all sitemap requests share one pooled session"""
+        assert _get_session() is _get_session()
+
+    def test_session_pool_limits(self):
+        """Test that the per-host connection pool is bounded"""
+        adapter = _get_session().get_adapter('https://example.com/sitemap.xml')
+
+        assert adapter._pool_maxsize == POOL_MAXSIZE
+        assert adapter._pool_block is True
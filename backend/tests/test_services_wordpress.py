@@ -2,12 +2,21 @@
 Unit tests for WordPress Service
 Tests WordPress API service layer with mocking
 """
+import threading
+import time
 import pytest
+import requests
 from unittest.mock import Mock, patch, MagicMock
 from services.wordpress_service import (
     WordPressService,
     create_wordpress_service,
-    WordPressAPIError
+    get_wordpress_service,
+    clear_wordpress_services,
+    PostTypeRouter,
+    SiteThrottle,
+    PostWriteQueue,
+    WordPressAPIError,
+    LINK_FIELDS
 )
 
 
@@ -46,7 +55,7 @@ class TestWordPressService:
 
         assert service.site_url == 'https://test.example.com'
 
-    @patch('services.wordpress_service.requests.request')
+    @patch('services.wordpress_service.requests.Session.request')
     def test_test_connection_success(self, mock_request, wp_service):
         """Test successful connection test"""
         mock_response = Mock()
@@ -65,7 +74,7 @@ class TestWordPressService:
         assert result['name'] == 'Test User'
         mock_request.assert_called_once()
 
-    @patch('services.wordpress_service.requests.request')
+    @patch('services.wordpress_service.requests.Session.request')
     def test_test_connection_failure(self, mock_request, wp_service):
         """Test failed connection test"""
         mock_response = Mock()
@@ -77,7 +86,7 @@ class TestWordPressService:
         assert success == False
         assert 'error' in result
 
-    @patch('services.wordpress_service.requests.request')
+    @patch('services.wordpress_service.requests.Session.request')
     def test_test_connection_timeout(self, mock_request, wp_service):
         """Test connection timeout"""
         mock_request.side_effect = Exception('Connection timeout')
@@ -87,7 +96,22 @@ class TestWordPressService:
         assert success == False
         assert 'error' in result
 
-    @patch('services.wordpress_service.requests.request')
+    @patch('services.wordpress_service.requests.Session.request')
+    def test_test_connection_single_attempt(self, mock_request, wp_service):
+        """Test that a single-attempt check ignores an open circuit, does not retry and leaves the throttle alone"""
+        mock_request.side_effect = requests.exceptions.ConnectionError('refused')
+        wp_service.throttle.opened_at = time.time()
+        wp_service.throttle.consecutive_failures = 5
+
+        success, result = wp_service.test_connection(single_attempt=True)
+
+        assert success is False
+        assert 'Connection error' in result['error']
+        assert mock_request.call_count == 1
+        assert wp_service.throttle.consecutive_failures == 5
+        assert wp_service.throttle.counts['rejected'] == 0
+
+    @patch('services.wordpress_service.requests.Session.request')
     def test_fetch_post_by_slug(self, mock_request, wp_service):
         """Test fetching post by slug"""
         mock_response = Mock()
@@ -107,7 +131,7 @@ class TestWordPressService:
         assert post['id'] == 123
         assert post['title']['rendered'] == 'Test Post'
 
-    @patch('services.wordpress_service.requests.request')
+    @patch('services.wordpress_service.requests.Session.request')
     def test_fetch_post_by_slug_not_found(self, mock_request, wp_service):
         """Test fetching non-existent post"""
         mock_response = Mock()
@@ -156,7 +180,7 @@ class TestWordPressService:
         assert parsed['seo_title'] == 'SEO Title'
         assert parsed['seo_description'] == 'SEO Description'
 
-    @patch('services.wordpress_service.requests.request')
+    @patch('services.wordpress_service.requests.Session.request')
     def test_update_post_success(self, mock_request, wp_service):
         """Test updating a post successfully"""
         mock_response = Mock()
@@ -178,7 +202,7 @@ class TestWordPressService:
         assert success == True
         assert result['title'] == 'Updated Title'
 
-    @patch('services.wordpress_service.requests.request')
+    @patch('services.wordpress_service.requests.Session.request')
     def test_update_post_failure(self, mock_request, wp_service):
         """Test failed post update"""
         mock_response = Mock()
@@ -194,7 +218,111 @@ class TestWordPressService:
         assert success == False
         assert 'error' in result
 
-    @patch('services.wordpress_service.requests.request')
+    @patch('services.wordpress_service.requests.Session.request')
+    def test_update_posts_bulk_uses_batch_api(self, mock_request, wp_service):
+        """Test that bulk updates are sent in batch requests of 25"""
+        def fake_request(method, url, **kwargs):
+            requests_ = kwargs['json']['requests']
+            response = Mock()
+            response.status_code = 207
+            response.json.return_value = {'responses': [
+                {'status': 200, 'body': {'id': int(r['path'].rsplit('/', 1)[-1]), 'title': {'rendered': r['body']['title']}}}
+                if r['path'] != '/wp/v2/posts/3' else
+                {'status': 403, 'body': {'message': 'Sorry, you are not allowed to edit this post.'}}
+                for r in requests_
+            ]}
+            return response
+        mock_request.side_effect = fake_request
+
+        updates = [(i, {'title': f'Title {i}'}) for i in range(1, 31)]
+        results = wp_service.update_posts_bulk(updates)
+
+        assert mock_request.call_count == 2
+        assert all(c.args[1].endswith('/wp-json/batch/v1') for c in mock_request.call_args_list)
+        assert [r['post_id'] for r in results] == list(range(1, 31))
+        assert results[0]['post']['title'] == 'Title 1'
+        assert results[2] == {'post_id': 3, 'success': False, 'error': 'Sorry, you are not allowed to edit this post.'}
+        assert wp_service.batch_supported is True
+
+    @patch('services.wordpress_service.requests.Session.request')
+    def test_update_posts_bulk_falls_back_without_batch(self, mock_request, wp_service):
+        """Test single updates on sites without the batch endpoint"""
+        def fake_request(method, url, **kwargs):
+            response = Mock()
+            if url.endswith('/batch/v1'):
+                response.status_code = 404
+                return response
+            response.status_code = 200
+            response.json.return_value = {'id': int(url.rsplit('/', 1)[-1]), 'title': {'rendered': 'Done'}}
+            return response
+        mock_request.side_effect = fake_request
+
+        results = wp_service.update_posts_bulk([(1, {'title': 'Done'}), (2, {'title': 'Done'})])
+
+        assert [r['success'] for r in results] == [True, True]
+        assert wp_service.batch_supported is False
+
+        # Batch support is remembered: no more batch attempts
+        mock_request.reset_mock()
+        wp_service.update_posts_bulk([(3, {'title': 'Done'})])
+        assert all(not c.args[1].endswith('/batch/v1') for c in mock_request.call_args_list)
+
+    @patch('services.wordpress_service.requests.Session.request')
+    def test_update_posts_bulk_routes_pages(self, mock_request, wp_service):
+        """Test that pages are written through /wp/v2/pages, in batches and single updates"""
+        def fake_request(method, url, **kwargs):
+            response = Mock()
+            if url.endswith('/batch/v1'):
+                response.status_code = 207
+                response.json.return_value = {'responses': [
+                    {'status': 200, 'body': {'id': int(r['path'].rsplit('/', 1)[-1])}} for r in kwargs['json']['requests']
+                ]}
+                return response
+            response.status_code = 200
+            response.json.return_value = {'id': int(url.rsplit('/', 1)[-1])}
+            return response
+        mock_request.side_effect = fake_request
+
+        wp_service.update_posts_bulk([(1, {'title': 'A'}), (100, {'title': 'B'})], post_types={100: 'pages'})
+        paths = [r['path'] for r in mock_request.call_args.kwargs['json']['requests']]
+        assert paths == ['/wp/v2/posts/1', '/wp/v2/pages/100']
+
+        wp_service.batch_supported = False
+        wp_service.update_posts_bulk([(100, {'title': 'C'})], post_types={100: 'pages'})
+        assert mock_request.call_args.args[1].endswith('/wp-json/wp/v2/pages/100')
+
+    @patch('services.wordpress_service.requests.Session.request')
+    def test_update_post_sends_only_changed_fields(self, mock_request, wp_service):
+        """Test that fields matching the fetched post are not sent, and no-op saves are skipped"""
+        fetched = {'id': 5, 'slug': 'x', 'link': 'https://test.com/x/', 'status': 'publish',
+                   'title': {'rendered': 'Title'}, 'content': {'rendered': '<p>Body</p>'}}
+        wp_service.resolved_post_result('https://test.com/x/', fetched, None)
+
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {'id': 5, 'title': {'rendered': 'New title'}}
+        mock_request.return_value = mock_response
+
+        success, _ = wp_service.update_post(5, {'title': 'New title', 'content': '<p>Body</p>'})
+        assert success
+        assert mock_request.call_args.kwargs['json'] == {'title': 'New title'}
+
+        # Saving the same values again does not call WordPress
+        mock_request.reset_mock()
+        success, result = wp_service.update_post(5, {'title': 'New title', 'content': '<p>Body</p>'})
+        assert success
+        assert result['skipped'] is True
+        mock_request.assert_not_called()
+
+    def test_fingerprints_respect_projection(self, wp_service):
+        """Test that fields left out of a projection are not fingerprinted"""
+        fetched = {'id': 6, 'link': 'https://test.com/y/', 'content': {'rendered': ''}}
+        wp_service.resolved_post_result('https://test.com/y/', fetched, None, LINK_FIELDS)
+
+        # Title was not fetched, so it is never treated as unchanged
+        assert wp_service.fingerprints.diff(6, {'title': '', 'content': ''}) == {'title': ''}
+
+    @patch('services.wordpress_service.requests.Session.request')
     def test_get_categories(self, mock_request, wp_service):
         """Test getting categories"""
         mock_response = Mock()
@@ -211,19 +339,56 @@ class TestWordPressService:
         assert categories[0]['name'] == 'Category 1'
         assert categories[1]['name'] == 'Category 2'
 
-    @patch('services.wordpress_service.requests.request')
+    @patch('services.wordpress_service.requests.Session.request')
+    def test_get_categories_pages_and_caches(self, mock_request, wp_service):
+        """Test that all category pages are fetched once and then served from cache"""
+        def fake_request(method, url, **kwargs):
+            page = kwargs['params']['page']
+            response = Mock()
+            response.status_code = 200
+            response.headers = {'X-WP-TotalPages': '3'}
+            response.json.return_value = [{'id': page, 'name': f'Category {page}'}]
+            return response
+        mock_request.side_effect = fake_request
+
+        categories = wp_service.get_categories()
+        assert [c['id'] for c in categories] == [1, 2, 3]
+        assert mock_request.call_count == 3
+
+        wp_service.get_categories()
+        assert mock_request.call_count == 3
+
+        wp_service.categories.invalidate()
+        wp_service.get_categories()
+        assert mock_request.call_count == 6
+
+    def test_search_categories(self, wp_service):
+        """Test accent-insensitive name search with prefix matches first"""
+        catalog = [{'id': 1, 'name': 'Du lịch tin tức'}, {'id': 2, 'name': 'Thể thao'},
+                   {'id': 3, 'name': 'Tin tức'}]
+        with patch.object(wp_service, '_fetch_category_catalog', return_value=catalog):
+            matches, total = wp_service.search_categories('tin tuc', limit=1)
+
+        assert total == 2
+        assert [c['id'] for c in matches] == [3]
+
+    @patch('services.wordpress_service.requests.Session.request')
     def test_fetch_posts_concurrent(self, mock_request, wp_service):
-        """Test fetching multiple posts concurrently"""
-        # Mock response for multiple calls
+        """Test fetching multiple posts with one batched slug lookup"""
         mock_response = Mock()
         mock_response.status_code = 200
-        mock_response.json.return_value = [{
-            'id': 1,
-            'title': {'rendered': 'Post'},
-            'content': {'rendered': '<p>Content</p>'},
-            'status': 'publish',
-            '_embedded': {}
-        }]
+        mock_response.json.return_value = [
+            {
+                'id': i,
+                'slug': f'post-{i}',
+                'link': f'https://test.com/post-{i}/',
+                'title': {'rendered': f'Post {i}'},
+                'content': {'rendered': '<p>Content</p>'},
+                'status': 'publish',
+                '_embedded': {}
+            }
+            for i in (1, 2, 3)
+        ]
         mock_request.return_value = mock_response
 
         urls = [
@@ -235,5 +400,404 @@ class TestWordPressService:
         results = wp_service.fetch_posts_concurrent(urls, max_workers=2)
 
         assert len(results) == 3
-        # At least one should succeed (mocked)
-        assert any('id' in result for result in results)
+        assert {r['url']: r['id'] for r in results} == {
+            'https://test.com/post-1': 1,
+            'https://test.com/post-2': 2,
+            'https://test.com/post-3': 3
+        }
+        # Unknown post type: posts and pages are queried in parallel, once each
+        assert mock_request.call_count == 2
+        assert all(c.kwargs['params']['slug'] == 'post-1,post-2,post-3' for c in mock_request.call_args_list)
+
+        # Learned type: the second fetch only queries posts
+        mock_request.reset_mock()
+        wp_service.fetch_posts_concurrent(urls, max_workers=2)
+        mock_request.assert_called_once()
+        assert mock_request.call_args.args[1].endswith('/wp/v2/posts')
+
+    @patch('services.wordpress_service.requests.Session.request')
+    def test_iter_posts_concurrent_is_lazy(self, mock_request, wp_service):
+        """Test that posts are yielded without waiting for every lookup"""
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = [{'id': 1, 'slug': 'post-1', 'link': 'https://test.com/post-1/'}]
+        mock_request.return_value = mock_response
+
+        posts = wp_service.iter_posts_concurrent(['https://test.com/post-1'])
+        mock_request.assert_not_called()
+
+        assert next(posts)['id'] == 1
+        assert list(posts) == []
+
+    @patch('services.wordpress_service.requests.Session.request')
+    def test_fetch_posts_concurrent_resolves_pages(self, mock_request, wp_service):
+        """Test that URLs are resolved from both posts and pages"""
+        def fake_request(method, url, **kwargs):
+            response = Mock()
+            response.status_code = 200
+            if url.endswith('/wp/v2/pages'):
+                response.json.return_value = [{
+                    'id': 9, 'slug': 'about', 'link': 'https://test.com/about/',
+                    'title': {'rendered': 'About'}, 'content': {'rendered': ''}
+                }]
+            else:
+                response.json.return_value = [{
+                    'id': 1, 'slug': 'post-1', 'link': 'https://test.com/post-1/',
+                    'title': {'rendered': 'Post 1'}, 'content': {'rendered': ''}
+                }]
+            return response
+        mock_request.side_effect = fake_request
+
+        results = wp_service.fetch_posts_concurrent(
+            ['https://test.com/post-1/', 'https://test.com/about/', 'https://test.com/missing/']
+        )
+
+        by_url = {r['url']: r for r in results}
+        assert by_url['https://test.com/post-1/']['id'] == 1
+        assert by_url['https://test.com/about/']['id'] == 9
+        assert by_url['https://test.com/missing/']['error'] == 'Post not found'
+        assert mock_request.call_count == 2
+        assert wp_service.type_router.guess('https://test.com/about/') == 'pages'
+
+    def test_post_type_router_learns_prefixes(self):
+        """Test slug and path-prefix learning and hit-rate reporting"""
+        router = PostTypeRouter()
+        for i in range(3):
+            router.learn(f'https://test.com/docs/page-{i}/', 'pages')
+
+        assert router.guess('https://test.com/docs/new-page/') == 'pages'
+        assert router.guess('https://test.com/blog/new-post/') is None
+
+        router.learn('https://test.com/docs/new-page/', 'pages', guessed='pages')
+        router.learn('https://test.com/docs/a-post/', 'posts', guessed='pages')
+        stats = router.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        assert stats['hit_rate'] == 0.5
+
+    def test_projection_params(self, wp_service):
+        """Test that field projections send _fields and only needed embeds"""
+        assert wp_service._projection_params(None) == {'_embed': True}
+
+        params = wp_service._projection_params(LINK_FIELDS)
+        assert '_embed' not in params
+        assert set(params['_fields'].split(',')) == {'id', 'slug', 'link', 'type', 'content', 'modified'}
+
+        params = wp_service._projection_params(('id', 'categories'))
+        assert params['_embed'] == 'wp:term'
+        assert '_embedded' in params['_fields'].split(',')
+
+        with pytest.raises(ValueError):
+            wp_service._projection_params(('bogus',))
+
+    @patch('services.wordpress_service.requests.Session.request')
+    def test_fetch_post_by_slug_with_fields(self, mock_request, wp_service):
+        """Test that a projected fetch skips _embed"""
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = [{'id': 5, 'link': 'https://test.com/x/', 'content': {'rendered': ''}}]
+        mock_request.return_value = mock_response
+
+        post = wp_service.fetch_post_by_slug('x', fields=LINK_FIELDS)
+
+        assert post['id'] == 5
+        params = mock_request.call_args.kwargs['params']
+        assert '_embed' not in params
+        assert 'content' in params['_fields']
+
+    @patch('services.wordpress_service.requests.Session.request')
+    def test_list_posts_reads_total_pages(self, mock_request, wp_service):
+        """Test that listing pages report X-WP-TotalPages and pass modified_after"""
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.headers = {'X-WP-TotalPages': '7'}
+        mock_response.json.return_value = [{'id': 1}]
+        mock_request.return_value = mock_response
+
+        posts, total_pages = wp_service.list_posts('pages', page=2, modified_after='2025-01-01T00:00:00')
+
+        assert posts == [{'id': 1}]
+        assert total_pages == 7
+        params = mock_request.call_args.kwargs['params']
+        assert params['page'] == 2
+        assert params['modified_after'] == '2025-01-01T00:00:00'
+        assert mock_request.call_args.args[1].endswith('/wp-json/wp/v2/pages')
+
+    @patch('services.wordpress_service.requests.Session.request')
+    def test_fetch_modified_dates(self, mock_request, wp_service):
+        """Test that modified dates come from include= lookups on posts, then pages"""
+        def fake_request(method, url, **kwargs):
+            response = Mock()
+            response.status_code = 200
+            ids = [int(i) for i in kwargs['params']['include'].split(',')]
+            assert kwargs['params']['_fields'] == 'id,slug,link,type,modified'
+            if url.endswith('/posts'):
+                response.json.return_value = [{'id': i, 'modified': '2025-01-01T10:00:00'} for i in ids if i < 100]
+            else:
+                response.json.return_value = [{'id': i, 'modified': '2025-03-01T10:00:00'} for i in ids if i == 100]
+            return response
+        mock_request.side_effect = fake_request
+
+        modified = wp_service.fetch_modified_dates([1, 2, 100, 200])
+
+        assert modified == {1: '2025-01-01T10:00:00', 2: '2025-01-01T10:00:00', 100: '2025-03-01T10:00:00'}
+        assert mock_request.call_args.kwargs['params']['include'] == '100,200'
+
+    @patch('services.wordpress_service.requests.Session.request')
+    def test_fetch_raw_contents_reports_post_type(self, mock_request, wp_service):
+        """Test that raw content lookups report which endpoint each id was found on"""
+        def fake_request(method, url, **kwargs):
+            response = Mock()
+            response.status_code = 200
+            assert kwargs['params']['context'] == 'edit'
+            ids = [int(i) for i in kwargs['params']['include'].split(',')]
+            found = [i for i in ids if (i < 100) == url.endswith('/posts')]
+            response.json.return_value = [{'id': i, 'link': f'https://test.com/{i}/',
+                                           'content': {'raw': f'<p>{i}</p>'}} for i in found]
+            return response
+        mock_request.side_effect = fake_request
+
+        contents = wp_service.fetch_raw_contents([1, 100])
+
+        assert contents[1]['post_type'] == 'posts'
+        assert contents[100] == {'url': 'https://test.com/100/', 'raw': '<p>100</p>', 'modified': None,
+                                 'post_type': 'pages'}
+
+    def test_chunk_slugs(self, wp_service):
+        """Test that slug batches respect the per-request limit"""
+        chunks = wp_service._chunk_slugs([f'slug-{i}' for i in range(250)])
+
+        assert [len(c) for c in chunks] == [100, 100, 50]
+
+
+class TestSiteThrottle:
+    """Test suite for adaptive concurrency and circuit breaker"""
+
+    @pytest.fixture
+    def wp_service(self):
+        return WordPressService('https://test.example.com', 'testuser', 'test_password')
+
+    def test_limit_adapts_to_outcomes(self):
+        """Test that the limit halves on throttling and grows on fast responses"""
+        throttle = SiteThrottle(initial_limit=8, max_limit=16)
+
+        throttle.acquire()
+        throttle.release('throttled', 0.1)
+        assert throttle.stats()['limit'] == 4
+
+        for _ in range(20):
+            throttle.acquire()
+            throttle.release('ok', 0.1)
+        assert throttle.stats()['limit'] > 4
+
+    @patch('services.wordpress_service.time.sleep')
+    @patch('services.wordpress_service.requests.Session.request')
+    def test_get_retried_after_throttling(self, mock_request, mock_sleep, wp_service):
+        """Test that a GET answered with 429 is retried, honouring Retry-After"""
+        throttled = Mock(status_code=429, headers={'Retry-After': '2'})
+        ok = Mock(status_code=200, headers={})
+        mock_request.side_effect = [throttled, ok]
+
+        response = wp_service._make_request('GET', '/wp-json/wp/v2/posts')
+
+        assert response is ok
+        mock_sleep.assert_called_once_with(2.0)
+        assert wp_service.throttle.stats()['throttled'] == 1
+
+    @patch('services.wordpress_service.time.sleep')
+    @patch('services.wordpress_service.requests.Session.request')
+    def test_circuit_opens_and_fails_fast(self, mock_request, mock_sleep, wp_service):
+        """Test that repeated connection errors open the circuit"""
+        mock_request.side_effect = requests.exceptions.ConnectionError('refused')
+
+        for _ in range(2):  # 3 attempts each (2 retries)
+            with pytest.raises(WordPressAPIError):
+                wp_service._make_request('GET', '/wp-json/wp/v2/posts')
+        assert wp_service.throttle.stats()['circuit'] == 'open'
+
+        mock_request.reset_mock()
+        with pytest.raises(WordPressAPIError) as exc_info:
+            wp_service._make_request('GET', '/wp-json/wp/v2/posts')
+        assert 'circuit open' in exc_info.value.message
+        mock_request.assert_not_called()
+
+    @patch('services.wordpress_service.requests.Session.request')
+    def test_probe_closes_circuit(self, mock_request, wp_service):
+        """Test that a successful probe after the cooldown closes the circuit"""
+        wp_service.throttle.opened_at = 0  # Opened long ago: cooldown over
+        wp_service.throttle.consecutive_failures = 5
+        mock_request.return_value = Mock(status_code=200, headers={})
+
+        wp_service._make_request('GET', '/wp-json/wp/v2/posts')
+
+        assert wp_service.throttle.stats()['circuit'] == 'closed'
+
+
+class TestPostWriteQueue:
+    """Test suite for the per-site post write queue"""
+
+    def test_rapid_updates_coalesced_in_order(self):
+        """Test that updates queued behind an in-flight write of the post are merged"""
+        release = threading.Event()
+        calls = []
+
+        def write(post_id, data):
+            calls.append((post_id, dict(data)))
+            if len(calls) == 1:
+                release.wait(5)
+            return True, {'id': post_id}
+
+        queue = PostWriteQueue(write, max_concurrent=2)
+        first = queue.submit(1, {'title': 'A'})
+        second = queue.submit(1, {'title': 'B'})
+        third = queue.submit(1, {'content': 'C'})
+
+        assert queue.stats()['depth'] == 1
+        release.set()
+        for future in (first, second, third):
+            assert future.result(timeout=5) == (True, {'id': 1})
+
+        assert calls == [(1, {'title': 'A'}), (1, {'title': 'B', 'content': 'C'})]
+        stats = queue.stats()
+        assert stats['coalesced'] == 1
+        assert stats['written'] == 2
+        assert stats['depth'] == 0
+
+    def test_close_waits_for_queued_writes(self):
+        """Test that closing the queue lets queued writes finish before stopping its threads"""
+        release = threading.Event()
+
+        def write(post_id, data):
+            release.wait(5)
+            return True, {'id': post_id}
+
+        queue = PostWriteQueue(write, max_concurrent=1)
+        futures = [queue.submit(post_id, {'title': 'A'}) for post_id in (1, 2)]
+        queue.close()
+        assert queue._executor is not None
+
+        release.set()
+        assert [f.result(timeout=5)[0] for f in futures] == [True, True]
+        assert queue.stats()['written'] == 2
+        assert queue._executor is None
+
+    def test_concurrency_limited(self):
+        """Test that at most max_concurrent writes run at once and failures resolve futures"""
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def write(post_id, data):
+            with lock:
+                running.append(post_id)
+                peak.append(len(running))
+            threading.Event().wait(0.02)
+            with lock:
+                running.remove(post_id)
+            if post_id == 3:
+                raise WordPressAPIError('Connection error')
+            return True, {'id': post_id}
+
+        queue = PostWriteQueue(write, max_concurrent=2)
+        futures = [queue.submit(post_id, {'title': str(post_id)}) for post_id in range(1, 7)]
+        results = [future.result(timeout=5) for future in futures]
+
+        assert max(peak) <= 2
+        assert results[2][0] is False
+        assert 'Connection error' in results[2][1]['error']
+        assert queue.stats()['failed'] == 1
+
+    def test_hold_orders_outside_write_with_queued_ones(self):
+        """Test that hold() waits for queued writes of its posts and delays later ones until it exits"""
+        release = threading.Event()
+        calls = []
+
+        def write(post_id, data):
+            if not calls:
+                release.wait(5)
+            calls.append((post_id, dict(data)))
+            return True, {'id': post_id}
+
+        queue = PostWriteQueue(write, max_concurrent=2)
+        before = queue.submit(1, {'title': 'queued'})
+        held = threading.Event()
+
+        def outside_write():
+            with queue.hold([1]):
+                held.set()
+                calls.append((1, {'title': 'bulk'}))
+                after.append(queue.submit(1, {'title': 'later'}))
+                threading.Event().wait(0.05)
+                assert len(calls) == 2  # Lần submit sau phải chờ hold kết thúc
+
+        after = []
+        thread = threading.Thread(target=outside_write)
+        thread.start()
+        assert not held.wait(0.05)  # Còn chờ write đang chạy của post 1
+        release.set()
+        thread.join(5)
+
+        assert before.result(timeout=5)[0] is True
+        assert after[0].result(timeout=5)[0] is True
+        assert [data['title'] for _, data in calls] == ['queued', 'bulk', 'later']
+
+    def test_update_posts_bulk_holds_posts(self):
+        """Test that bulk updates run while their posts are held in the write queue"""
+        wp_service = WordPressService('https://test.example.com', 'testuser', 'test_password')
+        held = []
+
+        def update_posts_batch(updates, post_types):
+            held.append(set(wp_service.write_queue._held))
+            return [{'post_id': post_id, 'success': True} for post_id, _ in updates]
+
+        with patch.object(wp_service, 'update_posts_batch', side_effect=update_posts_batch):
+            wp_service.update_posts_bulk([(1, {'title': 'A'}), (2, {'title': 'B'})])
+
+        assert held == [{1, 2}]
+        assert wp_service.write_queue._held == set()
+
+
+class TestWordPressServiceRegistry:
+    """Test suite for shared per-site services"""
+
+    @pytest.fixture(autouse=True)
+    def clean_registry(self):
+        clear_wordpress_services()
+        yield
+        clear_wordpress_services()
+
+    def test_service_reused_per_site(self):
+        """Test that the same site and user share one service"""
+        first = get_wordpress_service('https://test.example.com/', 'user', 'pass')
+        second = get_wordpress_service('https://test.example.com', 'user', 'pass')
+
+        assert first is second
+
+    def test_new_password_keeps_existing_service(self):
+        """Test that another app password gets its own service without evicting the shared one"""
+        first = get_wordpress_service('https://test.example.com', 'user', 'pass')
+        second = get_wordpress_service('https://test.example.com', 'user', 'wrong-pass')
+
+        assert first is not second
+        assert second.app_password == 'wrong-pass'
+        assert get_wordpress_service('https://test.example.com', 'user', 'pass') is first
+
+    def test_least_recent_password_closed(self):
+        """Test that extra passwords evict the least recently used service and close its write queue"""
+        first = get_wordpress_service('https://test.example.com', 'user', 'pass')
+        first.write_queue._write = lambda post_id, data: (True, {'id': post_id})
+        assert first.write_queue.submit(1, {'title': 'A'}).result(timeout=5)[0] is True
+
+        get_wordpress_service('https://test.example.com', 'user', 'pass-2')
+        get_wordpress_service('https://test.example.com', 'user', 'pass-3')
+
+        assert get_wordpress_service('https://test.example.com', 'user', 'pass') is not first
+        assert first.write_queue._executor is None
+
+    def test_pool_sized_to_workers(self):
+        """Test that the connection pool grows to the worker count"""
+        service = get_wordpress_service('https://test.example.com', 'user', 'pass')
+        service._ensure_pool(25)
+
+        adapter = service.session.get_adapter('https://test.example.com/wp-json/')
+        assert adapter._pool_maxsize == 25
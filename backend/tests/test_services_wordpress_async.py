@@ -0,0 +1,198 @@
+"""
+Unit tests for the asyncio WordPress client
+Tests AsyncWordPressClient with mocked REST responses
+"""
+import pytest
+from unittest.mock import patch
+from services.wordpress_service import WordPressService, WordPressAPIError
+from services.wordpress_async import (
+    AsyncWordPressClient,
+    fetch_posts_sync,
+    fetch_sites_posts_sync,
+    update_posts_sync
+)
+
+
+def make_post(post_id, slug, site='https://test.example.com', path=''):
+    return {
+        'id': post_id,
+        'slug': slug,
+        'link': f'{site}{path}/{slug}/',
+        'title': {'rendered': slug.title()},
+        'content': {'rendered': '<p>Body</p>'}
+    }
+
+
+class TestAsyncWordPressClient:
+    """Test suite for AsyncWordPressClient"""
+
+    @pytest.fixture
+    def wp_service(self):
+        return WordPressService('https://test.example.com', 'testuser', 'test_password')
+
+    def test_fetch_posts_resolves_posts_and_pages(self, wp_service):
+        """Test that posts and pages are resolved with batched slug lookups"""
+        calls = []
+
+        async def fake_request(self, method, endpoint, **kwargs):
+            calls.append((endpoint, kwargs['params']['slug']))
+            slugs = kwargs['params']['slug'].split(',')
+            if endpoint.endswith('/posts'):
+                return 200, [make_post(1, 'first')] if 'first' in slugs else []
+            return 200, [make_post(2, 'about')] if 'about' in slugs else []
+
+        urls = ['https://test.example.com/first/', 'https://test.example.com/about/',
+                'https://test.example.com/missing/']
+        with patch.object(AsyncWordPressClient, '_request', fake_request):
+            results = fetch_posts_sync(wp_service, urls)
+
+        by_url = {r['url']: r for r in results}
+        assert by_url[urls[0]]['id'] == 1
+        assert by_url[urls[1]]['id'] == 2
+        assert by_url[urls[2]]['error'] == 'Post not found'
+        # Unknown types: one request per endpoint for all slugs
+        assert len(calls) == 2
+        assert wp_service.type_router.guess(urls[1]) == 'pages'
+
+    def test_fetch_posts_chunk_error(self, wp_service):
+        """Test that a failed lookup becomes error entries"""
+        async def fake_request(self, method, endpoint, **kwargs):
+            raise WordPressAPIError('Connection error: refused')
+
+        with patch.object(AsyncWordPressClient, '_request', fake_request):
+            results = fetch_posts_sync(wp_service, ['https://test.example.com/first/'])
+
+        assert len(results) == 1
+        assert 'Connection error' in results[0]['error']
+
+    def test_fetch_posts_rejects_unknown_fields(self, wp_service):
+        """Test that unknown projection fields fail before any request"""
+        with pytest.raises(ValueError):
+            fetch_posts_sync(wp_service, ['https://test.example.com/first/'], fields=('bogus',))
+
+    def test_fetch_sites_posts(self):
+        """Test fetching from several sites in one call"""
+        site_a = WordPressService('https://a.example.com', 'user', 'pass')
+        site_b = WordPressService('https://b.example.com', 'user', 'pass')
+
+        async def fake_request(self, method, endpoint, **kwargs):
+            if endpoint.endswith('/pages'):
+                return 200, []
+            slug = kwargs['params']['slug']
+            return 200, [make_post(len(self.site_url), slug, site=self.site_url)]
+
+        with patch.object(AsyncWordPressClient, '_request', fake_request):
+            results = fetch_sites_posts_sync([
+                (site_a, ['https://a.example.com/one/']),
+                (site_b, ['https://b.example.com/two/'])
+            ])
+
+        assert [r[0]['url'] for r in results] == ['https://a.example.com/one/', 'https://b.example.com/two/']
+
+    def test_sync_calls_reuse_session(self, wp_service):
+        """Test that sync facade calls share one long-lived session (keep-alive across requests)"""
+        sessions = []
+
+        async def fake_request(self, method, endpoint, **kwargs):
+            sessions.append(self.session)
+            return 200, []
+
+        with patch.object(AsyncWordPressClient, '_request', fake_request):
+            fetch_posts_sync(wp_service, ['https://test.example.com/first/'])
+            fetch_posts_sync(wp_service, ['https://test.example.com/second/'])
+
+        assert len(sessions) == 4  # posts + pages cho mỗi lần gọi
+        assert len(set(map(id, sessions))) == 1
+        assert not sessions[0].closed
+
+    def test_update_posts(self, wp_service):
+        """Test concurrent updates keep input order and surface API errors"""
+        async def fake_request(self, method, endpoint, **kwargs):
+            post_id = int(endpoint.rsplit('/', 1)[-1])
+            if post_id == 2:
+                return 403, {'message': 'Sorry, you are not allowed to edit this post.'}
+            return 200, {'id': post_id, 'title': {'rendered': kwargs['json']['title']}}
+
+        with patch.object(AsyncWordPressClient, '_request', fake_request):
+            results = update_posts_sync(wp_service, [(1, {'title': 'New'}), (2, {'title': 'Other'})])
+
+        assert results[0] == (True, results[0][1])
+        assert results[0][1]['title'] == 'New'
+        assert results[1] == (False, {'error': 'Sorry, you are not allowed to edit this post.'})
+
+    def test_requests_limited_by_throttle(self, wp_service):
+        """Test that requests in flight stay below the site's throttle limit, which drops on 429"""
+        import asyncio
+
+        class FakeResponse:
+            def __init__(self, status):
+                self.status = status
+
+            async def json(self, content_type=None):
+                return []
+
+        class FakeSession:
+            def __init__(self):
+                self.in_flight = 0
+                self.peak = 0
+                self.calls = 0
+
+            def request(self, method, url, **kwargs):
+                session = self
+
+                class Context:
+                    async def __aenter__(self):
+                        session.in_flight += 1
+                        session.calls += 1
+                        session.peak = max(session.peak, session.in_flight)
+                        await asyncio.sleep(0.01)
+                        return FakeResponse(429 if session.calls == 1 else 200)
+
+                    async def __aexit__(self, *args):
+                        session.in_flight -= 1
+                return Context()
+
+        async def run(session, count):
+            client = AsyncWordPressClient(wp_service, session)
+            return await asyncio.gather(*(client._request('GET', '/wp-json/wp/v2/posts') for _ in range(count)))
+
+        wp_service.throttle.limit = 4.0
+        session = FakeSession()
+        asyncio.run(run(session, 1))
+        assert wp_service.throttle.limit == 2.0
+
+        wp_service.throttle.max_limit = 2  # Không cho limit tăng lại trong lúc đo
+        asyncio.run(run(session, 10))
+        assert session.peak == 2
+
+    def test_cancelled_probe_releases_circuit(self, wp_service):
+        """Test that cancelling the half-open probe request lets the next request probe"""
+        import asyncio
+        import time
+        throttle = wp_service.throttle
+        throttle.opened_at = time.time() - throttle.cooldown - 1
+        throttle.consecutive_failures = throttle.failure_threshold
+
+        class HangingSession:
+            def request(self, method, url, **kwargs):
+                class Context:
+                    async def __aenter__(self):
+                        await asyncio.sleep(10)
+
+                    async def __aexit__(self, *args):
+                        pass
+                return Context()
+
+        async def run():
+            client = AsyncWordPressClient(wp_service, HangingSession())
+            task = asyncio.ensure_future(client._request('GET', '/wp-json/wp/v2/posts'))
+            await asyncio.sleep(0.01)
+            assert throttle.probing is True
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(run())
+
+        assert throttle.probing is False
+        assert throttle.check_circuit() is True  # Request tiếp theo được làm probe
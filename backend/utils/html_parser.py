@@ -1,9 +1,18 @@
 from bs4 import BeautifulSoup
+from html import escape, unescape
 from urllib.parse import urlparse
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
+# Regex thay vì BeautifulSoup khi ghi lại HTML: chỉ phần tử <a> khớp bị sửa,
+# phần còn lại (block comments, shortcodes, thuộc tính) giữ nguyên từng ký tự
+ANCHOR_PATTERN = re.compile(r'<a\b[^>]*>.*?</a\s*>', re.IGNORECASE | re.DOTALL)
+# Tên thuộc tính phải đứng sau khoảng trắng: \bhref cũng khớp data-href=
+HREF_PATTERN = re.compile(r'''((?<=\s)href\s*=\s*)(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))''', re.IGNORECASE)
+TAG_PATTERN = re.compile(r'(<[^>]+>)')
+
 def extract_outgoing_links(html_content, post_url):
     """
     Extract all external outgoing links from HTML content
@@ -13,7 +22,8 @@ def extract_outgoing_links(html_content, post_url):
         post_url: URL of the post (to determine which links are external)
 
     Returns:
-        List of dicts with 'domain' and 'anchor' keys
+        List of dicts with 'domain' and 'anchor' keys, or None when the
+        content could not be parsed (not the same as "no links")
     """
     if not html_content or not post_url:
         return []
@@ -72,4 +82,69 @@ def extract_outgoing_links(html_content, post_url):
 
     except Exception as e:
         logger.error(f"Error extracting outgoing links: {str(e)}")
-        return []
+        return None
+
+
+def _replace_anchor_text(inner_html, text):
+    """Put `text` in the first text node of an <a> element's inner HTML and empty the others"""
+    parts = TAG_PATTERN.split(inner_html)
+    replaced = False
+    for i, part in enumerate(parts):
+        if part.startswith('<') or not part.strip():
+            continue
+        parts[i] = '' if replaced else escape(text, quote=False)
+        replaced = True
+    return ''.join(parts) if replaced else inner_html
+
+
+def rewrite_links(html_content, rewrite):
+    """
+    Rewrite matching <a> elements in raw HTML, leaving all other markup untouched
+
+    Args:
+        html_content: HTML string (raw post content)
+        rewrite: callable(url, anchor) -> None to keep the link,
+                 or (new_url, new_anchor)
+
+    Returns:
+        Tuple of (new HTML, list of dicts with 'old_url', 'new_url',
+        'old_anchor' and 'new_anchor' keys)
+    """
+    if not html_content:
+        return html_content, []
+
+    changes = []
+
+    def replace(match):
+        element = match.group(0)
+        open_end = element.index('>') + 1
+        close_start = element.lower().rindex('</a')
+        opening, inner, closing = element[:open_end], element[open_end:close_start], element[close_start:]
+
+        href = HREF_PATTERN.search(opening)
+        if not href:
+            return element
+
+        url = unescape(next(value for value in href.groups()[1:] if value is not None))
+        anchor = unescape(''.join(part for part in TAG_PATTERN.split(inner) if not part.startswith('<'))).strip()
+
+        result = rewrite(url, anchor)
+        if result is None:
+            return element
+        new_url, new_anchor = result
+
+        if new_url != url:
+            opening = f'{opening[:href.start()]}{href.group(1)}"{escape(new_url)}"{opening[href.end():]}'
+        if new_anchor != anchor:
+            new_inner = _replace_anchor_text(inner, new_anchor)
+            if new_inner == inner:
+                new_anchor = anchor  # Link không có text (ví dụ ảnh): giữ nguyên
+            inner = new_inner
+
+        if new_url == url and new_anchor == anchor:
+            return element
+
+        changes.append({'old_url': url, 'new_url': new_url, 'old_anchor': anchor, 'new_anchor': new_anchor})
+        return opening + inner + closing
+
+    return ANCHOR_PATTERN.sub(replace, html_content), changes